@@ -0,0 +1,152 @@
+"""
+End-to-end fetch benchmark: FetchService.fetch against a local MockSuperOffice serving a synthetic tenant.
+
+Each fetch mode runs in its own process, so peak RSS is that of the fetch alone. Records wall time, time per
+phase (download+parse and file creation - they overlap in the stream and parallel modes, so only the total
+is reported there), peak RSS, files/sec and decoded bytes/sec. Pass --json to save the numbers for comparing
+runs.
+
+Run from the repo root:
+    python -m benchmarks.bench_fetch
+    python -m benchmarks.bench_fetch --modes default sync --scripts 5000 --screens 2000 --repeat 3
+    python -m benchmarks.bench_fetch --json results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.mock_superoffice import add_size_arguments
+from benchmarks.mock_superoffice import size_from_arguments
+from benchmarks.synthetic_tenant import generate_tenant
+from core.data_creator import DataCreator
+from core.fetch_service import FetchService
+
+# Key = Mode name. Value = Keyword arguments to FetchService.fetch()
+MODES: dict[str, dict] = {
+    "default": {},
+    "stream": {"stream": True},
+    "sync": {"sync": True},
+    "parallel": {"parallel": True},
+    "archive": {"archive": "tenant.zip"},  # Relative to the tenant's local directory
+}
+
+# Modes where downloading and creating files happen one after the other, so each can be timed
+PHASED_MODES: list[str] = ["default", "sync", "archive"]
+
+
+def peak_rss_mb() -> float | None:
+    """Returns the peak resident set size of this process in MB, or None where it can't be read (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KB on Linux
+
+
+def timed(phases: dict[str, float], phase: str, function: Callable) -> Callable:
+    """Wraps function to add the seconds spent in it to phases[phase]."""
+    def wrapper(*args, **kwargs):
+        start: float = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            phases[phase] = phases.get(phase, 0) + time.perf_counter() - start
+    return wrapper
+
+
+def run_fetch(tenant: dict, mode: str) -> dict:
+    """Runs a single fetch in mode, in a fresh process. Returns its measurements."""
+    service = FetchService()
+    phases: dict[str, float] = {}
+    if mode in PHASED_MODES:
+        service.get_superoffice_data = timed(phases, "download", service.get_superoffice_data)
+        DataCreator.create = timed(phases, "create", DataCreator.create)
+
+    fetch_kwargs: dict = dict(MODES[mode])
+    if "archive" in fetch_kwargs:
+        fetch_kwargs["archive"] = os.path.join(tenant["local_directory"], fetch_kwargs["archive"])
+
+    start: float = time.perf_counter()
+    result: dict = service.fetch(tenant, **fetch_kwargs)
+    seconds: float = time.perf_counter() - start
+
+    if not result["success"]:
+        raise RuntimeError(f"Fetch in {mode} mode failed: {result['error']}")
+
+    files: int = 0
+    file_bytes: int = 0
+    if "archive" in fetch_kwargs:
+        with zipfile.ZipFile(fetch_kwargs["archive"]) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    files += 1
+                    file_bytes += info.file_size
+    else:
+        for directory, _, file_names in os.walk(tenant["local_directory"]):
+            files += len(file_names)
+            file_bytes += sum(os.path.getsize(os.path.join(directory, name)) for name in file_names)
+
+    return {
+        "mode": mode,
+        "seconds": seconds,
+        "phases": phases,
+        "peak_rss_mb": peak_rss_mb(),
+        "files": files,
+        "file_bytes": file_bytes,
+        "wire_bytes": result["transfer"]["wire_bytes"],
+        "decoded_bytes": result["transfer"]["decoded_bytes"],
+        "files_per_second": files / seconds,
+        "decoded_bytes_per_second": result["transfer"]["decoded_bytes"] / seconds,
+    }
+
+
+def format_row(run: dict) -> str:
+    download: str = f"{run['phases']['download']:.2f}" if "download" in run["phases"] else "-"
+    create: str = f"{run['phases']['create']:.2f}" if "create" in run["phases"] else "-"
+    rss: str = f"{run['peak_rss_mb']:.0f}" if run["peak_rss_mb"] is not None else "-"
+    return (f"{run['mode']:>9} {run['seconds']:>8.2f} {download:>9} {create:>8} {rss:>9} {run['files']:>7} "
+            f"{run['files_per_second']:>9.0f} {run['decoded_bytes_per_second'] / 1024 / 1024:>8.1f} "
+            f"{run['wire_bytes'] / 1024 / 1024:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_size_arguments(parser)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=1, help="Fetches per mode. Every run is reported.")
+    parser.add_argument("--latency", type=float, default=0,
+                        help="Seconds the mock server waits before each response")
+    parser.add_argument("--json", help="File to save every run's measurements to")
+    args = parser.parse_args()
+
+    data: dict = generate_tenant(size_from_arguments(args))
+    runs: list[dict] = []
+
+    with MockSuperOffice(data, latency=args.latency) as mock:
+        print(f"{'mode':>9} {'wall (s)':>8} {'download':>9} {'create':>8} {'peak RSS':>9} {'files':>7} "
+              f"{'files/s':>9} {'MB/s':>8} {'wire MB':>8}")
+
+        for mode in args.modes:
+            for _ in range(args.repeat):
+                with tempfile.TemporaryDirectory() as directory, ProcessPoolExecutor(
+                        max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    run: dict = executor.submit(run_fetch, mock.tenant(directory), mode).result()
+                print(format_row(run))
+                runs.append(run)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"size": vars(size_from_arguments(args)), "latency": args.latency, "runs": runs}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
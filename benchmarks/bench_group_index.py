@@ -0,0 +1,101 @@
+"""
+Benchmarks the screen record lookups done while creating the Screens folder tree.
+
+Compares the list scans the creators used to do per folder/screen/element against GroupIndex,
+then materialises a full synthetic 10k-screen tenant into a temp directory with the current creators.
+
+Run from the repo root:
+    python -m benchmarks.bench_group_index
+    python -m benchmarks.bench_group_index --sizes 500 1000 2000 --legacy-max-screens 2000
+"""
+import argparse
+import random
+import tempfile
+import time
+from typing import Callable
+
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_group_screens
+from core.data_creation.group_index import GroupIndex
+from core.data_creation.screens import create_screens_hierarchy
+
+
+def legacy_lookups(group_screens: dict) -> int:
+    """The lookups the screen creators did before GroupIndex - one list scan per folder, screen and element."""
+    found: int = 0
+    for folder_id in [-1] + [f["id"] for f in group_screens["screen_folders"]]:
+        screens: list[dict] = [sd for sd in group_screens["screen_definition"] if sd.get("hierarchy_id") == folder_id]
+        for screen in screens:
+            screen_id: int = screen.get("id")
+            found += len([sa for sa in group_screens["screen_definition_action"]
+                          if sa.get("screen_definition") == screen_id])
+            elements: list[dict] = [se for se in group_screens["screen_definition_element"]
+                                    if se.get("screen_definition") == screen_id]
+            for element in elements:
+                found += len([ic for ic in group_screens["item_config"] if ic.get("item_id") == element.get("id")])
+            found += len([sh for sh in group_screens["screen_definition_hidden"]
+                          if sh.get("screen_definition") == screen_id])
+            found += len([sl for sl in group_screens["screen_definition_language"]
+                          if sl.get("screen_definition") == screen_id])
+    return found
+
+
+def indexed_lookups(group_screens: dict) -> int:
+    """The same lookups as legacy_lookups(), through a GroupIndex built once for the group."""
+    index = GroupIndex(group_screens)
+    found: int = 0
+    for folder_id in [-1] + [f["id"] for f in group_screens["screen_folders"]]:
+        for screen in index.find("screen_definition", "hierarchy_id", folder_id):
+            screen_id: int = screen.get("id")
+            found += len(index.find("screen_definition_action", "screen_definition", screen_id))
+            for element in index.find("screen_definition_element", "screen_definition", screen_id):
+                found += len(index.find("item_config", "item_id", element.get("id")))
+            found += len(index.find("screen_definition_hidden", "screen_definition", screen_id))
+            found += len(index.find("screen_definition_language", "screen_definition", screen_id))
+    return found
+
+
+def timed(function: Callable[[], int]) -> tuple[float, int]:
+    """Returns (seconds, return value) of calling function."""
+    start: float = time.perf_counter()
+    result: int = function()
+    return time.perf_counter() - start, result
+
+
+def screens_size(screens: int) -> TenantSize:
+    return TenantSize(screens=screens, screen_folders=max(1, screens // 50))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 10_000],
+                        help="Screen counts to benchmark lookups at")
+    parser.add_argument("--legacy-max-screens", type=int, default=500,
+                        help="Largest screen count to run the legacy scans at - they grow quadratically")
+    parser.add_argument("--materialise-screens", type=int, default=10_000,
+                        help="Screen count of the tenant written to disk at the end, 0 to skip")
+    args = parser.parse_args()
+
+    print(f"{'screens':>8} {'records':>9} {'legacy (s)':>11} {'indexed (s)':>12} {'speedup':>9}")
+    for screens in args.sizes:
+        group_screens: dict = generate_group_screens(screens_size(screens), random.Random(0))
+        records: int = sum(len(records) for records in group_screens.values())
+
+        indexed_seconds, indexed_found = timed(lambda: indexed_lookups(group_screens))
+        if screens <= args.legacy_max_screens:
+            legacy_seconds, legacy_found = timed(lambda: legacy_lookups(group_screens))
+            assert legacy_found == indexed_found
+            print(f"{screens:>8} {records:>9} {legacy_seconds:>11.3f} {indexed_seconds:>12.3f} "
+                  f"{legacy_seconds / indexed_seconds:>8.0f}x")
+        else:
+            print(f"{screens:>8} {records:>9} {'skipped':>11} {indexed_seconds:>12.3f} {'-':>9}")
+
+    if args.materialise_screens:
+        group_screens = generate_group_screens(screens_size(args.materialise_screens), random.Random(0))
+        with tempfile.TemporaryDirectory() as directory:
+            seconds, _ = timed(lambda: create_screens_hierarchy(directory, group_screens) or 0)
+        print(f"\nCreated Screens tree of {args.materialise_screens} screens in {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmarks the JSON encoders in core/json_encoding.py on the .json files of a synthetic tenant.
+
+Encodes each screen's screen_definition_element.json (its elements with their item configs, the largest .json
+files of a tenant) and each script's metadata .json with json.dumps() as create_json_file() used to, then with
+each encoder one file at a time and in batches, checking they all give the same bytes.
+
+Run from the repo root:
+    python -m benchmarks.bench_json_encoding
+    python -m benchmarks.bench_json_encoding --screens 2000 --elements-per-screen 40 --repeat 5
+"""
+import argparse
+import gc
+import json
+import random
+import time
+from typing import Callable
+
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_group_scripts
+from benchmarks.synthetic_tenant import generate_group_screens
+from core.data_creation.group_index import GroupIndex
+from core.data_creation.screens import get_screen_elements
+from core.json_encoding import JSON_ENCODERS
+from core.json_encoding import JsonEncoder
+
+
+def element_files(size: TenantSize) -> list[list[dict]]:
+    """Returns the content of each screen's screen_definition_element.json."""
+    group_screens: dict = generate_group_screens(size, random.Random(0))
+    index = GroupIndex(group_screens)
+    return [get_screen_elements(screen["id"], index) for screen in group_screens["screen_definition"]]
+
+
+def script_files(size: TenantSize) -> list[dict]:
+    """Returns the content of each script's .json, i.e. the script without its body."""
+    scripts: list[dict] = generate_group_scripts(size, random.Random(0))["scripts"]
+    return [{key: value for key, value in script.items() if key != "body"} for script in scripts]
+
+
+def best_of(repeat: int, function: Callable[[], list[bytes]]) -> tuple[float, list[bytes]]:
+    """Returns the fastest of repeat runs of function in seconds, and what it returned."""
+    best: float = float("inf")
+    result: list[bytes] = []
+    gc.disable()  # Collections triggered by the records already allocated would add noise
+    try:
+        for _ in range(repeat):
+            start: float = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, result
+
+
+def bench(name: str, files: list, repeat: int) -> None:
+    """Prints how long encoding files takes with json.dumps() and each installed encoder."""
+    total_bytes: int = sum(len(json.dumps(content, indent=4, ensure_ascii=False).encode("utf-8")) for content in files)
+    print(f"\n{name}: {len(files)} files, {total_bytes / 1_000_000:.1f} MB")
+    print(f"{'encoder':<22} {'seconds':>9} {'MB/s':>8} {'speedup':>9}")
+
+    baseline_seconds, expected = best_of(
+        repeat, lambda: [json.dumps(content, indent=4, ensure_ascii=False).encode("utf-8") for content in files])
+    print(f"{'json.dumps':<22} {baseline_seconds:>9.3f} {total_bytes / baseline_seconds / 1_000_000:>8.1f} "
+          f"{'1.0x':>9}")
+
+    for encoder_name, encoder_class in JSON_ENCODERS.items():
+        try:
+            encoder: JsonEncoder = encoder_class()
+        except ImportError:
+            print(f"{encoder_name:<22} {'not installed':>9}")
+            continue
+        runs: dict[str, Callable[[], list[bytes]]] = {
+            encoder_name: lambda: [encoder.encode(content) for content in files],
+            f"{encoder_name} (batch)": lambda: encoder.encode_batch(files),
+        }
+        for run_name, run in runs.items():
+            seconds, encoded = best_of(repeat, run)
+            assert encoded == expected, f"{run_name} encoded differently from json.dumps"
+            print(f"{run_name:<22} {seconds:>9.3f} {total_bytes / seconds / 1_000_000:>8.1f} "
+                  f"{baseline_seconds / seconds:>8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--screens", type=int, default=1000, help="Screens, i.e. screen_definition_element.json files")
+    parser.add_argument("--elements-per-screen", type=int, default=TenantSize.elements_per_screen)
+    parser.add_argument("--scripts", type=int, default=10_000, help="Scripts, i.e. script metadata .json files")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each encoder, of which the fastest is shown")
+    args = parser.parse_args()
+
+    size = TenantSize(screens=args.screens, elements_per_screen=args.elements_per_screen, scripts=args.scripts,
+                      script_body_size=0)
+    bench("screen_definition_element.json", element_files(size), args.repeat)
+    bench("Script metadata .json", script_files(size), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
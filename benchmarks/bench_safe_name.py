@@ -0,0 +1,117 @@
+"""
+Benchmarks core.utility.safe_name() on the names of a synthetic tenant: every folder, script, trigger, screen,
+button, screen chooser, scheduled task and table name it is called with while creating the files, in that order.
+
+Compares the nine str.replace() passes safe_name() used to make with safe_name() now, without its cache, with
+it cleared - the first fetch, on which only names like the button captions "OK" and "Cancel" repeat - and with it
+filled, as on the next fetches in the GUI or crmfetch watch.
+
+Run from the repo root:
+    python -m benchmarks.bench_safe_name
+    python -m benchmarks.bench_safe_name --screens 5000 --buttons-per-screen 6 --repeat 10
+"""
+import argparse
+import gc
+import random
+import time
+from typing import Callable
+
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core.utility import safe_name
+
+# Characters safe_name() replaces, some of which script and screen names have, e.g. "Ticket: Close/Reopen"
+SPECIAL: list[str] = ["/", ":", "?", "<", ">", "*", "|", '"', "\\"]
+
+
+def replace_passes(text: str) -> str:
+    """safe_name() as it used to be."""
+    replace_chars: list[tuple[str, str]] = [
+        ("/", "."),
+        ('"', "'"),
+        ("\\", ".."),
+        (":", " - "),
+        ("*", "X"),
+        ("<", " Lt "),
+        (">", " Gt "),
+        ("|", "I"),
+        ("?", "")
+    ]
+    for chars in replace_chars:
+        text = text.replace(chars[0], chars[1])
+    return text
+
+
+def names(size: TenantSize) -> list[str]:
+    """Returns the names safe_name() is called with while creating the files of a synthetic tenant."""
+    rng = random.Random(0)
+    tenant: dict = generate_tenant(size)
+
+    def special(name: str) -> str:
+        return f"{name}{rng.choice(SPECIAL)} part 2" if rng.random() < 0.1 else name
+
+    group_screens: dict = tenant["group_screens"]
+    group_extra_tables: dict = tenant["group_extra_tables"]
+    return ([folder["name"] for folder in tenant["group_scripts"]["script_folders"]]
+            + [special(script["description"]) for script in tenant["group_scripts"]["scripts"]]
+            + [special(trigger["description"]) for trigger in tenant["group_triggers"]["triggers"]]
+            + [folder["name"] for folder in group_screens["screen_folders"]]
+            + [f"(Screen) {special(screen['name'])}" for screen in group_screens["screen_definition"]]
+            + [action["button"] for action in group_screens["screen_definition_action"]]
+            + [special(sc["description"]) for sc in tenant["group_screen_choosers"]["screen_choosers"]]
+            + [schedule["name"] for schedule in tenant["group_scheduled_tasks"]["schedule"]]
+            + [folder["name"] for folder in group_extra_tables["extra_table_folders"]]
+            + [table["name"] for table in group_extra_tables["extra_tables"]])
+
+
+def best_of(repeat: int, function: Callable[[], list[str]], before: Callable[[], None]) -> tuple[float, list[str]]:
+    """Returns the fastest of repeat runs of function in seconds, calling before ahead of each, and its result."""
+    best: float = float("inf")
+    result: list[str] = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            before()
+            start: float = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scripts", type=int, default=10_000)
+    parser.add_argument("--screens", type=int, default=2000)
+    parser.add_argument("--buttons-per-screen", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each, of which the fastest is shown")
+    args = parser.parse_args()
+
+    size = TenantSize(scripts=args.scripts, screens=args.screens, buttons_per_screen=args.buttons_per_screen,
+                      script_body_size=0, elements_per_screen=0)
+    corpus: list[str] = names(size)
+    print(f"{len(corpus)} names, {len(set(corpus))} different")
+    print(f"{'safe_name':<26} {'ms':>8} {'speedup':>9}")
+
+    uncached: Callable[[str], str] = safe_name.__wrapped__
+    runs: dict[str, tuple[Callable[[], list[str]], Callable[[], None]]] = {
+        "str.replace() passes": (lambda: [replace_passes(name) for name in corpus], lambda: None),
+        "safe_name(), uncached": (lambda: [uncached(name) for name in corpus], lambda: None),
+        "safe_name(), first fetch": (lambda: [safe_name(name) for name in corpus], safe_name.cache_clear),
+        "safe_name(), next fetches": (lambda: [safe_name(name) for name in corpus], lambda: None),
+    }
+    baseline: float = 0
+    expected: list[str] = []
+    for run_name, (run, before) in runs.items():
+        seconds, result = best_of(args.repeat, run, before)
+        if not baseline:
+            baseline, expected = seconds, result
+        else:
+            # The corpus has no reserved names or trailing dots/spaces, so the result must be the same
+            assert result == expected, f"{run_name} named differently from the str.replace() passes"
+        print(f"{run_name:<26} {seconds * 1000:>8.2f} {baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
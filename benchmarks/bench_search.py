@@ -0,0 +1,74 @@
+"""
+Benchmarks crmfetch grep's SearchIndex against reading every .crmscript file, the way grep -r does.
+
+Fetches several synthetic tenants from a local MockSuperOffice into a temp directory with a SearchIndex,
+then searches them for a substring found in a single script, a common one and a regular expression.
+
+Run from the repo root:
+    python -m benchmarks.bench_search
+    python -m benchmarks.bench_search --tenants 20 --scripts 2000
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.mock_superoffice import add_size_arguments
+from benchmarks.mock_superoffice import size_from_arguments
+from benchmarks.synthetic_tenant import generate_tenant
+from core.fetch_service import FetchService
+from core.search_index import SearchIndex
+
+
+def walk_grep(directory: str, expression: re.Pattern) -> int:
+    """Returns the number of lines matching expression in every .crmscript file under directory."""
+    matches: int = 0
+    for folder, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            if file_name.endswith(".crmscript"):
+                with open(os.path.join(folder, file_name), encoding="utf-8") as f:
+                    matches += sum(1 for line in f if expression.search(line))
+    return matches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_size_arguments(parser)
+    parser.add_argument("--tenants", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SearchIndex(Path(directory) / "search_index.sqlite")
+        service = FetchService()
+        for tenant_id in range(1, args.tenants + 1):
+            data: dict = generate_tenant(size_from_arguments(args), seed=tenant_id)
+            data["group_scripts"]["scripts"][0]["body"] += f"\nString needle = \"needle-{tenant_id}\";"
+            local_directory: str = os.path.join(directory, f"tenant-{tenant_id}")
+            os.mkdir(local_directory)
+            with MockSuperOffice(data) as mock:
+                tenant: dict = dict(mock.tenant(local_directory), id=tenant_id, tenant_name=f"Tenant {tenant_id}")
+                start: float = time.perf_counter()
+                result: dict = service.fetch(tenant, search_index=index)
+                print(f"Fetched and indexed tenant {tenant_id} in {time.perf_counter() - start:.2f}s "
+                      f"({result['index']['added']} scripts)")
+
+        print(f"{'search':>24} {'matches':>8} {'index (ms)':>11} {'files (ms)':>11}")
+        for label, pattern, regex in [("rare substring", "needle-3", False), ("common substring", "value 1", False),
+                                      ("regular expression", r"s\d+ = \"value 9", True)]:
+            start: float = time.perf_counter()
+            matches: int = len(index.grep(pattern, regex=regex))
+            index_ms: float = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            file_matches: int = walk_grep(directory, re.compile(pattern if regex else re.escape(pattern)))
+            files_ms: float = (time.perf_counter() - start) * 1000
+
+            assert matches == file_matches, (matches, file_matches)
+            print(f"{label:>24} {matches:>8} {index_ms:>11.1f} {files_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+A local HTTP stand-in for SuperOffice's customer.fcgi, serving a synthetic tenant the way the fetcher script would.
+
+Only the groups whose fetch option is "True" in the query string are returned, and the response is gzipped
+if the client accepts it, like SuperOffice's web server does. Paged requests (see core/paged_fetch.py) are
+answered like fetcher script version 5 does. Used by bench_fetch.py, and by tests that want to go through
+real HTTP.
+
+Run from the repo root to serve a tenant until Ctrl+C:
+    python -m benchmarks.mock_superoffice --scripts 5000 --screens 1000
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+from dataclasses import fields
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core.data_creator import GROUP_CREATORS
+from core.fetch_service import CURRENT_CRMSCRIPT_VERSION
+from core.paged_fetch import PAGED_LISTS
+
+INCLUDE_ID: str = "crmscript-fetcher"
+KEY: str = "benchmark-key"
+
+
+class MockSuperOffice:
+    """
+    Serves data on a free port on localhost, in a background thread. Use as a context manager, or call
+    start() and stop(). latency is seconds to wait before responding, to mimic SuperOffice building the JSON.
+    """
+    def __init__(self, data: dict, latency: float = 0, compress: bool = True):
+        self.data: dict = dict(data, script_version=CURRENT_CRMSCRIPT_VERSION)
+        self.latency: float = latency
+        self.compress: bool = compress
+        self.requests: int = 0
+        self.pages: list[dict[str, str]] = []  # The list, after_id and limit of each page requested
+        self.drop_pages: set[int] = set()  # Indexes in pages of the page requests to drop the connection of half-way
+        self.max_page_rows: int | None = None  # Rows a page has at most, whatever its limit, like a capped search
+        self.server: ThreadingHTTPServer | None = None
+        self.thread: threading.Thread | None = None
+
+        # Key = The enabled fetch options. Value = The response body, since serializing is slow for large tenants.
+        self.bodies: dict[frozenset[str], bytes] = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "MockSuperOffice":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tenant(self, local_directory: str, **fetch_options: bool) -> dict:
+        """Returns a tenant fetching from this server into local_directory, with every fetch option enabled."""
+        options: dict[str, bool] = {option: True for option, _, _ in GROUP_CREATORS.values()}
+        options.update(fetch_options)
+        return {"id": 1, "tenant_name": "Benchmark", "url": self.url, "include_id": INCLUDE_ID, "key": KEY,
+                "local_directory": local_directory, "fetch_options": options}
+
+    def start(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def body(self, enabled_options: frozenset[str]) -> bytes:
+        """Returns the compact JSON response for the enabled fetch options."""
+        with self.lock:
+            if enabled_options not in self.bodies:
+                response: dict = {"script_version": self.data["script_version"]}
+                for group_key, (option, _, _) in GROUP_CREATORS.items():
+                    if option in enabled_options and group_key in self.data:
+                        response[group_key] = self.data[group_key]
+                self.bodies[enabled_options] = json.dumps(response, ensure_ascii=False,
+                                                          separators=(",", ":")).encode("utf-8")
+            return self.bodies[enabled_options]
+
+    def head_body(self, enabled_options: frozenset[str]) -> bytes:
+        """Returns the response to a paged fetch's first request: everything but the paged lists."""
+        response: dict = json.loads(self.body(enabled_options))
+        for group_key, lists in PAGED_LISTS.items():
+            for list_key in lists:
+                response.get(group_key, {}).pop(list_key, None)
+        return json.dumps(response, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def page_body(self, list_key: str, after_id: int, limit: int) -> bytes:
+        """Returns a page of list_key's rows, ordered by ID."""
+        group_key: str = next(group_key for group_key, lists in PAGED_LISTS.items() if list_key in lists)
+        rows: list[dict] = sorted((row for row in self.data.get(group_key, {}).get(list_key, [])
+                                   if row["id"] > after_id), key=lambda row: row["id"])
+        rows = rows[:min(limit, self.max_page_rows or limit)]
+        return json.dumps({"script_version": self.data["script_version"], list_key: rows},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def handler_class(self) -> type[BaseHTTPRequestHandler]:
+        mock: MockSuperOffice = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like SuperOffice
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                query: dict[str, list[str]] = parse_qs(url.query)
+                if (url.path != "/scripts/customer.fcgi" or query.get("action") != ["safeParse"]
+                        or query.get("includeId") != [INCLUDE_ID] or query.get("key") != [KEY]):
+                    self.send_error(404)
+                    return
+
+                with mock.lock:
+                    mock.requests += 1
+                time.sleep(mock.latency)
+
+                enabled: frozenset[str] = frozenset(option for option, values in query.items() if values == ["True"])
+                drop: bool = False
+                if "list" in query:
+                    page: dict[str, str] = {key: query[key][0] for key in ("list", "after_id", "limit")}
+                    with mock.lock:
+                        drop = len(mock.pages) in mock.drop_pages
+                        mock.pages.append(page)
+                    body: bytes = mock.page_body(page["list"], int(page["after_id"]), int(page["limit"]))
+                elif query.get("paged") == ["True"]:
+                    body = mock.head_body(enabled)
+                else:
+                    body = mock.body(enabled)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                if mock.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=6)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if drop:
+                    # Like a VPN dropping half-way through the response
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass  # Keep benchmark output readable
+
+        return Handler
+
+
+def add_size_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds a --<count> argument for every TenantSize field."""
+    for field in fields(TenantSize):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=int, default=field.default)
+
+
+def size_from_arguments(args: argparse.Namespace) -> TenantSize:
+    return TenantSize(**{field.name: getattr(args, field.name) for field in fields(TenantSize)})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_size_arguments(parser)
+    parser.add_argument("--latency", type=float, default=0, help="Seconds to wait before each response")
+    args = parser.parse_args()
+
+    with MockSuperOffice(generate_tenant(size_from_arguments(args)), latency=args.latency) as mock:
+        print(f"Serving on {mock.url} with include ID {INCLUDE_ID!r} and key {KEY!r}. Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
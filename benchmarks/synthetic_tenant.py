@@ -0,0 +1,190 @@
+"""
+Generates synthetic fetcher script responses (script version 2 JSON, as a dict) of a configurable size.
+
+Shapes and field names mirror what crmscript_fetcher.crmscript returns, so the result can be fed
+straight into DataCreator, or served over HTTP as a stand-in for SuperOffice.
+Output is deterministic for the same arguments.
+"""
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class TenantSize:
+    """Counts of each kind of record in a synthetic tenant."""
+    script_folders: int = 50
+    scripts: int = 1000
+    script_body_size: int = 2000
+    triggers: int = 100
+    screen_folders: int = 20
+    screens: int = 200
+    elements_per_screen: int = 10
+    item_configs_per_element: int = 3
+    buttons_per_screen: int = 2
+    screen_choosers: int = 50
+    scheduled_tasks: int = 20
+    extra_table_folders: int = 10
+    extra_tables: int = 100
+    fields_per_extra_table: int = 10
+
+
+def _body(rng: random.Random, size: int) -> str:
+    """Returns a CRMScript-looking body of roughly the given size."""
+    lines: list[str] = []
+    length: int = 0
+    while length < size:
+        line: str = f'String s{rng.randrange(1000)} = "value {rng.randrange(100000)}"; // ÆØÅ æøå'
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def _folders(rng: random.Random, count: int, domain: int, name: str) -> list[dict]:
+    """Returns count hierarchy folders, each a child of the root or of an earlier folder."""
+    folders: list[dict] = []
+    for i in range(1, count + 1):
+        parent_id: int = -1 if i == 1 or rng.random() < 0.3 else rng.randrange(1, i)
+        folders.append({"id": i, "name": f"{name} {i}", "fullname": f"{name} {i}", "domain": domain,
+                        "parent_id": parent_id})
+    return folders
+
+
+def _hierarchy_id(rng: random.Random, folder_count: int) -> int:
+    return -1 if folder_count == 0 or rng.random() < 0.1 else rng.randrange(1, folder_count + 1)
+
+
+def generate_group_scripts(size: TenantSize, rng: random.Random) -> dict:
+    scripts: list[dict] = []
+    for i in range(1, size.scripts + 1):
+        scripts.append({
+            "id": i, "hierarchy_id": _hierarchy_id(rng, size.script_folders), "description": f"Script {i}",
+            "unique_identifier": f"script-{i}", "registered": "2024-01-01 10:00:00", "registered_associate_id": 1,
+            "updated": "2024-06-01 10:00:00", "updated_associate_id": 1, "include_id": f"script_{i}",
+            "access_key": "", "body": _body(rng, size.script_body_size),
+        })
+    return {"script_folders": _folders(rng, size.script_folders, 3, "Script folder"), "scripts": scripts}
+
+
+def generate_group_triggers(size: TenantSize, rng: random.Random) -> dict:
+    triggers: list[dict] = []
+    for i in range(1, size.triggers + 1):
+        triggers.append({
+            "id": i, "screen_type": rng.randrange(1, 50), "description": f"Trigger {i}", "enabled": 1,
+            "unique_identifier": f"trigger-{i}", "registered": "2024-01-01 10:00:00", "registered_associate_id": 1,
+            "updated": "2024-06-01 10:00:00", "updated_associate_id": 1, "body": _body(rng, size.script_body_size),
+        })
+    return {"triggers": triggers}
+
+
+def generate_group_screens(size: TenantSize, rng: random.Random) -> dict:
+    screens: list[dict] = []
+    actions: list[dict] = []
+    elements: list[dict] = []
+    item_configs: list[dict] = []
+    hidden: list[dict] = []
+    languages: list[dict] = []
+
+    for screen_id in range(1, size.screens + 1):
+        screens.append({
+            "id": screen_id, "name": f"Screen {screen_id}", "id_string": f"screen_{screen_id}",
+            "hierarchy_id": _hierarchy_id(rng, size.screen_folders), "screen_key": "", "layout_model": "",
+            "load_script_body": _body(rng, 200), "load_post_cgi_script_body": "", "load_final_script_body": "",
+            "creation_script": "", "warn_on_navigate": False, "description": "", "autosave": False,
+        })
+        for button in range(size.buttons_per_screen):
+            actions.append({"id": len(actions) + 1, "screen_definition": screen_id,
+                            "button": ["OK", "Cancel", "Save", "Delete"][button % 4],
+                            "ejscript_body": _body(rng, 200), "do_check": True})
+        for _ in range(size.elements_per_screen):
+            element_id: int = len(elements) + 1
+            elements.append({"id": element_id, "name": f"element{element_id}", "screen_definition": screen_id,
+                             "element_type": rng.randrange(1, 30), "description": "", "creation_script": "",
+                             "order_pos": element_id, "base_table": "", "hide": False})
+            for config in range(size.item_configs_per_element):
+                item_configs.append({"id": len(item_configs) + 1, "domain": 1, "item_id": element_id,
+                                     "item_name": f"config.{config}", "item_value": f"value {config}"})
+        hidden.append({"id": screen_id, "screen_definition": screen_id, "variable": "hidden"})
+        languages.append({"id": screen_id, "screen_definition": screen_id, "language": "en",
+                          "variable_name": "label", "variable_value": "Label"})
+
+    # item_config comes back from SuperOffice in id order, not grouped by element
+    rng.shuffle(item_configs)
+
+    return {
+        "screen_folders": _folders(rng, size.screen_folders, 2, "Screen folder"),
+        "screen_definition": screens,
+        "screen_definition_action": actions,
+        "screen_definition_element": elements,
+        "item_config": item_configs,
+        "screen_definition_hidden": hidden,
+        "screen_definition_language": languages,
+    }
+
+
+def generate_group_screen_choosers(size: TenantSize, rng: random.Random) -> dict:
+    screen_choosers: list[dict] = []
+    for i in range(1, size.screen_choosers + 1):
+        screen_choosers.append({
+            "id": i, "screen_target": rng.randrange(0, 10), "screen_type": rng.randrange(1, 50),
+            "description": f"Screen chooser {i}", "enabled": 1, "unique_identifier": f"sc-{i}",
+            "registered": "2024-01-01 10:00:00", "registered_associate_id": 1, "updated": "2024-06-01 10:00:00",
+            "updated_associate_id": 1, "body": _body(rng, size.script_body_size),
+        })
+    return {"screen_choosers": screen_choosers}
+
+
+def generate_group_scheduled_tasks(size: TenantSize, rng: random.Random) -> dict:
+    tasks: list[dict] = []
+    schedules: list[dict] = []
+    for i in range(1, size.scheduled_tasks + 1):
+        tasks.append({"id": i, "script_id": i, "script_id.description": f"Script {i}", "schedule_id": i,
+                      "description": f"Task {i}"})
+        schedules.append({
+            "id": i, "domain": 1, "status": 1, "frequency": 2, "asap": False, "disabled": False, "stop": False,
+            "name": f"Schedule {i}", "after_schedule_id": 0, "minute_interval": 60, "weekdays": 127, "months": 4095,
+            "min_of_hour": 0, "day_of_month": 0, "time_of_day": "", "once_at": "", "next_execution": "",
+            "last_execution": "", "execution_time": 0, "lock_expire": "", "lock_pid": 0, "lock_ttl": 0,
+            "error_message": "", "last_error": "", "retries": 0, "retry_interval": 0,
+        })
+    rng.shuffle(schedules)
+    return {"scheduled_task": tasks, "schedule": schedules}
+
+
+def generate_group_extra_tables(size: TenantSize, rng: random.Random) -> dict:
+    tables: list[dict] = []
+    fields: list[dict] = []
+    for table_id in range(1, size.extra_tables + 1):
+        tables.append({
+            "id": table_id, "table_name": f"y_table_{table_id}", "name": f"Table {table_id}", "search_header": "",
+            "view_entry_header": "", "new_entry_header": "", "edit_entry_header": "",
+            "hierarchy_id": _hierarchy_id(rng, size.extra_table_folders), "sort_order": "", "display_field": "",
+            "flags": 0, "parent_field": "", "fullname_field": 0, "screen_chooser_entry": 0,
+            "screen_chooser_all": 0, "screen_chooser_edit": 0, "description": "",
+        })
+        for _ in range(size.fields_per_extra_table):
+            fields.append({"id": len(fields) + 1, "domain": 0, "extra_table": table_id, "target_extra_table": 0,
+                           "field_name": f"x_field_{len(fields) + 1}", "name": "Field", "default_value": "",
+                           "type": 1, "flags": 0, "order_pos": 0, "description": ""})
+
+    # Extra fields on the default tables (contact, company, ...)
+    for domain in [1, 2, 4, 8, 32, 64, 128, 256]:
+        fields.append({"id": len(fields) + 1, "domain": domain, "extra_table": 0, "target_extra_table": 0,
+                       "field_name": f"x_default_{domain}", "name": "Field", "default_value": "", "type": 1,
+                       "flags": 0, "order_pos": 0, "description": ""})
+
+    return {"extra_table_folders": _folders(rng, size.extra_table_folders, 1, "Table folder"),
+            "extra_tables": tables, "extra_fields": fields}
+
+
+def generate_tenant(size: TenantSize, seed: int = 0) -> dict:
+    """Returns a synthetic script version 2 response with every group, as returned by json.loads()."""
+    rng = random.Random(seed)
+    return {
+        "script_version": 2,
+        "group_scripts": generate_group_scripts(size, rng),
+        "group_triggers": generate_group_triggers(size, rng),
+        "group_screens": generate_group_screens(size, rng),
+        "group_screen_choosers": generate_group_screen_choosers(size, rng),
+        "group_scheduled_tasks": generate_group_scheduled_tasks(size, rng),
+        "group_extra_tables": generate_group_extra_tables(size, rng),
+    }
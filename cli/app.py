@@ -25,10 +25,14 @@ _LOGO = """
   \\___|_|  |_| |_| |_|_| \\___|\\__\\___|_| |_|
 """.strip("\n")
 
-# get_current_version() is called once here, at CLI startup - each `crmfetch`
-# invocation is a fresh process, so this always reflects the installed
-# pyproject.toml, same as --version does.
-_VERSION_LINE = f"  v{get_current_version()} - https://github.com/ehs5/crmscript_fetcher"
+
+def _version_line() -> str:
+    # Only built for the splash, not at import - reading pyproject.toml would
+    # otherwise add to the startup of every command. Each `crmfetch`
+    # invocation is a fresh process, so this always reflects the installed
+    # pyproject.toml, same as --version does.
+    return f"  v{get_current_version()} - https://github.com/ehs5/crmscript_fetcher"
+
 
 # Shown on `crmfetch --help` (and any subcommand's --help) - no logo/version
 # here on purpose, unlike the bare-invocation splash below: --help is the
@@ -50,7 +54,7 @@ def _print_splash() -> int:
     # --help specifically. No docstring here on purpose: cyclopts would
     # otherwise render it as the app's own description text.
     app.help_prologue = (
-        f"{_LOGO}\n\n{_VERSION_LINE}\n\n"
+        f"{_LOGO}\n\n{_version_line()}\n\n"
         "  Run a command with --help for its details, e.g. 'crmfetch add --help'."
     )
     # Version's already right there in the banner above - no need to also
@@ -98,14 +102,17 @@ def _print_error(message: str) -> None:
 # Imported for their registration side effects (each decorates commands onto
 # `app` above) - must happen after `app`/`_print_error` are defined, since
 # both modules import them back from here.
-from cli import tenant_commands, settings_commands, script_commands  # noqa: E402,F401
+from cli import tenant_commands, settings_commands, script_commands, snapshot_commands  # noqa: E402,F401
+from cli import search_commands, watch_commands, metadata_commands  # noqa: E402,F401
 
 # Cyclopts sorts commands alphabetically by default; this pins an explicit
-# order instead - show sits with the other tenant-lookup commands, right
-# after fetch, rather than alphabetically after list, and script sits near
-# the bottom, right before settings.
+# order instead - watch sits right after fetch, show with the other
+# tenant-lookup commands rather than alphabetically after list, grep, find
+# and meta sit with search, and script and snapshots sit near the bottom,
+# right before settings.
 for _sort_key, _command_name in enumerate(
-    ["add", "delete", "edit", "fetch", "show", "list", "search", "script", "settings"]
+    ["add", "delete", "edit", "fetch", "watch", "show", "list", "search", "grep", "find", "meta", "script",
+     "snapshots", "settings"]
 ):
     app[_command_name].sort_key = _sort_key
     # help_prologue would otherwise be inherited from app onto every
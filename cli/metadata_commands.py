@@ -0,0 +1,37 @@
+"""
+The `crmfetch meta` command: prints the metadata of a fetched script, trigger
+or screen chooser, whichever metadata layout its tenant is fetched with.
+Registered onto cli.app's `app` object by being imported from there - see the
+bottom of cli/app.py.
+"""
+import json
+from pathlib import Path
+
+from cli.app import app, _print_error
+from core.data_creation.metadata import read_metadata
+
+
+@app.command(name="meta")
+def print_metadata(path: Path) -> int:
+    """Prints the metadata of a fetched .crmscript file as JSON.
+
+    Reads it from the .json file next to it, or from its folder's
+    _index.json when the tenant is fetched with --metadata-layout index.
+
+    Parameters
+    ----------
+    path: Path
+        The .crmscript file of a script, trigger or screen chooser.
+    """
+    try:
+        metadata: dict | None = read_metadata(str(path))
+    except (OSError, ValueError) as e:
+        _print_error(f"Could not read the metadata of {path}: {e}")
+        return 1
+
+    if metadata is None:
+        _print_error(f"{path} has no metadata. Only scripts, triggers and screen choosers have.")
+        return 1
+
+    print(json.dumps(metadata, indent=4, ensure_ascii=False))
+    return 0
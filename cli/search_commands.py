@@ -0,0 +1,127 @@
+"""
+The `crmfetch grep` and `crmfetch find` commands: search the scripts of every
+tenant fetched with crmfetch fetch --index, without reading their files.
+Registered onto cli.app's `app` object by being imported from there - see the
+bottom of cli/app.py.
+"""
+import re
+from typing import Annotated
+from typing import TYPE_CHECKING
+
+import cyclopts
+
+from cli import tenant_commands
+from cli.app import app, _print_error
+
+# sqlite3 is only imported by the commands using the index, see tenant_commands._resolve_search_index()
+if TYPE_CHECKING:
+    from core.search_index import SearchIndex
+
+
+def _check_kinds(kinds: list[str] | None) -> bool:
+    """Returns False after printing an error if any of kinds is unknown."""
+    from core.search_index import SEARCH_KINDS
+    unknown: list[str] = [kind for kind in kinds or [] if kind not in SEARCH_KINDS]
+    if unknown:
+        _print_error(f"Unknown --kind {', '.join(unknown)}. Use one of {', '.join(SEARCH_KINDS)}.")
+        return False
+    return True
+
+
+def _check_indexed(index: "SearchIndex") -> bool:
+    """Returns False after printing an error if no tenant has been indexed yet."""
+    if not index.tenants():
+        _print_error("No tenants are indexed yet. Fetch them with crmfetch fetch --index first.")
+        return False
+    return True
+
+
+def _describe(document: dict) -> str:
+    return f"{document['tenant_name']}/{document['kind']}/{document['name']} (ID {document['object_id']})"
+
+
+@app.command(name="grep")
+def grep_scripts(
+    pattern: str,
+    *,
+    tenant: Annotated[list[int] | None, cyclopts.Parameter(name="--tenant")] = None,
+    kind: list[str] | None = None,
+    ignore_case: Annotated[bool, cyclopts.Parameter(name=["--ignore-case", "-i"])] = False,
+    regex: Annotated[bool, cyclopts.Parameter(name=["--regex", "-E"])] = False,
+    files_with_matches: Annotated[bool, cyclopts.Parameter(name=["--files-with-matches", "-l"])] = False,
+) -> int:
+    """Prints every line of the indexed scripts that contains a text.
+
+    Covers scripts, triggers, screen choosers, screen scripts and screen
+    buttons of every tenant fetched with crmfetch fetch --index.
+
+    Parameters
+    ----------
+    pattern: str
+        The text to look for, e.g. a table, function or include ID.
+    tenant: list[int] | None
+        Only search this tenant ID. Repeat for several tenants.
+    kind: list[str] | None
+        Only search this kind: script, trigger, screen, screen_button or
+        screen_chooser. Repeat for several kinds.
+    ignore_case: bool
+        Match regardless of upper/lower case.
+    regex: bool
+        Treat pattern as a regular expression. Slower, since every script
+        is searched instead of only those the index finds.
+    files_with_matches: bool
+        Only print each script that matches, not its matching lines.
+    """
+    if not _check_kinds(kind):
+        return 2
+
+    index: "SearchIndex" = tenant_commands._resolve_search_index()
+    if not _check_indexed(index):
+        return 1
+
+    try:
+        matches: list[dict] = index.grep(pattern, tenant, kind, ignore_case=ignore_case, regex=regex)
+    except re.error as e:
+        _print_error(f"Invalid regular expression: {e}")
+        return 2
+
+    printed: set[str] = set()
+    for match in matches:
+        description: str = _describe(match)
+        if not files_with_matches:
+            print(f"{description}:{match['line_number']}: {match['line'].strip()}")
+        elif description not in printed:
+            printed.add(description)
+            print(description)
+    return 0
+
+
+@app.command(name="find")
+def find_scripts(
+    name: str,
+    *,
+    tenant: Annotated[list[int] | None, cyclopts.Parameter(name="--tenant")] = None,
+    kind: list[str] | None = None,
+) -> int:
+    """Lists the indexed scripts whose name contains a text, case-insensitive.
+
+    Parameters
+    ----------
+    name: str
+        Part of the name of the script, trigger, screen or screen chooser.
+    tenant: list[int] | None
+        Only search this tenant ID. Repeat for several tenants.
+    kind: list[str] | None
+        Only search this kind: script, trigger, screen, screen_button or
+        screen_chooser. Repeat for several kinds.
+    """
+    if not _check_kinds(kind):
+        return 2
+
+    index: "SearchIndex" = tenant_commands._resolve_search_index()
+    if not _check_indexed(index):
+        return 1
+
+    for document in index.find(name, tenant, kind):
+        print(_describe(document))
+    return 0
@@ -0,0 +1,155 @@
+"""
+The `crmfetch snapshots` command group: list/restore/diff the snapshots
+crmfetch fetch --snapshot saves. Registered onto cli.app's `app` object by
+being imported from there - see the bottom of cli/app.py.
+"""
+import difflib
+import os
+import sys
+from typing import Annotated
+from typing import TYPE_CHECKING
+
+import cyclopts
+
+from cli import tenant_commands
+from cli.app import app, _print_error
+from core.tenant_service import TenantService
+
+# Only imported by these commands, see tenant_commands._resolve_snapshot_store()
+if TYPE_CHECKING:
+    from core.snapshot_store import SnapshotStore
+
+snapshots_app = cyclopts.App(
+    name="snapshots",
+    help="List, restore and compare snapshots saved by crmfetch fetch --snapshot.",
+)
+app.command(snapshots_app)
+
+
+def _get_tenant(tenant_id: int) -> dict | None:
+    """Returns the tenant, or None after printing an error."""
+    service: TenantService | None = tenant_commands._resolve_tenant_service()
+    if service is None:
+        return None
+
+    try:
+        return service.get_tenant_by_id(tenant_id)
+    except ValueError as e:
+        _print_error(str(e))
+        return None
+
+
+def _read_lines(store: "SnapshotStore", manifest: dict, tenant: dict, path: str) -> list[str]:
+    """Returns a file's lines as they are in manifest - read from disk for the "local" manifest."""
+    if path not in manifest["files"]:
+        return []
+    if manifest["id"] == "local":
+        with open(os.path.join(tenant["local_directory"], path), "rb") as f:
+            data: bytes = f.read()
+    else:
+        data = store.read_object(manifest["files"][path])
+    return data.decode("utf-8", errors="replace").splitlines(keepends=True)
+
+
+@snapshots_app.command(name="list")
+def snapshots_list(tenant_id: int) -> int:
+    """Lists a tenant's snapshots, oldest first.
+
+    Parameters
+    ----------
+    tenant_id: int
+        The tenant's numeric ID.
+    """
+    tenant: dict | None = _get_tenant(tenant_id)
+    if tenant is None:
+        return 1
+
+    for manifest in tenant_commands._resolve_snapshot_store().list_snapshots(tenant["id"]):
+        print(f"{manifest['id']}  {manifest['created']}  {len(manifest['files'])} files")
+    return 0
+
+
+@snapshots_app.command(name="restore")
+def snapshots_restore(tenant_id: int, snapshot_id: str, *, to: str | None = None) -> int:
+    """Restores a snapshot's folders, only writing files that differ.
+
+    Parameters
+    ----------
+    tenant_id: int
+        The tenant's numeric ID.
+    snapshot_id: str
+        ID from crmfetch snapshots list, or latest.
+    to: str | None
+        Directory to restore into. Defaults to the tenant's local directory,
+        replacing what the last fetch put there.
+    """
+    tenant: dict | None = _get_tenant(tenant_id)
+    if tenant is None:
+        return 1
+
+    store: "SnapshotStore" = tenant_commands._resolve_snapshot_store()
+    try:
+        manifest: dict = store.get_manifest(tenant["id"], snapshot_id)
+    except ValueError as e:
+        _print_error(str(e))
+        return 1
+
+    directory: str = to or tenant["local_directory"]
+    try:
+        os.makedirs(directory, exist_ok=True)
+        counts: dict[str, int] = store.restore(manifest, directory)
+    except OSError as e:
+        _print_error(f"Could not restore snapshot {manifest['id']}: {e}")
+        return 1
+
+    print(f"Restored snapshot {manifest['id']} to {directory}: {counts['added']} added, "
+          f"{counts['changed']} changed, {counts['removed']} removed, {counts['unchanged']} unchanged.")
+    return 0
+
+
+@snapshots_app.command(name="diff")
+def snapshots_diff(
+    tenant_id: int,
+    old: str,
+    new: str = "local",
+    *,
+    patch: Annotated[bool, cyclopts.Parameter(name=["--patch", "-p"])] = False,
+) -> int:
+    """Lists the files added, removed and changed between two snapshots.
+
+    Parameters
+    ----------
+    tenant_id: int
+        The tenant's numeric ID.
+    old: str
+        ID of the snapshot to compare from, or latest.
+    new: str
+        ID of the snapshot to compare to, or latest. Defaults to what is in
+        the tenant's local directory now.
+    patch: bool
+        Print a unified diff of each changed file too.
+    """
+    tenant: dict | None = _get_tenant(tenant_id)
+    if tenant is None:
+        return 1
+
+    store: "SnapshotStore" = tenant_commands._resolve_snapshot_store()
+    try:
+        old_manifest: dict = store.get_manifest(tenant["id"], old)
+        new_manifest: dict = (store.current_manifest(tenant, old_manifest["folder_names"]) if new == "local"
+                              else store.get_manifest(tenant["id"], new))
+    except ValueError as e:
+        _print_error(str(e))
+        return 1
+
+    changes: dict[str, list[str]] = store.diff(old_manifest, new_manifest)
+    for marker, key in [("A", "added"), ("D", "removed"), ("M", "changed")]:
+        for path in changes[key]:
+            print(f"{marker} {path}")
+
+    if patch:
+        for path in changes["added"] + changes["removed"] + changes["changed"]:
+            sys.stdout.writelines(difflib.unified_diff(
+                _read_lines(store, old_manifest, tenant, path), _read_lines(store, new_manifest, tenant, path),
+                f"{old_manifest['id']}/{path}", f"{new_manifest['id']}/{path}"))
+    return 0
@@ -6,16 +6,27 @@ cli/app.py.
 import json
 from pathlib import Path
 from typing import Annotated
+from typing import TYPE_CHECKING
 
 import cyclopts
-from rich.console import Console
 
 from cli.app import app, _print_error
 from cli.cli_config import CliConfig
-from core.fetch_service import FetchService
+from core.data_creation.metadata import METADATA_LAYOUTS
 from core.tenant_service import TenantService
+from core.tracing import Tracer
+from core.tracing import use_tracer
 from core.utility import set_verbose
 
+# Only fetch needs these, and importing them (requests and rich in particular)
+# would add to the startup of every other command - they're imported inside
+# the functions using them instead. The same goes for the snapshot store and
+# search index (sqlite3), only needed by fetch and the commands using them.
+if TYPE_CHECKING:
+    from core.fetch_service import FetchService
+    from core.search_index import SearchIndex
+    from core.snapshot_store import SnapshotStore
+
 _NO_SETTINGS_MESSAGE = (
     "No active tenant_settings.json is configured. "
     "Run 'crmfetch settings set <path>' to point at an existing file, "
@@ -28,7 +39,17 @@ _NO_SETTINGS_MESSAGE = (
 # path; that path is the GUI's, and using it here is exactly the bug this
 # pointer exists to fix (see ticket 05).
 tenant_service: TenantService | None = None
-fetch_service = FetchService()
+
+# Also built lazily, by _resolve_fetch_service(), for the startup reason above.
+fetch_service: "FetchService | None" = None
+
+# Shared by every tenant, so identical files across tenants are only stored once.
+# Built lazily by _resolve_snapshot_store(), and replaced in tests, like tenant_service.
+snapshot_store: "SnapshotStore | None" = None
+
+# Also shared by every tenant, so crmfetch grep/find search all of them at once.
+# Built lazily by _resolve_search_index().
+search_index: "SearchIndex | None" = None
 
 
 def _tenant_summary(tenant: dict) -> str:
@@ -58,6 +79,35 @@ def _tenant_detail(tenant: dict) -> str:
     return "\n".join(lines)
 
 
+def _resolve_fetch_service() -> "FetchService":
+    """Returns the module-level FetchService, building it the first time a fetch needs it."""
+    global fetch_service
+    if fetch_service is None:
+        from core.fetch_service import FetchService
+        fetch_service = FetchService()
+    return fetch_service
+
+
+def _resolve_snapshot_store() -> "SnapshotStore":
+    """Returns the module-level SnapshotStore, building it the first time a command needs it."""
+    global snapshot_store
+    if snapshot_store is None:
+        import platformdirs
+        from core.snapshot_store import SnapshotStore
+        snapshot_store = SnapshotStore(Path(platformdirs.user_data_dir("crmfetch")) / "snapshots")
+    return snapshot_store
+
+
+def _resolve_search_index() -> "SearchIndex":
+    """Returns the module-level SearchIndex, building it the first time a command needs it."""
+    global search_index
+    if search_index is None:
+        import platformdirs
+        from core.search_index import SearchIndex
+        search_index = SearchIndex(Path(platformdirs.user_data_dir("crmfetch")) / "search_index.sqlite")
+    return search_index
+
+
 def _resolve_tenant_service() -> TenantService | None:
     """
     Returns the module-level TenantService, resolving it from the CLI's
@@ -160,36 +210,179 @@ def show_tenant(tenant_id: int, *, json_output: Annotated[bool, cyclopts.Paramet
 
 
 @app.command(name="fetch")
-def fetch_tenant(tenant_id: int, *, verbose: bool = False) -> int:
+def fetch_tenant(
+    tenant_id: int | None = None,
+    *,
+    all_tenants: Annotated[bool, cyclopts.Parameter(name="--all")] = False,
+    ids: str | None = None,
+    match: str | None = None,
+    jobs: int = 4,
+    verbose: bool = False,
+    stream: bool = False,
+    sync: bool = False,
+    delta: bool = False,
+    parallel: bool = False,
+    timings: bool = False,
+    trace_file: Path | None = None,
+    snapshot: bool = False,
+    archive: Path | None = None,
+    index: bool = False,
+    paged: bool = False,
+) -> int:
     """Fetches from the given tenant ID into its specified directory.
 
+    Fetch several tenants at once with --all, --ids or --match instead of
+    a tenant ID - they run concurrently, and a summary table is printed
+    at the end.
+
     Parameters
     ----------
-    tenant_id: int
+    tenant_id: int | None
         The tenant's numeric ID, e.g. crmfetch fetch 3. Run crmfetch list
         to see available IDs.
+    all_tenants: bool
+        Fetch every configured tenant.
+    ids: str | None
+        Comma-separated tenant IDs to fetch, e.g. --ids 1,4,7.
+    match: str | None
+        Fetch every tenant whose name or URL contains this, case-insensitive
+        (same matching as crmfetch search).
+    jobs: int
+        How many tenants to fetch at the same time with --all/--ids/--match.
     verbose: bool
         Print every file/folder as it's created instead of a quiet spinner.
+    stream: bool
+        Parse the response while it downloads, creating each group's files
+        as soon as it arrives - keeps memory use down on very large tenants.
+    sync: bool
+        Only write and delete the files that actually changed, leaving
+        unchanged files (and their modification times) untouched.
+    delta: bool
+        Only download the scripts, triggers and screen choosers changed
+        since the previous --delta fetch. The first one is a full fetch.
+        Needs fetcher script version 4 or later.
+    parallel: bool
+        Request each group (scripts, screens, tables...) separately and at
+        the same time, creating each one as soon as it arrives. Can't be
+        combined with --stream.
+    timings: bool
+        Print a table of how long each phase of the fetch took (request,
+        download, parse, each group, publishing folders...).
+    trace_file: Path | None
+        Save every timed phase to this file as a Chrome trace, which
+        Perfetto (ui.perfetto.dev), chrome://tracing and speedscope open.
+    snapshot: bool
+        Save the fetched files as a snapshot afterwards, to restore or diff
+        later with crmfetch snapshots. Files that haven't changed since an
+        earlier snapshot take no extra space.
+    archive: Path | None
+        Write the fetched folders into this .zip, .tar.gz or .tgz file
+        instead of the tenant's local directory, which is left untouched.
+        Can't be combined with --sync, --snapshot or several tenants.
+    index: bool
+        Update the search index crmfetch grep and crmfetch find use with
+        the fetched scripts. Only bodies that changed are re-indexed.
+    paged: bool
+        Download the largest lists (scripts, screens...) in pages, keeping
+        each page as it arrives, so a fetch interrupted by a dropped
+        connection continues where it stopped when run again. Needs fetcher
+        script version 5. Can't be combined with --stream or --parallel.
     """
+    selections: int = sum([tenant_id is not None, all_tenants, ids is not None, match is not None])
+    if selections != 1:
+        _print_error("Give exactly one of a tenant ID, --all, --ids or --match.")
+        return 2
+
+    if sum([stream, parallel, paged]) > 1:
+        _print_error("Give at most one of --stream, --parallel or --paged.")
+        return 2
+
+    if jobs < 1:
+        _print_error("--jobs must be at least 1.")
+        return 2
+
+    if archive and (sync or snapshot or tenant_id is None):
+        _print_error("--archive can't be combined with --sync, --snapshot, --all, --ids or --match.")
+        return 2
+
     service: TenantService | None = _resolve_tenant_service()
     if service is None:
         return 1
 
+    set_verbose(verbose)
+
+    fetch_kwargs: dict = _fetch_kwargs(stream=stream, sync=sync, delta=delta, parallel=parallel, snapshot=snapshot,
+                                       archive=archive, index=index, paged=paged)
+
+    tenants: list[dict] | None = None
+    if tenant_id is None:
+        tenants = _select_tenants(service, all_tenants, ids, match)
+        if tenants is None:
+            return 2
+
+    # Fetching itself doesn't change with tracing on - the spans are picked up from the active tracer
+    tracer: Tracer | None = Tracer() if timings or trace_file else None
+    with use_tracer(tracer):
+        if tenants is not None:
+            exit_code: int = _fetch_many(tenants, jobs, verbose, fetch_kwargs)
+        else:
+            exit_code = _fetch_one(service, tenant_id, verbose, fetch_kwargs)
+
+    if tracer and tracer.spans:
+        if timings:
+            _print_timings(tracer)
+        if trace_file:
+            tracer.save_chrome_trace(str(trace_file))
+            print(f"Saved trace to {trace_file}")
+    return exit_code
+
+
+def _fetch_kwargs(stream: bool = False, sync: bool = False, delta: bool = False, parallel: bool = False,
+                  snapshot: bool = False, archive: Path | None = None, index: bool = False,
+                  paged: bool = False) -> dict:
+    """
+    Returns the FetchService.fetch() keyword arguments for the fetch flags.
+    Only those actually set are included, so a plain fetch stays a plain
+    fetch_service.fetch(tenant) call.
+    """
+    fetch_kwargs: dict = {}
+    if stream:
+        fetch_kwargs["stream"] = True
+    if sync:
+        fetch_kwargs["sync"] = True
+    if delta:
+        fetch_kwargs["delta"] = True
+    if parallel:
+        fetch_kwargs["parallel"] = True
+    if snapshot:
+        fetch_kwargs["snapshot_store"] = _resolve_snapshot_store()
+    if archive:
+        fetch_kwargs["archive"] = str(archive)
+    if index:
+        fetch_kwargs["search_index"] = _resolve_search_index()
+    if paged:
+        fetch_kwargs["paged"] = True
+    return fetch_kwargs
+
+
+def _fetch_one(service: TenantService, tenant_id: int, verbose: bool, fetch_kwargs: dict) -> int:
+    """Fetches a single tenant and prints the outcome. Returns the exit code."""
     try:
         tenant: dict = service.get_tenant_by_id(tenant_id)
     except ValueError as e:
         _print_error(str(e))
         return 1
 
-    set_verbose(verbose)
-
     # A spinner would just get interleaved with --verbose's own file-by-file
     # output, so it's quiet-mode only - the thing it's replacing.
+    fetcher: FetchService = _resolve_fetch_service()
+    result: dict
     if verbose:
-        result: dict = fetch_service.fetch(tenant)
+        result = fetcher.fetch(tenant, **fetch_kwargs)
     else:
+        from rich.console import Console
         with Console().status(f"Fetching {tenant['tenant_name']}..."):
-            result: dict = fetch_service.fetch(tenant)
+            result = fetcher.fetch(tenant, **fetch_kwargs)
 
     if not result["success"]:
         _print_error(result["error"])
@@ -198,7 +391,158 @@ def fetch_tenant(tenant_id: int, *, verbose: bool = False) -> int:
     if result["info"]:
         print(result["info"])
 
-    print(f"Fetched {tenant['tenant_name']} successfully.")
+    archive: str | None = fetch_kwargs.get("archive") or tenant.get("archive_path")
+    if archive:
+        print(f"Fetched {tenant['tenant_name']} successfully into {archive}.")
+    else:
+        print(f"Fetched {tenant['tenant_name']} successfully.")
+
+    if "changes" in result:
+        changes: dict = result["changes"]
+        print(f"{changes['added']} files added, {changes['changed']} changed, "
+              f"{changes['removed']} removed, {changes['unchanged']} unchanged.")
+
+    if "collisions" in result:
+        print(f"{len(result['collisions'])} files were named with their ID, since another one in the same folder "
+              f"had the same name:")
+        for collision in result["collisions"]:
+            print(f"  {collision['directory']}/{collision['renamed']}")
+
+    if "retries" in result:
+        print(f"Retried file operations {result['retries']['retries']} times "
+              f"({result['retries']['seconds'] * 1000:.0f} ms spent waiting).")
+
+    if "delta" in result:
+        if result["delta"]["full"]:
+            print("Fetched everything - the next --delta fetch will only download changes.")
+        else:
+            print(f"Downloaded {result['delta']['changed_rows']} scripts/triggers/screen choosers "
+                  f"changed since {result['delta']['since']}.")
+
+    if "snapshot" in result:
+        print(f"Saved snapshot {result['snapshot']}.")
+
+    if "index" in result:
+        print(f"Search index: {result['index']['added']} scripts added, {result['index']['changed']} changed, "
+              f"{result['index']['removed']} removed.")
+
+    if "transfer" in result:
+        print(f"Received {_format_bytes(result['transfer']['wire_bytes'])} "
+              f"({_format_bytes(result['transfer']['decoded_bytes'])} decompressed).")
+    return 0
+
+
+def _print_timings(tracer: Tracer) -> None:
+    """Prints the time spent in each phase, nested phases indented under the ones they're part of."""
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(title="Timings")
+    table.add_column("Phase")
+    table.add_column("Calls", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Files", justify="right")
+    table.add_column("Written", justify="right")
+
+    for phase in tracer.summary():
+        amounts: dict = phase["amounts"]
+        table.add_row(
+            "  " * phase["depth"] + phase["name"],
+            str(phase["calls"]),
+            f"{phase['seconds']:.3f}",
+            str(amounts["files"]) if "files" in amounts else "",
+            _format_bytes(amounts["bytes"]) if "bytes" in amounts else "",
+        )
+
+    Console().print(table)
+
+
+def _format_bytes(size: int) -> str:
+    """Formats a byte count for humans, e.g. 1536 -> "1.5 KB"."""
+    if size < 1024:
+        return f"{size} bytes"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def _select_tenants(service: TenantService, all_tenants: bool, ids: str | None, match: str | None) -> list[dict] | None:
+    """
+    Returns the tenants picked by --all, --ids or --match. Returns None (after
+    printing an error) if --ids isn't a comma-separated list of known IDs.
+    """
+    if all_tenants:
+        return service.get_all_tenants()
+
+    if match is not None:
+        return service.search_tenants(match)
+
+    try:
+        tenant_ids: list[int] = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        _print_error(f"--ids must be comma-separated tenant IDs, e.g. --ids 1,4,7 (got '{ids}').")
+        return None
+
+    tenants: list[dict] = []
+    for selected_id in tenant_ids:
+        try:
+            tenants.append(service.get_tenant_by_id(selected_id))
+        except ValueError as e:
+            _print_error(f"{e}: {selected_id}")
+            return None
+    return tenants
+
+
+def _fetch_many(tenants: list[dict], jobs: int, verbose: bool, fetch_kwargs: dict) -> int:
+    """Fetches tenants concurrently and prints a summary table. Returns 1 if any of them failed."""
+    if not tenants:
+        print("No tenants matched - nothing to fetch.")
+        return 0
+
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    done: list[dict] = []
+    fetcher: FetchService = _resolve_fetch_service()
+
+    try:
+        if verbose:
+            results = fetcher.fetch_many(tenants, jobs, **fetch_kwargs)
+        else:
+            with console.status(f"Fetching {len(tenants)} tenants...") as status:
+                def on_result(tenant: dict, result: dict, seconds: float) -> None:
+                    done.append(tenant)
+                    status.update(f"Fetching {len(tenants)} tenants... {len(done)}/{len(tenants)} done")
+
+                results = fetcher.fetch_many(tenants, jobs, on_result=on_result, **fetch_kwargs)
+    except ValueError as e:
+        _print_error(str(e))
+        return 1
+
+    table = Table(title=f"Fetched {len(tenants)} tenants with up to {jobs} at a time")
+    table.add_column("ID", justify="right")
+    table.add_column("Tenant")
+    table.add_column("Result")
+    table.add_column("Duration", justify="right")
+    table.add_column("Details")
+
+    failures: int = 0
+    for tenant, result, seconds in results:
+        if result["success"]:
+            outcome: str = "[green]OK[/green]"
+            details: str = result["info"]
+        else:
+            failures += 1
+            outcome = "[red]Failed[/red]"
+            details = result["error"]
+        table.add_row(str(tenant["id"]), tenant["tenant_name"], outcome, f"{seconds:.1f} s", details)
+
+    console.print(table)
+
+    if failures:
+        _print_error(f"{failures} of {len(tenants)} tenants failed to fetch.")
+        return 1
     return 0
 
 
@@ -248,10 +592,6 @@ def add_tenant(
         _print_error(str(e))
         return 1
 
-    # Backfills default fetch_options onto the tenant we just added, same as
-    # today's add_missing_fetch_options quirk for legacy tenants.
-    service.add_missing_fetch_options(service.get_all_tenants())
-
     print(f"Added tenant {added['id']}: {added['tenant_name']}")
     return 0
 
@@ -265,6 +605,9 @@ def edit_tenant(
     include_id: str | None = None,
     key: str | None = None,
     local_dir: Annotated[str | None, cyclopts.Parameter(name="--local-dir")] = None,
+    archive_path: Annotated[str | None, cyclopts.Parameter(name="--archive-path")] = None,
+    watch_interval: float | None = None,
+    metadata_layout: str | None = None,
 ) -> int:
     """Updates a tenant.
 
@@ -284,7 +627,26 @@ def edit_tenant(
         New SuperOffice script key.
     local_dir: str | None
         New local directory CRMScripts are fetched into.
+    archive_path: str | None
+        Always fetch into this .zip, .tar.gz or .tgz file instead of the
+        local directory. Pass an empty string to go back to the directory.
+    watch_interval: float | None
+        Minutes between fetches of this tenant with crmfetch watch, instead
+        of its --interval. Pass 0 to go back to --interval.
+    metadata_layout: str | None
+        How the metadata of scripts, triggers and screen choosers is
+        fetched: sidecar (a .json file next to each .crmscript file, the
+        default) or index (a single _index.json per folder, half as many
+        files). crmfetch meta reads either.
     """
+    if watch_interval is not None and watch_interval < 0:
+        _print_error("--watch-interval can't be negative.")
+        return 2
+
+    if metadata_layout is not None and metadata_layout not in METADATA_LAYOUTS:
+        _print_error(f"--metadata-layout must be one of {', '.join(METADATA_LAYOUTS)}.")
+        return 2
+
     service: TenantService | None = _resolve_tenant_service()
     if service is None:
         return 1
@@ -305,6 +667,12 @@ def edit_tenant(
         tenant["key"] = key
     if local_dir is not None:
         tenant["local_directory"] = local_dir
+    if archive_path is not None:
+        tenant["archive_path"] = archive_path
+    if watch_interval is not None:
+        tenant["watch_interval"] = watch_interval
+    if metadata_layout is not None:
+        tenant["metadata_layout"] = metadata_layout
 
     try:
         service.update_tenant(tenant)
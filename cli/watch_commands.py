@@ -0,0 +1,191 @@
+"""
+The `crmfetch watch` command: keeps fetching tenants on their own intervals
+from one long-running process. Registered onto cli.app's `app` object by
+being imported from there - see the bottom of cli/app.py.
+"""
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated
+from typing import TYPE_CHECKING
+
+import cyclopts
+
+from cli import tenant_commands
+from cli.app import app, _print_error
+from core.tenant_service import TenantService
+from core.utility import set_verbose
+from core.watch import DEFAULT_INTERVAL_MINUTES
+from core.watch import DEFAULT_JITTER
+from core.watch import FetchScheduler
+
+if TYPE_CHECKING:
+    from core.fetch_service import FetchService
+
+
+def _print_result(tenant: dict, result: dict, seconds: float) -> None:
+    """Prints one line per finished fetch - errors to stderr, so they can be told apart when logged."""
+    prefix: str = f"{datetime.now():%Y-%m-%d %H:%M:%S} {tenant['tenant_name']}"
+    if result["success"]:
+        info: str = f" {result['info']}" if result["info"] else ""
+        print(f"{prefix}: fetched in {seconds:.1f} s.{info}", flush=True)
+    else:
+        print(f"{prefix}: failed after {seconds:.1f} s: {result['error']}", file=sys.stderr, flush=True)
+
+
+def _print_status(scheduler: FetchScheduler) -> None:
+    """Prints the outcome of every watched tenant's latest fetch."""
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(title="Watched tenants")
+    table.add_column("ID", justify="right")
+    table.add_column("Tenant")
+    table.add_column("Fetches", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Skipped", justify="right")
+    table.add_column("Last result")
+    table.add_column("Last duration", justify="right")
+
+    for status in scheduler.status():
+        if status["last_success"] is None:
+            outcome: str = ""
+        elif status["last_success"]:
+            outcome = "[green]OK[/green]"
+        else:
+            outcome = f"[red]Failed[/red] {status['last_error']}"
+        duration: str = f"{status['last_seconds']:.1f} s" if status["last_seconds"] is not None else ""
+        table.add_row(str(status["tenant_id"]), status["tenant_name"], str(status["runs"]), str(status["failures"]),
+                      str(status["skipped"]), outcome, duration)
+
+    Console().print(table)
+
+
+@app.command(name="watch")
+def watch_tenants(
+    *,
+    ids: str | None = None,
+    match: str | None = None,
+    interval: float = DEFAULT_INTERVAL_MINUTES,
+    jitter: float = DEFAULT_JITTER,
+    jobs: int = 4,
+    verbose: bool = False,
+    stream: bool = False,
+    sync: bool = False,
+    delta: bool = False,
+    parallel: bool = False,
+    snapshot: bool = False,
+    index: bool = False,
+    paged: bool = False,
+    status_file: Path | None = None,
+) -> int:
+    """Keeps fetching every tenant, each on its own interval, until stopped with Ctrl+C.
+
+    Unlike running crmfetch fetch from a scheduler, the connection pool and
+    the tenant settings stay loaded between fetches. A tenant whose
+    previous fetch is still running when it's due again is skipped until
+    the next time. Tenants added, edited or deleted meanwhile are picked up.
+
+    Parameters
+    ----------
+    ids: str | None
+        Only watch these comma-separated tenant IDs, e.g. --ids 1,4,7.
+    match: str | None
+        Only watch the tenants whose name or URL contains this,
+        case-insensitive (same matching as crmfetch search).
+    interval: float
+        Minutes between fetches of a tenant. Set a tenant's own interval
+        with crmfetch edit --watch-interval.
+    jitter: float
+        Make each interval randomly up to this fraction shorter or longer,
+        e.g. 0.1 for 10%, so tenants don't all fetch at the same moment.
+    jobs: int
+        How many tenants to fetch at the same time at most.
+    verbose: bool
+        Print every file/folder as it's created.
+    stream: bool
+        Parse each response while it downloads (see crmfetch fetch --stream).
+    sync: bool
+        Only write and delete the files that actually changed.
+    delta: bool
+        Only download what changed since the previous fetch.
+    parallel: bool
+        Request each group separately and at the same time.
+    snapshot: bool
+        Save a snapshot after every fetch.
+    index: bool
+        Update the search index after every fetch.
+    paged: bool
+        Download the largest lists in pages, so a fetch interrupted by a
+        dropped connection continues where it stopped the next time.
+    status_file: Path | None
+        Keep the duration and outcome of each tenant's latest fetch in this
+        JSON file, e.g. for monitoring.
+    """
+    if ids is not None and match is not None:
+        _print_error("Give at most one of --ids or --match.")
+        return 2
+
+    if sum([stream, parallel, paged]) > 1:
+        _print_error("Give at most one of --stream, --parallel or --paged.")
+        return 2
+
+    if jobs < 1:
+        _print_error("--jobs must be at least 1.")
+        return 2
+
+    if interval <= 0 or not 0 <= jitter < 1:
+        _print_error("--interval must be above 0, and --jitter between 0 and 1.")
+        return 2
+
+    service: TenantService | None = tenant_commands._resolve_tenant_service()
+    if service is None:
+        return 1
+
+    tenant_ids: set[int] | None = None
+    if ids is not None:
+        # Checked once up front - a tenant deleted later on is just no longer watched
+        tenants: list[dict] | None = tenant_commands._select_tenants(service, False, ids, None)
+        if tenants is None:
+            return 2
+        tenant_ids = {tenant["id"] for tenant in tenants}
+
+    def get_tenants() -> list[dict]:
+        # Cheap - TenantService only reads the settings file again once it has changed
+        if match is not None:
+            return service.search_tenants(match)
+        return [tenant for tenant in service.get_all_tenants() if tenant_ids is None or tenant["id"] in tenant_ids]
+
+    set_verbose(verbose)
+
+    # One FetchService, and with it one HTTP session and connection pool, for every fetch
+    fetch_service: FetchService = tenant_commands._resolve_fetch_service()
+    fetch_kwargs: dict = tenant_commands._fetch_kwargs(stream=stream, sync=sync, delta=delta, parallel=parallel,
+                                                       snapshot=snapshot, index=index, paged=paged)
+
+    def on_result(tenant: dict, result: dict, seconds: float) -> None:
+        _print_result(tenant, result, seconds)
+        if status_file:
+            try:
+                scheduler.save_status(str(status_file))
+            except OSError as e:
+                _print_error(f"Could not save {status_file}: {e}")
+
+    def on_error(e: Exception) -> None:
+        _print_error(f"Could not read the tenants to watch, trying again shortly: {e}")
+
+    scheduler = FetchScheduler(lambda tenant: fetch_service.fetch(tenant, **fetch_kwargs), get_tenants,
+                               interval_minutes=interval, jitter=jitter, jobs=jobs, on_result=on_result,
+                               on_error=on_error)
+
+    print(f"Watching tenants every {interval:g} minutes. Press Ctrl+C to stop.", flush=True)
+    try:
+        scheduler.run(threading.Event())
+    except KeyboardInterrupt:
+        print("Stopping - waiting for the running fetches to finish...", flush=True)
+    finally:
+        scheduler.close()
+
+    _print_status(scheduler)
+    return 0
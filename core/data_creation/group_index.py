@@ -0,0 +1,40 @@
+from typing import Any
+
+
+class GroupIndex:
+    """
+    Lookups over the record lists of one group from the fetcher script's JSON, e.g. group_screens.
+    Each lookup table is built once, in a single pass over its list, the first time it is needed.
+    This keeps creating a folder tree linear, instead of scanning every record again for each folder/screen.
+    """
+    def __init__(self, group: dict):
+        self.group: dict = group
+
+        # Key = (list key, field). Value = Records of that list grouped by their value of the field.
+        self._tables: dict[tuple[str, str], dict[Any, list[dict]]] = {}
+
+    def find(self, list_key: str, field: str, value: Any) -> list[dict]:
+        """
+        Returns the records in group[list_key] whose field equals value, in their original order.
+        Same as [r for r in group[list_key] if r.get(field) == value].
+        """
+        table: dict[Any, list[dict]] | None = self._tables.get((list_key, field))
+        if table is None:
+            table = self._build_table(list_key, field)
+
+        return table.get(value, [])
+
+    def find_one(self, list_key: str, field: str, value: Any) -> dict:
+        """Returns the first record in group[list_key] whose field equals value. Raises KeyError if none."""
+        records: list[dict] = self.find(list_key, field, value)
+        if not records:
+            raise KeyError(f"No {list_key} entry with {field} {value}")
+        return records[0]
+
+    def _build_table(self, list_key: str, field: str) -> dict[Any, list[dict]]:
+        table: dict[Any, list[dict]] = {}
+        for record in self.group[list_key]:
+            table.setdefault(record.get(field), []).append(record)
+
+        self._tables[(list_key, field)] = table
+        return table
@@ -0,0 +1,72 @@
+# How the metadata of scripts, triggers and ScreenChoosers is laid out next to their .crmscript files
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from core.utility import create_json_file
+from core.utility import create_json_files
+
+# A .json file of the same name next to each .crmscript file. The default.
+SIDECAR_LAYOUT: str = "sidecar"
+
+# A single INDEX_FILE_NAME file in each folder, with the metadata of every .crmscript file in it keyed by file name.
+# Halves the files created for folders of scripts, which adds up on tenants with thousands of them.
+INDEX_LAYOUT: str = "index"
+
+METADATA_LAYOUTS: list[str] = [SIDECAR_LAYOUT, INDEX_LAYOUT]
+
+INDEX_FILE_NAME: str = "_index.json"
+
+# Per thread, like the output in core/output.py
+_active = threading.local()
+
+
+def get_metadata_layout() -> str:
+    """Returns the layout metadata is currently created in on this thread."""
+    return getattr(_active, "layout", SIDECAR_LAYOUT)
+
+
+@contextmanager
+def use_metadata_layout(layout: str | None) -> Iterator[None]:
+    """Makes metadata be created in layout on this thread - the default if None - until the with block exits."""
+    previous: str = get_metadata_layout()
+    _active.layout = layout or SIDECAR_LAYOUT
+    try:
+        yield
+    finally:
+        _active.layout = previous
+
+
+def create_metadata_files(directory: str, metadata: list[tuple[str, dict]]) -> None:
+    """
+    Creates the metadata of the .crmscript files in directory, in the current layout.
+    metadata holds the (file name without extension, metadata) of each.
+    """
+    if get_metadata_layout() == INDEX_LAYOUT:
+        if metadata:
+            create_json_file(directory, INDEX_FILE_NAME,
+                             {f"{file_name_no_ext}.crmscript": content for file_name_no_ext, content in metadata})
+    else:
+        create_json_files(directory, [(f"{file_name_no_ext}.json", content) for file_name_no_ext, content in metadata])
+
+
+def read_metadata(script_path: str) -> dict | None:
+    """
+    Returns the metadata of a fetched .crmscript file, whichever layout it was created in, or None if it has none.
+    Raises OSError or ValueError if the metadata file can't be read.
+    """
+    directory, file_name = os.path.split(script_path)
+    file_name_no_ext: str = os.path.splitext(file_name)[0]
+
+    sidecar_path: str = os.path.join(directory, f"{file_name_no_ext}.json")
+    if os.path.isfile(sidecar_path):
+        with open(sidecar_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    index_path: str = os.path.join(directory, INDEX_FILE_NAME)
+    if os.path.isfile(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            return json.load(f).get(file_name)
+    return None
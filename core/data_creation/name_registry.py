@@ -0,0 +1,66 @@
+# Keeps the files created from two objects with the same name - or names that safe_name() makes the same, like
+# "Foo/Bar" and "Foo.Bar" - from overwriting each other
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# Per thread, like the output in core/output.py
+_active = threading.local()
+
+
+class NameRegistry:
+    """
+    The names given to the files/folders of objects in each folder while creating them, so a name already taken
+    is found without listing the folder. Names differing only in case are the same name, as they are on Windows
+    and macOS - which also keeps the files the same on every OS.
+    The first object keeps its name, and each later one gets its ID added to it. Those are kept in collisions.
+    Folders are named apart from files, since a folder doesn't take the name of a file without its extension.
+    """
+    def __init__(self):
+        # Key = (Folder path, whether the names are of folders). Value = Casefolded names taken in it.
+        self.names: dict[tuple[str, bool], set[str]] = {}
+
+        # Each name that was taken already: folder, the name, the object's ID and the name it got instead
+        self.collisions: list[dict] = []
+
+    def unique_name(self, directory: str, name: str, object_id: int, folder: bool = False) -> str:
+        """
+        Returns name, or name with object_id added to it if an object in directory already has that name.
+        folder tells whether name is a folder's, rather than a file name without extension.
+        """
+        taken: set[str] = self.names.setdefault((directory, folder), set())
+        unique: str = name
+        if unique.casefold() in taken:
+            unique = f"{name} (ID {object_id})"
+            number: int = 2
+            while unique.casefold() in taken:  # Only if another object is named like that itself
+                unique = f"{name} (ID {object_id}, {number})"
+                number += 1
+            self.collisions.append({"directory": directory, "name": name, "id": object_id, "renamed": unique})
+        taken.add(unique.casefold())
+        return unique
+
+
+def get_name_registry() -> NameRegistry | None:
+    """Returns the registry names are made unique by on this thread, if any."""
+    return getattr(_active, "registry", None)
+
+
+@contextmanager
+def use_name_registry(registry: NameRegistry) -> Iterator[NameRegistry]:
+    """Makes names be made unique by registry on this thread, until the with block exits."""
+    previous: NameRegistry | None = get_name_registry()
+    _active.registry = registry
+    try:
+        yield registry
+    finally:
+        _active.registry = previous
+
+
+def unique_name(directory: str, name: str, object_id: int, folder: bool = False) -> str:
+    """
+    Returns the name to give the file(s)/folder of an object in directory, without file extension, by the active
+    NameRegistry. Returns name as it is when none is active.
+    """
+    registry: NameRegistry | None = get_name_registry()
+    return registry.unique_name(directory, name, object_id, folder) if registry else name
@@ -1,5 +1,7 @@
-from core.utility import create_json_file
+from core.utility import create_json_files
 from core.utility import safe_name
+from core.data_creation.group_index import GroupIndex
+from core.data_creation.name_registry import unique_name
 
 
 def remove_schedule_keys(schedule: dict) -> dict:
@@ -18,14 +20,19 @@ def remove_schedule_keys(schedule: dict) -> dict:
 def create_scheduled_tasks_files(directory: str, group_scheduled_tasks: dict) -> None:
     """Creates JSON files of scheduled tasks in local directory"""
     scheduled_tasks: list[dict] = group_scheduled_tasks["scheduled_task"]
-    schedules: list[dict] = [remove_schedule_keys(s) for s in group_scheduled_tasks["schedule"]]
+    for schedule in group_scheduled_tasks["schedule"]:
+        remove_schedule_keys(schedule)
+
+    index = GroupIndex(group_scheduled_tasks)
 
     # Create a JSON of each "scheduled_task" entry also containing corresponding "schedule" entry
+    json_files: list[tuple[str, dict]] = []
     for task in scheduled_tasks:
         # Insert schedule entry
-        task["schedule"]: dict = [s for s in schedules if s.get("id") == task.get("schedule_id")][0]
+        task["schedule"]: dict = index.find_one("schedule", "id", task.get("schedule_id"))
 
-        # Create JSON File
         schedule_name: str = task["schedule"]["name"]
-        file_name: str = f"{safe_name(schedule_name)}.json"
-        create_json_file(directory, file_name, task)
+        file_name: str = f"{unique_name(directory, safe_name(schedule_name), task.get('id'))}.json"
+        json_files.append((file_name, task))
+
+    create_json_files(directory, json_files)
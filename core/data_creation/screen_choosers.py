@@ -1,23 +1,27 @@
 from core.utility import create_file
-from core.utility import create_json_file
 from core.utility import safe_name
+from core.data_creation.metadata import create_metadata_files
+from core.data_creation.name_registry import unique_name
 
 
 def create_screen_chooser_files(screen_choosers_directory: str, screen_choosers: list[dict]) -> None:
     """
     For each ScreenChooser, creates two files:
     1. A .crmscript file with the ScreenChooser Script body
-    2. A .json file with ScreenChooser metadata
+    2. A .json file with ScreenChooser metadata - or an entry in the folder's _index.json
     """
+    metadata: list[tuple[str, dict]] = []
     for sc in screen_choosers:
         file_name_no_ext: str = sc.get("description")
         if not file_name_no_ext:
             file_name_no_ext = f"Unnamed ScreenChooser (ID {sc.get('id')})"
-        file_name_no_ext = safe_name(file_name_no_ext)
+        file_name_no_ext = unique_name(screen_choosers_directory, safe_name(file_name_no_ext), sc.get("id"))
 
         # Create script body file
         create_file(screen_choosers_directory, f'{file_name_no_ext}.crmscript', sc.get("body"))
 
-        # Create meta data file with script body omitted
+        # Meta data with script body omitted, created with the rest of the ScreenChoosers'
         sc.pop("body")
-        create_json_file(screen_choosers_directory, f'{file_name_no_ext}.json', sc)
+        metadata.append((file_name_no_ext, sc))
+
+    create_metadata_files(screen_choosers_directory, metadata)
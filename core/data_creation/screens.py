@@ -1,32 +1,28 @@
 from core.utility import create_file
-from core.utility import create_json_file
+from core.utility import create_json_files
 from core.utility import create_folder
 from core.utility import log
 from core.utility import safe_name
+from core.data_creation.group_index import GroupIndex
+from core.data_creation.name_registry import unique_name
 
 
-def create_screen_elements(screen_id: int, screen_path: str, screen_def_element: list[dict], item_config: list[dict]):
-    """Creates a screen elements json file including item_config data"""
-    screen_elements: list[dict] = [se for se in screen_def_element if se.get("screen_definition") == screen_id]
+def get_screen_elements(screen_id: int, index: GroupIndex) -> list[dict]:
+    """Returns the screen's elements for its elements json file, including item_config data"""
+    screen_elements: list[dict] = index.find("screen_definition_element", "screen_definition", screen_id)
 
     # Add list of all item configs for each element
     for element in screen_elements:
-        element["item_config"]: list[dict] = [ic for ic in item_config if ic.get("item_id") == element.get("id")]
+        element["item_config"]: list[dict] = index.find("item_config", "item_id", element.get("id"))
 
-    create_json_file(screen_path, "screen_definition_element.json", screen_elements)
+    return screen_elements
 
 
-def create_screen_folders(directory: str, folder_id: int, group_screens: dict) -> None:
+def create_screen_folders(directory: str, folder_id: int, index: GroupIndex) -> None:
     """For each screen, creates a folder containing .crmscript and .json files"""
-    screen_defs: list[dict] = group_screens["screen_definition"]
-    screen_actions: list[dict] = group_screens["screen_definition_action"]
-    screen_def_element: list[dict] = group_screens["screen_definition_element"]
-    item_config: list[dict] = group_screens["item_config"]
-    screen_def_hidden: list[dict] = group_screens["screen_definition_hidden"]
-    screen_def_language: list[dict] = group_screens["screen_definition_language"]
-
-    for screen in [sd for sd in screen_defs if sd.get("hierarchy_id") == folder_id]:
-        folder_name: str = safe_name(f"(Screen) {screen.get('name')}")
+    for screen in index.find("screen_definition", "hierarchy_id", folder_id):
+        folder_name: str = unique_name(directory, safe_name(f"(Screen) {screen.get('name')}", folder=True),
+                                       screen.get("id"), folder=True)
         screen_path: str = f"{directory}/{folder_name}"
         log(f"Creating folder: {folder_name}")
         create_folder(screen_path)
@@ -53,46 +49,49 @@ def create_screen_folders(directory: str, folder_id: int, group_screens: dict) -
         create_folder(buttons_folder_path)
 
         screen_id: int = screen.get("id")
-        for button in [sa for sa in screen_actions if sa.get("screen_definition") == screen_id]:
+        for button in index.find("screen_definition_action", "screen_definition", screen_id):
+            # A button without a caption is named "None", as it always has been, so existing trees keep their files
+            button_name: str = unique_name(buttons_folder_path, safe_name(str(button.get("button"))), button.get("id"))
             create_file(buttons_folder_path,
-                        safe_name(f'{button.get("button")}.crmscript'),
-                        button.get("ejscript_body"))
+                        f"{button_name}.crmscript",
+                        button.pop("ejscript_body"))  # Not needed once written, like the screen's below
 
         # Create screen_definition tables as separate .json files
-        # Exclude crmscript bodies in screen_definition since these have already been created as separate files
-        screen_to_json: dict = screen.copy()
-        screen_to_json.pop("load_script_body")
-        screen_to_json.pop("load_post_cgi_script_body")
-        screen_to_json.pop("load_final_script_body")
-        screen_to_json.pop("creation_script")
-        create_json_file(screen_path, "screen_definition.json", screen_to_json)
-
-        create_screen_elements(screen_id, screen_path, screen_def_element, item_config)
-
-        screen_hidden: list[dict] = [sh for sh in screen_def_hidden if sh.get("screen_definition") == screen_id]
-        create_json_file(screen_path, "screen_definition_hidden.json", screen_hidden)
-
-        screen_language: list[dict] = [sl for sl in screen_def_language if sl.get("screen_definition") == screen_id]
-        create_json_file(screen_path, "screen_definition_language.json", screen_language)
-
-
-def create_screens_hierarchy(directory: str, group_screens: dict, lookup_parent_id: int = -1) -> None:
+        # Exclude crmscript bodies in screen_definition since these have already been created as separate files.
+        # Removed from the screen itself, so they are released now rather than with the whole group.
+        screen.pop("load_script_body")
+        screen.pop("load_post_cgi_script_body")
+        screen.pop("load_final_script_body")
+        screen.pop("creation_script")
+
+        screen_hidden: list[dict] = index.find("screen_definition_hidden", "screen_definition", screen_id)
+        screen_language: list[dict] = index.find("screen_definition_language", "screen_definition", screen_id)
+        create_json_files(screen_path, [("screen_definition.json", screen),
+                                        ("screen_definition_element.json", get_screen_elements(screen_id, index)),
+                                        ("screen_definition_hidden.json", screen_hidden),
+                                        ("screen_definition_language.json", screen_language)])
+
+
+def create_screens_hierarchy(directory: str, group_screens: dict, lookup_parent_id: int = -1,
+                             index: GroupIndex | None = None) -> None:
     """Creates folders and files of Screens in local directory"""
+    if index is None:
+        index = GroupIndex(group_screens)
 
     # Create screens in root folder
     if lookup_parent_id == -1:
-        create_screen_folders(directory, lookup_parent_id, group_screens)
+        create_screen_folders(directory, lookup_parent_id, index)
 
-    folders: list[dict] = group_screens["screen_folders"]
-    created_folders: list[dict] = []
-    for folder in [f for f in folders if f["parent_id"] == lookup_parent_id]:
-        if folder in created_folders:
+    created_folder_ids: set[int] = set()
+    for folder in index.find("screen_folders", "parent_id", lookup_parent_id):
+        if folder.get("id") in created_folder_ids:
             continue
 
-        path: str = f"{directory}/{safe_name(folder.get('name'))}"
+        folder_name: str = unique_name(directory, safe_name(folder.get("name"), folder=True), folder.get("id"), folder=True)
+        path: str = f"{directory}/{folder_name}"
         create_folder(path)
-        created_folders.append(folder)
+        created_folder_ids.add(folder.get("id"))
 
         folder_id: int = folder.get("id")
-        create_screen_folders(path, folder_id, group_screens)
-        create_screens_hierarchy(path, group_screens, folder_id)  # Recursively creates child folders
+        create_screen_folders(path, folder_id, index)
+        create_screens_hierarchy(path, group_screens, folder_id, index)  # Recursively creates child folders
@@ -1,43 +1,51 @@
 from core.utility import create_file
-from core.utility import create_json_file
 from core.utility import create_folder
 from core.utility import safe_name
+from core.data_creation.group_index import GroupIndex
+from core.data_creation.metadata import create_metadata_files
+from core.data_creation.name_registry import unique_name
 
 
-def create_scripts_in_folder(directory: str, folder_id: int, all_scripts: list[dict]) -> None:
+def create_scripts_in_folder(directory: str, scripts: list[dict]) -> None:
     """
-    For each script, creates two files:
+    For each script in the folder, creates two files:
     1. A .crmscript file with the script body
-    2. A .json file with script's metadata
+    2. A .json file with script's metadata - or an entry in the folder's _index.json, see create_metadata_files()
     """
-    for script in [s for s in all_scripts if s.get("hierarchy_id") == folder_id]:
-        file_name_no_ext: str = safe_name(script.get("description"))
+    metadata: list[tuple[str, dict]] = []
+    for script in scripts:
+        file_name_no_ext: str = unique_name(directory, safe_name(script.get("description")), script.get("id"))
 
         # Create script body file
         create_file(directory, f"{file_name_no_ext}.crmscript", script.get("body"))
 
-        # Create meta data file with script body omitted
+        # Meta data with script body omitted, created with the rest of the folder's
         script.pop("body")
-        create_json_file(directory, f"{file_name_no_ext}.json", script)
+        metadata.append((file_name_no_ext, script))
 
+    create_metadata_files(directory, metadata)
 
-def create_scripts_hierarchy(directory: str, group_scripts: dict, lookup_parent_id: int = -1) -> None:
+
+def create_scripts_hierarchy(directory: str, group_scripts: dict, lookup_parent_id: int = -1,
+                             index: GroupIndex | None = None) -> None:
     """Creates folders and files of Scripts in local directory"""
+    if index is None:
+        index = GroupIndex(group_scripts)
 
     # Create scripts in root folder
     if lookup_parent_id == -1:
-        create_scripts_in_folder(directory, lookup_parent_id, group_scripts["scripts"])
+        create_scripts_in_folder(directory, index.find("scripts", "hierarchy_id", lookup_parent_id))
 
     # Recursively create folder structure with scripts
-    folders: list[dict] = group_scripts["script_folders"]
-    created_folders: list[dict] = []
-    for folder in [f for f in folders if f["parent_id"] == lookup_parent_id]:
-        if folder in created_folders:
+    created_folder_ids: set[int] = set()
+    for folder in index.find("script_folders", "parent_id", lookup_parent_id):
+        if folder["id"] in created_folder_ids:
             continue
 
-        path: str = f"{directory}/{safe_name(folder['name'])}"
+        folder_name: str = unique_name(directory, safe_name(folder["name"], folder=True), folder["id"], folder=True)
+        path: str = f"{directory}/{folder_name}"
         create_folder(path)
-        created_folders.append(folder)
+        created_folder_ids.add(folder["id"])
 
-        create_scripts_in_folder(path, folder["id"], group_scripts["scripts"])
-        create_scripts_hierarchy(path, group_scripts, folder["id"])  # Create child folders
+        create_scripts_in_folder(path, index.find("scripts", "hierarchy_id", folder["id"]))
+        create_scripts_hierarchy(path, group_scripts, folder["id"], index)  # Create child folders
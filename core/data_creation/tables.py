@@ -1,45 +1,51 @@
 from core.utility import create_folder
-from core.utility import create_json_file
+from core.utility import create_json_files
 from core.utility import safe_name
+from core.data_creation.group_index import GroupIndex
+from core.data_creation.name_registry import unique_name
 
 
-def create_extra_tables_in_folder(directory: str, folder_id: int, group_extra_tables: dict) -> None:
+def create_extra_tables_in_folder(directory: str, folder_id: int, index: GroupIndex) -> None:
     """Creates JSON files of extra tables + fields in local directory"""
-    extra_tables: list[dict] = group_extra_tables["extra_tables"]
-    extra_fields: list[dict] = group_extra_tables["extra_fields"]
-
-    for extra_table in [et for et in extra_tables if et.get("hierarchy_id") == folder_id]:
+    json_files: list[tuple[str, dict]] = []
+    for extra_table in index.find("extra_tables", "hierarchy_id", folder_id):
         table: dict = {
             "extra_table": extra_table,
-            "extra_fields": [f for f in extra_fields if f["extra_table"] == extra_table["id"]]
+            "extra_fields": index.find("extra_fields", "extra_table", extra_table["id"])
         }
 
-        file_name: str = f"{extra_table['name']}.json"
-        create_json_file(directory, safe_name(file_name), table)
+        file_name: str = f"{unique_name(directory, safe_name(extra_table['name']), extra_table['id'])}.json"
+        json_files.append((file_name, table))
+
+    create_json_files(directory, json_files)
 
 
-def create_extra_tables_hierarchy(directory: str, group_extra_tables: dict, lookup_parent_id: int = -1) -> None:
+def create_extra_tables_hierarchy(directory: str, group_extra_tables: dict, lookup_parent_id: int = -1,
+                                  index: GroupIndex | None = None) -> None:
     """Creates folders and files of extra tables with extra fields in local directory"""
+    if index is None:
+        index = GroupIndex(group_extra_tables)
 
     # Create tables in root folder
     if lookup_parent_id == -1:
-        create_extra_tables_in_folder(directory, lookup_parent_id, group_extra_tables)
+        create_extra_tables_in_folder(directory, lookup_parent_id, index)
 
     # Recursively create folder structure with tables as JSON files
-    created_folders: list[dict] = []
-    for folder in [f for f in group_extra_tables["extra_table_folders"] if f["parent_id"] == lookup_parent_id]:
-        if folder in created_folders:
+    created_folder_ids: set[int] = set()
+    for folder in index.find("extra_table_folders", "parent_id", lookup_parent_id):
+        if folder["id"] in created_folder_ids:
             continue
 
-        path: str = f"{directory}/{safe_name(folder.get('name'))}"
+        folder_name: str = unique_name(directory, safe_name(folder.get("name"), folder=True), folder["id"], folder=True)
+        path: str = f"{directory}/{folder_name}"
         create_folder(path)
-        created_folders.append(folder)
+        created_folder_ids.add(folder["id"])
 
-        create_extra_tables_in_folder(path, folder["id"], group_extra_tables)
-        create_extra_tables_hierarchy(path, group_extra_tables, folder["id"])  # Create child folders
+        create_extra_tables_in_folder(path, folder["id"], index)
+        create_extra_tables_hierarchy(path, group_extra_tables, folder["id"], index)  # Create child folders
 
 
-def create_default_table_files(directory: str, extra_fields: list[dict]) -> None:
+def create_default_table_files(directory: str, index: GroupIndex) -> None:
     """Creates JSON files of default tables' extra fields"""
 
     # Key = Domain ID as found in extra_field table. Value = Table name
@@ -55,13 +61,17 @@ def create_default_table_files(directory: str, extra_fields: list[dict]) -> None
     }
 
     # For each default table (domain), create JSON file with extra fields
+    json_files: list[tuple[str, dict]] = []
     for domain in domains.keys():
         table: dict = {
-            "extra_fields": [field for field in extra_fields if field["domain"] == domain]
+            "extra_fields": index.find("extra_fields", "domain", domain)
         }
-        create_json_file(directory, f"{domains[domain]}.json", table)
+        json_files.append((f"{domains[domain]}.json", table))
+
+    create_json_files(directory, json_files)
 
 
 def create_table_hierarchy(directory: str, group_extra_tables: dict) -> None:
-    create_extra_tables_hierarchy(directory, group_extra_tables)
-    create_default_table_files(directory, group_extra_tables["extra_fields"])
+    index = GroupIndex(group_extra_tables)
+    create_extra_tables_hierarchy(directory, group_extra_tables, index=index)
+    create_default_table_files(directory, index)
@@ -1,19 +1,23 @@
 from core.utility import create_file
-from core.utility import create_json_file
 from core.utility import safe_name
+from core.data_creation.metadata import create_metadata_files
+from core.data_creation.name_registry import unique_name
 
 
 def create_trigger_files(triggers_directory: str, triggers: list[dict]) -> None:
-    """Creates .crmscript files of Triggers in local directory"""
+    """Creates .crmscript files of Triggers in local directory, with their metadata"""
+    metadata: list[tuple[str, dict]] = []
     for t in triggers:
         file_name_no_ext: str = t.get("description")
         if not file_name_no_ext:
             file_name_no_ext = f"Unnamed trigger (ID {t.get('id')})"
-        file_name_no_ext = safe_name(file_name_no_ext)
+        file_name_no_ext = unique_name(triggers_directory, safe_name(file_name_no_ext), t.get("id"))
 
         # Create script body file
         create_file(triggers_directory, f'{file_name_no_ext}.crmscript', t.get("body"))
 
-        # Create meta data file with script body omitted
+        # Meta data with script body omitted, created with the rest of the triggers'
         t.pop("body")
-        create_json_file(triggers_directory, f'{file_name_no_ext}.json', t)
+        metadata.append((file_name_no_ext, t))
+
+    create_metadata_files(triggers_directory, metadata)
@@ -1,7 +1,23 @@
+import os
+
 from core.utility import create_folder
 from core.utility import delete_folder
+from core.utility import get_retry_stats
 from core.utility import log
-from core.utility import move_folder
+from core.utility import rename_folder
+from core.utility import reset_retry_stats
+from core.output import ArchiveOutput
+from core.output import MemoryOutput
+from core.output import ThreadedDirectoryOutput
+from core.output import use_output
+from core.progress import advance
+from core.progress import commit
+from core.progress import report
+from core.search_index import IndexUpdate
+from core.search_index import search_documents
+from core.tree_sync import sync_tree
+from core.tracing import span
+from core.tracing import traced
 
 from core.data_creation.scripts import create_scripts_hierarchy
 from core.data_creation.triggers import create_trigger_files
@@ -9,114 +25,278 @@ from core.data_creation.screens import create_screens_hierarchy
 from core.data_creation.screen_choosers import create_screen_chooser_files
 from core.data_creation.scheduled_tasks import create_scheduled_tasks_files
 from core.data_creation.tables import create_table_hierarchy
+from core.data_creation.metadata import use_metadata_layout
+from core.data_creation.name_registry import NameRegistry
+from core.data_creation.name_registry import use_name_registry
 
+from typing import Any
+from typing import Iterable
+from typing import Iterator
 from typing import Optional
 from typing import Callable
 
 
+# Key = Group key in the JSON from fetcher script version 2.
+# Value = (Fetch option enabling the group, folder the group is created in, creator function for the group)
+GROUP_CREATORS: dict[str, tuple[str, str, Callable[[str, dict], None]]] = {
+    "group_scripts": ("fetch_scripts", "Scripts", create_scripts_hierarchy),
+    "group_triggers": ("fetch_triggers", "Triggers",
+                       lambda directory, group: create_trigger_files(directory, group["triggers"])),
+    "group_screens": ("fetch_screens", "Screens", create_screens_hierarchy),
+    "group_screen_choosers": ("fetch_screen_choosers", "ScreenChoosers",
+                              lambda directory, group: create_screen_chooser_files(directory,
+                                                                                   group["screen_choosers"])),
+    "group_scheduled_tasks": ("fetch_scheduled_tasks", "Scheduled tasks", create_scheduled_tasks_files),
+    "group_extra_tables": ("fetch_extra_tables", "Tables", create_table_hierarchy),
+}
+
+
+def pop_groups(data: dict) -> Iterator[tuple[str, Any]]:
+    """Yields the (key, value) pairs of data in order, removing each from data, so no group outlives its files."""
+    for key in list(data):
+        yield key, data.pop(key)
+
+
 class DataCreator:
     """
-    Creates files/folders based on data retrieved from SuperOffice
+    Creates files/folders based on data retrieved from SuperOffice.
+    data is either the whole parsed JSON, or - when streaming - an iterable of its (key, value) pairs,
+    where each group is created as soon as it is read.
+    Either way, each group is released as soon as its files are created - a dict is emptied as it is created -
+    so memory is not held by the groups already created while the rest are.
+    With archive set to a .zip, .tar.gz or .tgz path, the folders are written into that archive instead.
+    With index_update set, the CRMScript bodies of each group are staged in it as the group is created.
     """
-    def __init__(self, data: dict, crmscript_version: int, tenant: dict):
-        self.data: dict = data
+    def __init__(self, data: dict | Iterable[tuple[str, Any]], crmscript_version: int, tenant: dict,
+                 sync: bool = False, archive: str | None = None, index_update: IndexUpdate | None = None):
+        self.data: dict | Iterable[tuple[str, Any]] = data
         self.crmscript_version: int = crmscript_version
         self.tenant: dict = tenant
+        self.sync: bool = sync
+        self.archive: str | None = archive
+
+        # Where the documents of each group are staged for the SearchIndex, see search_documents()
+        self.index_update: IndexUpdate | None = index_update
+
+        # Counts of files added/changed/removed/unchanged. Only set after create() in sync mode.
+        self.changes: dict[str, int] | None = None
+
+        # Objects whose files/folders were given their ID in their name during create(), since another object in
+        # the same folder had the same name. See NameRegistry.
+        self.collisions: list[dict] = []
+
+        # How many file operations had to be retried during create(), and the seconds spent waiting to retry
+        self.retry_stats: dict = {"retries": 0, "seconds": 0.0}
 
         # Key = Version of fetcher script in SuperOffice. Informs create() which creator method to use.
         self.creator_methods: dict[int, callable] = {
             1: self.creator_v1,
-            2: self.creator_v2
+            2: self.creator_v2,
+            3: self.creator_v2,  # Version 3 only changed the JSON to be sent without indentation
+            4: self.creator_v2,  # Version 4 only added delta fetching, merged into version 2 data by DeltaMerger
+            5: self.creator_v2  # Version 5 only added paged fetching, put back together into version 2 data
         }
 
+        # Key = Version of fetcher script in SuperOffice. Value = The folders in local directory its creator owns.
+        self.creator_folders: dict[int, list[str]] = {
+            1: ["Scripts", "Triggers"],
+            2: [folder_name for _, folder_name, _ in GROUP_CREATORS.values()],
+            3: [folder_name for _, folder_name, _ in GROUP_CREATORS.values()],
+            4: [folder_name for _, folder_name, _ in GROUP_CREATORS.values()],
+            5: [folder_name for _, folder_name, _ in GROUP_CREATORS.values()]
+        }
+
+    @traced("create")
     def create(self) -> bool:
         """
         Calls different creator method depending on what version fetcher script in SuperOffice is.
         Returns true if folders/files were created successfully.
-        Will delete all files/folders before recreating them from the JSON again.
-        A backup temp folder is created in case script fails during execution.
+        All folders/files are created from scratch in a staging folder, which then replaces the existing ones.
+        In sync mode, only the files that differ from the ones already on disk are written or deleted instead.
+        With an archive, the archive is written and the local directory is left untouched.
+        The metadata of scripts, triggers and ScreenChoosers is laid out as the tenant's metadata_layout says.
         """
         creator_method: Optional[Callable] = self.creator_methods.get(self.crmscript_version)
 
         if not creator_method:
             return False  # Script version not supported or invalid
 
-        creator_method()
+        reset_retry_stats()
+        registry = NameRegistry()
+        try:
+            folder_names: list[str] = self.creator_folders[self.crmscript_version]
+            with use_metadata_layout(self.tenant.get("metadata_layout")), use_name_registry(registry):
+                if self.archive:
+                    self.archive_folders(creator_method)
+                elif self.sync:
+                    self.sync_folders(creator_method, folder_names)
+                else:
+                    self.replace_folders(creator_method, folder_names)
+        finally:
+            self.retry_stats = get_retry_stats()
+            if self.retry_stats["retries"]:
+                log(f"Retried file operations {self.retry_stats['retries']} times, "
+                    f"waiting {self.retry_stats['seconds'] * 1000:.0f} ms in total")
+
+        # Folders relative to local directory, rather than to the staging folder they were created in
+        local_directory: str = self.tenant["local_directory"]
+        root: str = local_directory if self.archive or self.sync else f"{local_directory}/staging"
+        self.collisions = [dict(collision, directory=os.path.relpath(collision["directory"], root).replace(os.sep, "/"))
+                           for collision in registry.collisions]
+        for collision in self.collisions:
+            log(f"Named {collision['directory']}/{collision['renamed']} with its ID, "
+                f"since another one in the folder is named {collision['name']}")
         return True
 
-    def creator_v1(self) -> None:
-        """Used for fetcher script version 1"""
-        temp_directory: str = f"{self.tenant.get('local_directory')}/temp"
-        scripts_directory: str = f"{self.tenant.get('local_directory')}/Scripts"
-        triggers_directory: str = f"{self.tenant.get('local_directory')}/Triggers"
+    def replace_folders(self, creator_method: Callable[[str], None], folder_names: list[str]) -> None:
+        """
+        Creates all folders/files from scratch in a staging folder, then swaps each new folder in place of the
+        existing one by renaming it. The existing folders are kept in a temp folder until all new folders are in
+        place, and are restored if that fails.
+        """
+        local_directory: str = self.tenant["local_directory"]
+        staging_directory: str = f"{local_directory}/staging"
+        temp_directory: str = f"{local_directory}/temp"
+
+        log("Cleaning up staging and temp folders in case previous fetch was interrupted")
+        with span("clean_up_previous"):
+            self.restore_folders(folder_names, temp_directory)
+            delete_folder(staging_directory)
+            delete_folder(temp_directory)
+
+        log("Creating folders and files from JSON in staging folder")
+        create_folder(staging_directory)
+        try:
+            # Every file must be written before the staging folder is published, or deleted on failure
+            with ThreadedDirectoryOutput() as output, use_output(output):
+                creator_method(staging_directory)
+                with span("flush_writes"):
+                    output.flush()
+        except BaseException:
+            delete_folder(staging_directory)  # Existing folders have not been touched yet
+            raise
+
+        # Not cancellable from here on - the folders are either all replaced, or all restored on failure
+        try:
+            commit("publishing")
+        except BaseException:
+            delete_folder(staging_directory)
+            raise
 
-        log("Trying to delete temp folder in case it was not deleted on previous fetch")
-        delete_folder(temp_directory)
+        log("Replacing existing folders with the new ones")
+        with span("publish_folders"):
+            create_folder(temp_directory)
+            self.publish_folders(folder_names, staging_directory, temp_directory)
 
-        log("Creating temp folder and moving existing folders and scripts to folder")
-        create_folder(temp_directory)
-        move_folder(scripts_directory, temp_directory)
-        move_folder(triggers_directory, temp_directory)
+        log("Deleting staging and temp folders")
+        with span("delete_old_folders"):
+            delete_folder(staging_directory)
+            delete_folder(temp_directory)
+
+    def publish_folders(self, folder_names: list[str], staging_directory: str, temp_directory: str) -> None:
+        """
+        Moves each existing folder into temp_directory and the new one from staging_directory in its place.
+        If anything fails, the folders already replaced are rolled back before the error is raised.
+        """
+        local_directory: str = self.tenant["local_directory"]
+
+        # Key = Folder name. Value = Whether the new folder has been moved in place yet.
+        replaced: dict[str, bool] = {}
+
+        try:
+            for folder_name in folder_names:
+                replaced[folder_name] = False
+                rename_folder(f"{local_directory}/{folder_name}", f"{temp_directory}/{folder_name}")
+                # Not in staging if its fetch option is disabled, which leaves the folder deleted
+                replaced[folder_name] = rename_folder(f"{staging_directory}/{folder_name}",
+                                                      f"{local_directory}/{folder_name}")
+        except BaseException:
+            log("Failed to replace folders, restoring the previous ones")
+            for folder_name, moved_in_place in replaced.items():
+                if moved_in_place:
+                    delete_folder(f"{local_directory}/{folder_name}")
+            self.restore_folders(list(replaced), temp_directory)
+            raise
+
+    def restore_folders(self, folder_names: list[str], temp_directory: str) -> None:
+        """Moves folders left in temp_directory back into local directory, unless a folder of that name is there."""
+        local_directory: str = self.tenant["local_directory"]
+        for folder_name in folder_names:
+            if not os.path.isdir(f"{local_directory}/{folder_name}"):
+                rename_folder(f"{temp_directory}/{folder_name}", f"{local_directory}/{folder_name}")
+
+    def sync_folders(self, creator_method: Callable[[str], None], folder_names: list[str]) -> None:
+        """Creates all folders/files in memory, then writes/deletes only those that differ from what is on disk."""
+        local_directory: str = self.tenant["local_directory"]
+
+        log("Creating folders and files from JSON in memory")
+        target = MemoryOutput()
+        with use_output(target):
+            creator_method(local_directory)
+
+        commit("writing")
+
+        log("Writing changed files to disk")
+        with span("sync_tree"):
+            self.changes = sync_tree(target, [f"{local_directory}/{folder_name}" for folder_name in folder_names])
+
+    def archive_folders(self, creator_method: Callable[[str], None]) -> None:
+        """Creates all folders/files straight into the archive, replacing the previous archive once it is done."""
+        local_directory: str = self.tenant["local_directory"]
+
+        log(f"Creating folders and files from JSON in archive {self.archive}")
+        with span("write_archive"), ArchiveOutput(self.archive, local_directory) as output, use_output(output):
+            creator_method(local_directory)
+
+    @traced("creator_v1")
+    def creator_v1(self, directory: str) -> None:
+        """Used for fetcher script version 1"""
+        scripts_directory: str = f"{directory}/Scripts"
+        triggers_directory: str = f"{directory}/Triggers"
 
-        log("Creating folders and files from JSON")
         create_folder(scripts_directory)
         create_folder(triggers_directory)
 
         # Create a dict containing script folders and scripts since this was not a part of script version 1
-        group_scripts: dict = {"script_folders": self.data["script_folders"], "scripts": self.data["scripts"]}
-        create_scripts_hierarchy(scripts_directory, group_scripts)
-        create_trigger_files(triggers_directory, self.data["triggers"])
+        group_scripts: dict = {"script_folders": self.data.pop("script_folders"), "scripts": self.data.pop("scripts")}
+        triggers: list[dict] = self.data.pop("triggers")
+        if self.index_update:
+            self.index_update.add(search_documents("group_scripts", group_scripts))
+            self.index_update.add(search_documents("group_triggers", {"triggers": triggers}))
 
-        log("Deleting temp folder")
-        delete_folder(temp_directory)
+        report(phase="creating", group="Scripts")
+        with span("group_scripts", records=len(group_scripts["scripts"])):
+            create_scripts_hierarchy(scripts_directory, group_scripts)
+        del group_scripts
+        advance(groups_done=1)
+        report(group="Triggers")
+        with span("group_triggers", records=len(triggers)):
+            create_trigger_files(triggers_directory, triggers)
+        advance(groups_done=1)
 
-    def creator_v2(self) -> None:
+    @traced("creator_v2")
+    def creator_v2(self, directory: str) -> None:
         """Used for fetcher script version 2"""
-        temp_directory: str = f"{self.tenant['local_directory']}/temp"
-        scripts_directory: str = f"{self.tenant['local_directory']}/Scripts"
-        triggers_directory: str = f"{self.tenant['local_directory']}/Triggers"
-        screens_directory: str = f"{self.tenant['local_directory']}/Screens"
-        screen_choosers_directory: str = f"{self.tenant['local_directory']}/ScreenChoosers"
-        scheduled_tasks_directory: str = f"{self.tenant['local_directory']}/Scheduled tasks"
-        tables_directory: str = f"{self.tenant['local_directory']}/Tables"
-
-        log("Trying to delete temp folder in case it was not deleted on previous fetch")
-        delete_folder(temp_directory)
-
-        log("Creating temp folder and moving existing folders and scripts to folder")
-        create_folder(temp_directory)
-        move_folder(scripts_directory, temp_directory)
-        move_folder(triggers_directory, temp_directory)
-        move_folder(screens_directory, temp_directory)
-        move_folder(screen_choosers_directory, temp_directory)
-        move_folder(scheduled_tasks_directory, temp_directory)
-        move_folder(tables_directory, temp_directory)
-
-        log("Creating folders and files from JSON")
-        if self.tenant["fetch_options"]["fetch_scripts"]:
-            create_folder(scripts_directory)
-            create_scripts_hierarchy(scripts_directory, self.data["group_scripts"])
-
-        if self.tenant["fetch_options"]["fetch_triggers"]:
-            create_folder(triggers_directory)
-            create_trigger_files(triggers_directory, self.data["group_triggers"]["triggers"])
-
-        if self.tenant["fetch_options"]["fetch_screens"]:
-            create_folder(screens_directory)
-            create_screens_hierarchy(screens_directory, self.data["group_screens"])
-
-        if self.tenant["fetch_options"]["fetch_screen_choosers"]:
-            create_folder(screen_choosers_directory)
-            create_screen_chooser_files(screen_choosers_directory,
-                                        self.data["group_screen_choosers"]["screen_choosers"])
-
-        if self.tenant["fetch_options"]["fetch_scheduled_tasks"]:
-            create_folder(scheduled_tasks_directory)
-            create_scheduled_tasks_files(scheduled_tasks_directory, self.data["group_scheduled_tasks"])
-
-        if self.tenant["fetch_options"]["fetch_extra_tables"]:
-            create_folder(tables_directory)
-            create_table_hierarchy(tables_directory, self.data["group_extra_tables"])
-
-        log("Deleting temp folder")
-        delete_folder(temp_directory)
+        groups: Iterable[tuple[str, Any]] = pop_groups(self.data) if isinstance(self.data, dict) else self.data
+        for group_key, group in groups:
+            self.create_group(directory, group_key, group)
+            del group  # Before the next group is read from a stream, rather than once it has been
+
+    def create_group(self, directory: str, group_key: str, group: Any) -> None:
+        """Creates the folder and files of a single group in directory, if its fetch option is enabled."""
+        if group_key not in GROUP_CREATORS:
+            return  # Not a group, e.g. script_version
+
+        fetch_option, folder_name, creator_function = GROUP_CREATORS[group_key]
+        if not self.tenant["fetch_options"][fetch_option]:
+            return
+
+        records: int = sum(len(rows) for rows in group.values() if isinstance(rows, list))
+        report(phase="creating", group=folder_name)
+        with span(group_key, records=records):
+            if self.index_update:
+                self.index_update.add(search_documents(group_key, group))  # Before the bodies are removed
+            group_directory: str = f"{directory}/{folder_name}"
+            create_folder(group_directory)
+            creator_function(group_directory, group)
+        advance(groups_done=1)
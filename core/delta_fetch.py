@@ -0,0 +1,119 @@
+# Delta fetching: only asking SuperOffice for the rows changed since the previous fetch, and merging them
+# into the rows kept from that fetch
+import json
+import os
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+from core.utility import log
+
+# Where the rows and high-water mark of the previous delta fetch are kept, inside the tenant's local directory
+DELTA_STATE_FILE_NAME: str = ".crmfetch_delta.json"
+
+# Fetcher script version that first understood the since parameter
+DELTA_SCRIPT_VERSION: int = 4
+
+# Key = Group key of a group the fetcher script can send only the changed rows of.
+# Value = (Key of its rows, key of the IDs of all its rows, fields the fetcher script orders the rows by)
+DELTA_LISTS: dict[str, tuple[str, str, tuple[str, ...]]] = {
+    "group_scripts": ("scripts", "script_ids", ("hierarchy_id", "id")),
+    "group_triggers": ("triggers", "trigger_ids", ("id",)),
+    "group_screen_choosers": ("screen_choosers", "screen_chooser_ids", ("id",)),
+}
+
+
+def get_delta_state_path(tenant: dict) -> str:
+    return os.path.join(tenant["local_directory"], DELTA_STATE_FILE_NAME)
+
+
+def load_delta_state(tenant: dict) -> dict | None:
+    """
+    Returns the state saved by the tenant's previous delta fetch.
+    Returns None if there is none, or if it can't be used since the tenant's fetch options have changed since.
+    """
+    try:
+        with open(get_delta_state_path(tenant), encoding="utf-8") as f:
+            state: dict = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log(f"Ignoring unreadable delta state, doing a full fetch: {str(e)}")
+        return None
+
+    if state.get("fetch_options") != tenant["fetch_options"]:
+        log("Fetch options have changed since the previous delta fetch, doing a full fetch")
+        return None
+
+    return state
+
+
+def save_delta_state(tenant: dict, state: dict) -> None:
+    """Saves state for the next delta fetch, replacing the previous one only once fully written."""
+    path: str = get_delta_state_path(tenant)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+class DeltaMerger:
+    """
+    Turns a delta response into the same data a full fetch would have returned, by merging the changed rows into
+    the rows kept from the previous fetch and dropping the rows no longer among the IDs SuperOffice sent.
+    Also keeps a copy of all rows of the delta groups, to be saved for the next delta fetch by new_state().
+    """
+    def __init__(self, state: dict | None):
+        self.state: dict | None = state
+        self.is_delta: bool = False  # Whether the response only held changed rows
+        self.changed_rows: int = 0  # Number of rows of delta groups in the response
+        self.rows: dict[str, list[dict]] = {}  # Key = Group key. Value = All rows of the group after merging
+
+    def merge(self, data: dict | Iterable[tuple[str, Any]]) -> dict | Iterator[tuple[str, Any]]:
+        """Returns data with the delta groups merged. A dict stays a dict, a stream stays a stream."""
+        if isinstance(data, dict):
+            return dict(self.merge_items(data.items()))
+        return self.merge_items(data)
+
+    def merge_items(self, items: Iterable[tuple[str, Any]]) -> Iterator[tuple[str, Any]]:
+        for key, value in items:
+            if key == "delta":
+                # Sent before the groups. Only true if SuperOffice got the since parameter we sent.
+                self.is_delta = bool(value) and self.state is not None
+                continue
+
+            if key in DELTA_LISTS and isinstance(value, dict):
+                self.merge_group(key, value)
+
+            yield key, value
+
+    def merge_group(self, group_key: str, group: dict) -> None:
+        rows_key, ids_key, order_fields = DELTA_LISTS[group_key]
+        rows: list[dict] = group.get(rows_key, [])
+        live_ids: list[dict] = group.pop(ids_key, [])
+        self.changed_rows += len(rows)
+
+        if self.is_delta:
+            rows_by_id: dict[int, dict] = {row["id"]: row for row in self.state["rows"].get(group_key, [])}
+            rows_by_id.update({row["id"]: row for row in rows})
+
+            missing: list[int] = [row["id"] for row in live_ids if row["id"] not in rows_by_id]
+            if missing:
+                raise ValueError(f"Rows {missing} of {group_key} are neither changed nor kept from the previous "
+                                 f"fetch. Fetch without delta to start over.")
+
+            rows = sorted((rows_by_id[row["id"]] for row in live_ids),
+                          key=lambda row: tuple(row.get(field) for field in order_fields))
+            group[rows_key] = rows
+
+        # Copied, since the creators remove keys from the rows they create files of
+        self.rows[group_key] = [dict(row) for row in rows]
+
+    def new_state(self, tenant: dict) -> dict:
+        """Returns the state to save for the next delta fetch, once the merged data has been created."""
+        timestamps: list[str] = [row.get(field) or "" for rows in self.rows.values()
+                                 for row in rows for field in ("updated", "registered")]
+        return {
+            "since": max(timestamps, default=""),
+            "fetch_options": tenant["fetch_options"],
+            "rows": self.rows,
+        }
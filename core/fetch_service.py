@@ -1,20 +1,91 @@
 import json
+import sqlite3
+import threading
+import time
+import zlib
 import requests
+import urllib3
+from urllib.parse import quote
+from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from itertools import chain
+from typing import Any
+from typing import Callable
+from typing import Iterator
 from requests import Response
 from core.data_creator import DataCreator
+from core.data_creation.metadata import METADATA_LAYOUTS
+from core.delta_fetch import DELTA_SCRIPT_VERSION
+from core.delta_fetch import DeltaMerger
+from core.delta_fetch import load_delta_state
+from core.delta_fetch import save_delta_state
+from core.http_session import CONNECT_TIMEOUT
+from core.http_session import POOL_MAXSIZE
+from core.http_session import READ_TIMEOUT
+from core.http_session import create_decoder
+from core.http_session import create_session
+from core.json_stream import JsonStreamReader
+from core.output import archive_format
+from core.paged_fetch import MIN_PAGE_ROWS
+from core.paged_fetch import PAGE_ATTEMPTS
+from core.paged_fetch import PAGED_LISTS
+from core.paged_fetch import PAGED_SCRIPT_VERSION
+from core.paged_fetch import PageSpool
+from core.paged_fetch import clear_spool
+from core.paged_fetch import next_page_rows
+from core.progress import FetchCancelled
+from core.progress import advance
+from core.progress import bind_progress
+from core.progress import report
+from core.search_index import SearchIndex
+from core.search_index import IndexUpdate
+from core.snapshot_store import SnapshotStore
+from core.tracing import bind_tracer
+from core.tracing import span
+from core.tracing import traced
 from core.utility import log
 
-CURRENT_CRMSCRIPT_VERSION = 2
+CURRENT_CRMSCRIPT_VERSION = 5
+
+# Size of each chunk read from the response when streaming
+STREAM_CHUNK_SIZE: int = 64 * 1024
+
+class FetchRequestError(Exception):
+    """Raised while creating files, when a request still running in the background fails."""
+
 
 class FetchService:
     """
     Coordinates the fetch operation at the service level.
     Handles tenant validation, fetch execution, and response formatting.
     """
+    def __init__(self, session: requests.Session | None = None,
+                 timeout: tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT)):
+        """
+        All requests go through the same session, so its pooled connections are reused across tenants.
+        With no session, one is created with the defaults in http_session.py.
+        timeout is (connect timeout, read timeout) in seconds.
+        """
+        self.session: requests.Session = session or create_session()
+        self.timeout: tuple[float, float] = timeout
+        # Group requests in flight across all tenants fetched at once, kept within the connections the pool keeps -
+        # urllib3 would otherwise discard each one above it ("Connection pool is full") instead of reusing it
+        self.group_request_slots = threading.BoundedSemaphore(POOL_MAXSIZE)
+
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self.session.close()
 
     @staticmethod
-    def build_script_url(tenant: dict) -> str:
-        """Builds the URL we call SuperOffice with to fetch data."""
+    def build_script_url(tenant: dict, since: str = "", page: dict[str, str] | None = None) -> str:
+        """
+        Builds the URL we call SuperOffice with to fetch data.
+        With since set, the fetcher script only sends the rows of scripts, triggers and screen choosers
+        updated since then.
+        page holds the extra parameters of a paged fetch's requests, see get_superoffice_pages().
+        """
         script_url: str = (
             f"{tenant.get('url')}/scripts/customer.fcgi?action=safeParse"
             f"&includeId={tenant.get('include_id')}"
@@ -25,29 +96,35 @@ class FetchService:
         for key, value in tenant["fetch_options"].items():
             script_url += f"&{key}={str(value)}"
 
+        if since:
+            script_url += f"&since={quote(since)}"
+
+        for key, value in (page or {}).items():
+            script_url += f"&{key}={quote(value)}"
+
         return script_url
 
-    def get_superoffice_data(self, tenant: dict) -> tuple[dict | None, str]:
+    @traced("request")
+    def send_request(self, script_url: str, stream: bool = False) -> tuple[Response | None, str]:
         """
-        Fetches JSON data from SuperOffice.
-        Returns tuple of (data, error_message).
+        Does the GET request to SuperOffice.
+        Returns tuple of (response, error_message).
         """
-        script_url = self.build_script_url(tenant)
-        log(f"Getting JSON data from SuperOffice using endpoint: {script_url}")
-
         try:
             # Do GET request to Superoffice
-            response: Response = requests.get(script_url)
+            response: Response = self.session.get(script_url, stream=stream, timeout=self.timeout)
             response.raise_for_status()  # Raises exception for any bad HTTP status
+            return response, ""
 
-        except requests.ConnectionError as e:
-            error = f"Failed to connect to SuperOffice: {str(e)}"
-            print(error)
-            return None, error
+        # Before ConnectionError, since ConnectTimeout is both
         except requests.Timeout as e:
             error = f"Request to SuperOffice timed out: {str(e)}"
             print(error)
             return None, error
+        except requests.ConnectionError as e:
+            error = f"Failed to connect to SuperOffice: {str(e)}"
+            print(error)
+            return None, error
         except requests.HTTPError as e:
             error = f"HTTP error occurred: {str(e)}"
             print(error)
@@ -57,18 +134,261 @@ class FetchService:
             print(error)
             return None, error
 
+    def get_superoffice_data(self, tenant: dict, transfer: dict, since: str = "",
+                             page: dict[str, str] | None = None) -> tuple[dict | None, str]:
+        """
+        Fetches JSON data from SuperOffice.
+        Returns tuple of (data, error_message). Bytes received are counted in transfer, see iter_body().
+        """
+        script_url = self.build_script_url(tenant, since, page)
+        log(f"Getting JSON data from SuperOffice using endpoint: {script_url}")
+
+        response: Response | None
+        error: str
+        # Streamed even though the whole body is read at once, since iter_body() reads it from the raw response
+        response, error = self.send_request(script_url, stream=True)
+        if error:
+            return None, error
+
         # Parse JSON and return data as dictionary from method
         try:
-            data: dict = json.loads(response.text)
+            with response, span("download") as download_span:
+                text: str = b"".join(self.iter_body(response, transfer)).decode(response.encoding or "utf-8",
+                                                                                 errors="replace")
+                download_span.set(**transfer)
+        # urllib3's own errors, e.g. the connection dropping half-way, since the body is read from the raw response
+        except (OSError, ValueError, zlib.error, requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            error = f"Failed to read response from SuperOffice: {str(e)}"
+            print(error)
+            return None, error
+
+        report(phase="parsing")
+        try:
+            with span("parse", characters=len(text)):
+                data: dict = json.loads(text)
             log("JSON fetched!")
             return data, ""
         except json.JSONDecodeError as e:
             error: str = (f"Invalid JSON response from server\n\nContacting URL: {script_url}\n\n"
                           f"{str(e)}\n\n"
-                          f"GET returned body:\n{response.text}")
+                          f"GET returned body:\n{text}")
             print(error)
             return None, error
 
+    def get_superoffice_stream(self, tenant: dict, transfer: dict,
+                               since: str = "") -> tuple[Iterator[tuple[str, Any]] | None, str]:
+        """
+        Fetches JSON data from SuperOffice without reading the whole response into memory first.
+        Returns tuple of (iterator of the JSON's top-level (key, value) pairs, error_message).
+        The response is read and parsed only as the iterator is consumed.
+        """
+        script_url = self.build_script_url(tenant, since)
+        log(f"Streaming JSON data from SuperOffice using endpoint: {script_url}")
+
+        response: Response | None
+        error: str
+        response, error = self.send_request(script_url, stream=True)
+        if error:
+            return None, error
+
+        return self.iter_response_items(response, transfer), ""
+
+    @classmethod
+    def iter_response_items(cls, response: Response, transfer: dict) -> Iterator[tuple[str, Any]]:
+        """Parses the streamed response incrementally, closing it once done."""
+        try:
+            reader = JsonStreamReader(cls.iter_body(response, transfer), response.encoding or "utf-8")
+            yield from reader.items()
+            log("JSON fetched!")
+        finally:
+            response.close()
+
+    @staticmethod
+    def iter_body(response: Response, transfer: dict) -> Iterator[bytes]:
+        """
+        Yields the response body in chunks, decompressing it ourselves instead of letting urllib3 do it,
+        so we can count both the bytes received over the network and the bytes they decompress to.
+        The counts are kept up to date in transfer["wire_bytes"] and transfer["decoded_bytes"].
+        """
+        transfer["wire_bytes"] = 0
+        transfer["decoded_bytes"] = 0
+        decoder = create_decoder(response.headers.get("Content-Encoding", ""))
+
+        for chunk in response.raw.stream(STREAM_CHUNK_SIZE, decode_content=False):
+            transfer["wire_bytes"] += len(chunk)
+            advance(bytes_downloaded=len(chunk))
+            if decoder:
+                chunk = decoder.decompress(chunk)
+            if chunk:
+                transfer["decoded_bytes"] += len(chunk)
+                yield chunk
+
+        if decoder:
+            chunk = decoder.flush()
+            if chunk:
+                transfer["decoded_bytes"] += len(chunk)
+                yield chunk
+
+    def get_superoffice_groups(self, tenant: dict, transfer: dict,
+                               since: str = "") -> tuple[Iterator[tuple[str, Any]] | None, str]:
+        """
+        Fetches each enabled group with its own request, all at the same time, so SuperOffice builds them in
+        parallel and the slowest group decides how long fetching takes instead of all of them added up.
+        Returns tuple of (iterator of (key, value) pairs like get_superoffice_stream(), error_message).
+        The iterator starts with the script version, then yields each group as soon as its response has arrived.
+        """
+        group_tenants: list[dict] = [self.single_group_tenant(tenant, option)
+                                     for option, enabled in tenant["fetch_options"].items() if enabled]
+        transfers: list[dict] = [{} for _ in group_tenants]
+
+        executor = ThreadPoolExecutor(max_workers=min(len(group_tenants), POOL_MAXSIZE))
+        get_data: Callable = bind_progress(bind_tracer(self.get_group_data))
+        futures: list[Future] = [executor.submit(get_data, group_tenant, group_transfer, since)
+                                 for group_tenant, group_transfer in zip(group_tenants, transfers)]
+        completed: Iterator[Future] = as_completed(futures)
+
+        # Shut down here unless iter_group_items() takes over the executor, so requests not sent yet are never sent
+        # once the fetch has failed or been cancelled
+        group_items: Iterator[tuple[str, Any]] | None = None
+        try:
+            # The first response tells us the script version, before any files are created
+            data: dict | None
+            error: str
+            data, error = next(completed).result()
+            script_version: int = data.get("script_version", 1) if data else 1
+            if not error and script_version < 2:
+                error = "Fetching groups in parallel requires fetcher script version 2 or later"
+            if error:
+                return None, error
+
+            group_items = self.iter_group_items(script_version, data, completed, executor, transfers, transfer)
+            return group_items, ""
+        finally:
+            if group_items is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_group_data(self, tenant: dict, transfer: dict, since: str = "") -> tuple[dict | None, str]:
+        """get_superoffice_data() for a single group, waiting for a connection if other fetches use them all."""
+        with self.group_request_slots:
+            return self.get_superoffice_data(tenant, transfer, since)
+
+    @staticmethod
+    def iter_group_items(script_version: int, first_data: dict, completed: Iterator[Future],
+                         executor: ThreadPoolExecutor, transfers: list[dict],
+                         transfer: dict) -> Iterator[tuple[str, Any]]:
+        """Yields the groups of each response as it completes. Raises FetchRequestError if a request fails."""
+        try:
+            yield "script_version", script_version
+            yield from ((key, value) for key, value in first_data.items() if key != "script_version")
+
+            for future in completed:
+                data: dict | None
+                error: str
+                data, error = future.result()
+                if error:
+                    raise FetchRequestError(error)
+                yield from ((key, value) for key, value in data.items() if key != "script_version")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            transfer["wire_bytes"] = sum(t.get("wire_bytes", 0) for t in transfers)
+            transfer["decoded_bytes"] = sum(t.get("decoded_bytes", 0) for t in transfers)
+
+    def get_superoffice_pages(self, tenant: dict, transfer: dict, since: str = "") -> tuple[dict | None, str]:
+        """
+        Fetches JSON data from SuperOffice like get_superoffice_data(), but with the largest lists (see PAGED_LISTS)
+        requested in pages of rows instead of all in one response. Each page is kept in a spool in the local
+        directory as soon as it has arrived, so if the connection drops, fetching again resumes from the pages
+        already downloaded - until clear_spool() is called once the data has been created.
+        The page size is adjusted to how fast pages download, see next_page_rows().
+        Returns tuple of (data, error_message).
+        """
+        spool = PageSpool(tenant, self.build_script_url(tenant, since))
+        transfer["wire_bytes"] = 0
+        transfer["decoded_bytes"] = 0
+
+        head: dict | None = spool.head()
+        if head is None:
+            error: str
+            head, error = self.get_superoffice_page(tenant, transfer, since, {"paged": "True"})
+            if error:
+                return None, error
+            if head.get("script_version", 1) < PAGED_SCRIPT_VERSION:
+                return head, ""  # Older fetcher scripts don't know paged, and have sent everything at once
+            spool.save_head(head)
+
+        for group_key, lists in PAGED_LISTS.items():
+            if group_key not in head:
+                continue
+            for list_key in lists:
+                error = self.download_pages(tenant, transfer, since, spool, list_key)
+                if error:
+                    return None, (f"{error}\n\nThe pages downloaded so far have been kept, "
+                                  f"so fetching again continues from there.")
+
+        with span("assemble_pages"):
+            return spool.data(), ""
+
+    def download_pages(self, tenant: dict, transfer: dict, since: str, spool: PageSpool, list_key: str) -> str:
+        """Downloads the pages of list_key not in spool yet. Returns an error message if a page failed."""
+        state: dict = spool.list_state(list_key)
+        while not state["done"]:
+            rows_requested: int = spool.page_rows
+            page: dict | None = None
+            error: str = ""
+            for attempt in range(PAGE_ATTEMPTS):
+                parameters: dict[str, str] = {"paged": "True", "list": list_key, "after_id": str(state["after_id"]),
+                                              "limit": str(rows_requested)}
+                start: float = time.perf_counter()
+                page, error = self.get_superoffice_page(tenant, transfer, since, parameters)
+                seconds: float = time.perf_counter() - start
+                if not error:
+                    break
+                rows_requested = max(MIN_PAGE_ROWS, rows_requested // 2)
+                log(f"Page of {list_key} after ID {state['after_id']} failed, "
+                    f"retrying with {rows_requested} rows: {error}")
+            if error:
+                return error
+
+            # Only an empty page is the last one: SuperOffice may send fewer rows than asked for before the end
+            rows: list[dict] = page.get(list_key, [])
+            spool.save_page(list_key, rows, done=not rows,
+                            page_rows=next_page_rows(rows_requested, len(rows), seconds))
+            state = spool.list_state(list_key)
+        return ""
+
+    def get_superoffice_page(self, tenant: dict, transfer: dict, since: str,
+                             page: dict[str, str]) -> tuple[dict | None, str]:
+        """Requests a single page of a paged fetch, adding its bytes to transfer."""
+        page_transfer: dict = {}
+        with span("page", **page):
+            data, error = self.get_superoffice_data(tenant, page_transfer, since, page)
+        transfer["wire_bytes"] += page_transfer.get("wire_bytes", 0)
+        transfer["decoded_bytes"] += page_transfer.get("decoded_bytes", 0)
+        return data, error
+
+    @staticmethod
+    def single_group_tenant(tenant: dict, fetch_option: str) -> dict:
+        """Returns a copy of tenant with only fetch_option enabled, to request a single group with."""
+        fetch_options: dict = {option: option == fetch_option for option in tenant["fetch_options"]}
+        return dict(tenant, fetch_options=fetch_options)
+
+    @staticmethod
+    def read_stream_header(items: Iterator[tuple[str, Any]]) -> tuple[int, dict | Iterator[tuple[str, Any]]]:
+        """
+        Reads the script version from the start of a streamed response.
+        Returns tuple of (script_version, data) where data is the not yet consumed part of the stream.
+        Version 1 has no script_version key, and is small enough to simply be read in full.
+        """
+        first_item: tuple[str, Any] | None = next(items, None)
+        if first_item is None:
+            return 1, {}
+
+        key, value = first_item
+        if key == "script_version":
+            return value, items
+
+        return 1, dict(chain([first_item], items))
+
     @staticmethod
     def validate_tenant(tenant: dict) -> str:
         """
@@ -92,15 +412,42 @@ class FetchService:
         if all(not option for option in tenant.get("fetch_options").values()):
             errors.append("You must check at least one fetch option")
 
+        if tenant.get("metadata_layout") and tenant["metadata_layout"] not in METADATA_LAYOUTS:
+            errors.append(f"Metadata layout must be one of: {', '.join(METADATA_LAYOUTS)}")
+
         if errors:
             return "Can not fetch CRMScripts because tenant settings are invalid:\n" + \
                 "\n".join(f"- {error}" for error in errors)
 
         return ""
 
-    def fetch(self, tenant) -> dict:
+    @traced("fetch")
+    def fetch(self, tenant, stream: bool = False, sync: bool = False, delta: bool = False,
+              parallel: bool = False, snapshot_store: SnapshotStore | None = None,
+              archive: str | None = None, search_index: SearchIndex | None = None, paged: bool = False) -> dict:
         """
         Main entry point for fetching data from SuperOffice for a specific tenant.
+        With stream set, the response is parsed while it downloads and each group's files are created
+        as soon as the group has arrived, instead of first holding the entire response in memory.
+        With sync set, only files that differ from those already on disk are written or deleted, and the
+        result gets a "changes" entry with counts of files added/changed/removed/unchanged.
+        With delta set, only the scripts, triggers and screen choosers changed since the previous delta fetch are
+        downloaded, and merged into the ones kept from that fetch. The result gets a "delta" entry.
+        With parallel set, each group is requested separately and concurrently, and created as soon as it has
+        arrived. stream is not used then.
+        With a snapshot_store, the fetched folders are saved to it as a new snapshot, and the result gets a
+        "snapshot" entry with its ID.
+        With archive set to a .zip, .tar.gz or .tgz path - or the tenant's archive_path set - the folders are
+        written into that archive instead of the local directory. sync and snapshot_store are not used then.
+        With a search_index, the tenant's CRMScript bodies in it are updated to the fetched ones, and the result
+        gets an "index" entry with counts of bodies added/changed/removed/unchanged.
+        With paged set, the largest lists are downloaded in pages, and a fetch interrupted half-way resumes from
+        the pages already downloaded the next time. Needs fetcher script version 5 - older ones send everything
+        at once as usual. stream and parallel are not used then.
+        With a FetchProgress active on the thread (see core/progress.py), it's kept up to date as the fetch runs.
+        Cancelling it stops the fetch before the local directory is changed, with "cancelled" set in the result.
+        An object named like another one in the same folder gets its ID added to its file names, and is listed in
+        a "collisions" entry of the result.
         """
 
         # The result that is returned to frontend
@@ -111,6 +458,9 @@ class FetchService:
             "info": ""
         }
 
+        # Where the search index documents are staged while the files are created, with a search_index
+        index_update: IndexUpdate | None = None
+
         try:
             # Make sure tenant is valid before trying to fetch
             validation_error: str = self.validate_tenant(tenant)
@@ -119,43 +469,169 @@ class FetchService:
                 result["error"] = validation_error
                 return result
 
+            # Checked before downloading anything
+            archive = archive or tenant.get("archive_path") or None
+            if archive:
+                try:
+                    archive_format(archive)
+                except ValueError as e:
+                    result["validation_error"] = True
+                    result["error"] = str(e)
+                    return result
+
+            report(phase="downloading", groups_total=sum(map(bool, tenant["fetch_options"].values())))
+
             # Fetch data from SuperOffice
-            data: dict | None
+            data: dict | Iterator[tuple[str, Any]] | None
             error: str
-            data, error = self.get_superoffice_data(tenant)
+            transfer: dict = {}  # Bytes received, filled in as the response is read
+            delta_state: dict | None = load_delta_state(tenant) if delta else None
+            since: str = delta_state["since"] if delta_state else ""
+            if paged:
+                stream = parallel = False
+                data, error = self.get_superoffice_pages(tenant, transfer, since)
+            elif parallel:
+                data, error = self.get_superoffice_groups(tenant, transfer, since)
+            elif stream:
+                data, error = self.get_superoffice_stream(tenant, transfer, since)
+            else:
+                data, error = self.get_superoffice_data(tenant, transfer, since)
 
             if error:
                 result["error"] = error
                 return result
 
+            # Get script version
+            # Version 1 had no script_version key in JSON, so we default to that if none is present
+            script_version: int
+            if stream or parallel:
+                try:
+                    script_version, data = self.read_stream_header(data)
+                except json.JSONDecodeError as e:
+                    result["error"] = f"Invalid JSON response from server\n\n{str(e)}"
+                    return result
+
             if not data:
                 raise Exception("No data returned from GET request")
 
-            # Get script version
-            # Version 1 had no script_version key in JSON, so we default to that if none is present
-            script_version: int = data.get("script_version", 1)
+            if not (stream or parallel):
+                script_version = data.get("script_version", 1)
 
             if CURRENT_CRMSCRIPT_VERSION > script_version:
                 result["info"] = (f"Note! The fetcher CRMScript in use is not of the latest version. "
                                   f"Updating the script is recommended. Current script version is: {CURRENT_CRMSCRIPT_VERSION}")
 
+            delta_merger: DeltaMerger | None = None
+            if delta and script_version >= DELTA_SCRIPT_VERSION:
+                delta_merger = DeltaMerger(delta_state)
+                data = delta_merger.merge(data)
+
             # Create files and folder based on the JSON returned
+            index_update = search_index.begin_update(tenant) if search_index else None
             try:
-                data_creator = DataCreator(data, script_version, tenant)
+                data_creator = DataCreator(data, script_version, tenant, sync=sync, archive=archive,
+                                           index_update=index_update)
                 success: bool = data_creator.create()
 
                 if not success:
                     raise Exception("Failed to create local data files. Might be due to invalid script version?")
 
+                if paged:
+                    clear_spool(tenant)  # Only once created, so a failure creating them doesn't download them again
+
+                if data_creator.changes is not None:
+                    result["changes"] = data_creator.changes
+
+                if data_creator.retry_stats["retries"]:
+                    result["retries"] = data_creator.retry_stats
+
+                if data_creator.collisions:
+                    result["collisions"] = data_creator.collisions
+
+                if delta_merger:
+                    save_delta_state(tenant, delta_merger.new_state(tenant))
+                    result["delta"] = {"full": not delta_merger.is_delta, "since": since,
+                                       "changed_rows": delta_merger.changed_rows}
+
+                if transfer:
+                    result["transfer"] = transfer
+                    log(f"Received {transfer['wire_bytes']} bytes, "
+                        f"{transfer['decoded_bytes']} bytes after decompression")
+
+            except FetchRequestError as e:
+                result["error"] = str(e)
+                return result
+            except FetchCancelled:
+                raise
             except Exception as e:
                 result["error"] = f"Error creating local files: {str(e)}"
                 return result
 
+            # The fetch itself succeeded even if this fails, so it is only reported as info
+            if snapshot_store and not archive:
+                try:
+                    with span("snapshot"):
+                        folder_names: list[str] = data_creator.creator_folders[script_version]
+                        result["snapshot"] = snapshot_store.take(tenant, folder_names)
+                except OSError as e:
+                    result["info"] = "\n".join(filter(None, [result["info"], f"Failed to save snapshot: {str(e)}"]))
+
+            if index_update:
+                try:
+                    with span("search_index"):
+                        result["index"] = index_update.finish()
+                except (OSError, sqlite3.Error) as e:
+                    result["info"] = "\n".join(filter(None, [result["info"],
+                                                              f"Failed to update search index: {str(e)}"]))
+
             # Fetch and data creation was successful
             result["success"] = True
             return result
 
+        # Nothing in the local directory has been changed
+        except FetchCancelled as e:
+            result["cancelled"] = True
+            result["error"] = str(e)
+            return result
+
         # Something went wrong somewhere, return error to frontend
         except Exception as e:
             result["error"] = f"Unexpected error: {str(e)}"
             return result
+
+        finally:
+            if index_update:
+                index_update.close()  # Drops the documents staged by a fetch that failed. Already closed if not.
+
+    def fetch_many(self, tenants: list[dict], jobs: int = 4,
+                   on_result: Callable[[dict, dict, float], None] | None = None,
+                   **fetch_kwargs) -> list[tuple[dict, dict, float]]:
+        """
+        Fetches several tenants concurrently, at most jobs at a time, so one tenant's network wait overlaps
+        with another tenant's file writing. fetch_kwargs are passed on to fetch() for every tenant.
+        on_result is called with (tenant, result, seconds) as each tenant finishes.
+        Returns (tenant, result, seconds) for every tenant, in the same order as tenants.
+        """
+        directory_counts = Counter(tenant.get("local_directory") for tenant in tenants)
+        shared: list[str] = [directory for directory, count in directory_counts.items() if count > 1]
+        if shared:
+            raise ValueError("Tenants fetched together can not share a local directory: " + ", ".join(sorted(shared)))
+
+        @bind_tracer
+        def timed_fetch(tenant: dict) -> tuple[dict, float]:
+            start: float = time.perf_counter()
+            with span("tenant", tenant=tenant.get("tenant_name")):
+                result: dict = self.fetch(tenant, **fetch_kwargs)
+            return result, time.perf_counter() - start
+
+        results: dict[int, tuple[dict, dict, float]] = {}
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures: dict = {executor.submit(timed_fetch, tenant): i for i, tenant in enumerate(tenants)}
+            for future in as_completed(futures):
+                i: int = futures[future]
+                result, seconds = future.result()  # fetch() catches and returns its own errors
+                results[i] = (tenants[i], result, seconds)
+                if on_result:
+                    on_result(tenants[i], result, seconds)
+
+        return [results[i] for i in range(len(tenants))]
@@ -0,0 +1,67 @@
+# Builds the pooled HTTP session FetchService talks to SuperOffice through
+import zlib
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Seconds to wait for the TCP/TLS connection to SuperOffice to be established
+CONNECT_TIMEOUT: float = 10
+
+# Seconds to wait for SuperOffice to send the next bytes of the response.
+# Generous, since the fetcher script builds the whole JSON before sending anything on large tenants.
+READ_TIMEOUT: float = 300
+
+# Number of hosts to keep connections to, and connections kept per host.
+# Several tenants are usually on the same *.superoffice.com host, so pool_maxsize should be at least
+# the number of tenants fetched concurrently.
+POOL_CONNECTIONS: int = 10
+POOL_MAXSIZE: int = 10
+
+# Retries of a GET that failed to connect or got a gateway error back, waiting backoff_factor * 2^n seconds between.
+# A GET that timed out reading is not retried, as each try would wait READ_TIMEOUT again.
+RETRIES: int = 2
+BACKOFF_FACTOR: float = 0.5
+RETRY_STATUSES: list[int] = [502, 503, 504]
+
+# Compression SuperOffice's web server may apply to the response, if we say we accept it
+ACCEPT_ENCODING: str = "gzip, deflate"
+
+
+def create_session(pool_connections: int = POOL_CONNECTIONS,
+                   pool_maxsize: int = POOL_MAXSIZE,
+                   retries: int = RETRIES,
+                   backoff_factor: float = BACKOFF_FACTOR) -> requests.Session:
+    """
+    Returns a session that keeps connections alive between requests, so fetching several tenants on the same host
+    only pays for the TCP+TLS handshake once. Set retries to 0 to disable retrying.
+    """
+    retry = Retry(
+        total=retries,
+        read=False,  # A stalled response is reported as a timeout, not waited for again like connection errors
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET"],  # Only idempotent requests are retried
+        raise_on_status=False,  # Let raise_for_status() report the last response as usual
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def create_decoder(content_encoding: str):
+    """
+    Returns a zlib decompressor for a response's Content-Encoding header, or None if the body is not compressed.
+    Raises ValueError for encodings other than those in ACCEPT_ENCODING.
+    """
+    content_encoding = content_encoding.strip().lower()
+    if content_encoding in ("", "identity"):
+        return None
+    if content_encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if content_encoding == "deflate":
+        return zlib.decompressobj()
+    raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
@@ -0,0 +1,127 @@
+# Encodes the .json files created from the fetched data, byte for byte as json.dumps(content, indent=4,
+# ensure_ascii=False) does - the format they have always had - so files whose content hasn't changed stay the same.
+# The json module only uses its C encoder without indent, so every file used to be encoded in pure Python. orjson,
+# when installed, is used instead. See benchmarks/bench_json_encoding.py for how they compare.
+import json
+from typing import Any
+from typing import Callable
+
+JSON_INDENT: int = 4
+
+
+class JsonEncoder:
+    """Encodes JSON with the json module, reusing one json.JSONEncoder instead of creating one per file."""
+    name: str = "json"
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(indent=JSON_INDENT, ensure_ascii=False)
+
+    def encode(self, content: Any) -> bytes:
+        """Returns content as UTF-8 encoded JSON, with Unix newlines."""
+        return self.encoder.encode(content).encode("utf-8")
+
+    def encode_batch(self, contents: list) -> list[bytes]:
+        """Returns each of contents encoded like encode() does."""
+        return [self.encode(content) for content in contents]
+
+
+class OrjsonEncoder(JsonEncoder):
+    """
+    Encodes JSON with orjson, which is written in Rust. Its output is turned into exactly that of the json module:
+    orjson only indents by 2 spaces, so the indentation is doubled.
+    Content orjson would encode differently - floats, which it writes in another notation past 1e16 and below
+    1e-4 - or can't encode at all, e.g. non-string keys or integers over 64 bits, is encoded by the json module.
+    """
+    name: str = "orjson"
+
+    def __init__(self):
+        import orjson  # Raises ImportError when not installed, see get_json_encoder()
+
+        super().__init__()
+        self.dumps = orjson.dumps
+        self.option: int = orjson.OPT_INDENT_2
+
+    def encode(self, content: Any) -> bytes:
+        if has_floats(content):
+            return super().encode(content)
+        try:
+            return double_indent(self.dumps(content, option=self.option))
+        except TypeError:  # orjson.JSONEncodeError
+            return super().encode(content)
+
+    def encode_batch(self, contents: list) -> list[bytes]:
+        """
+        Checks contents for floats once, instead of once per content. Each content is still encoded on its own:
+        orjson takes about a microsecond per call, while splitting one large array back into its items would take
+        longer than that, being a few more passes over every byte.
+        """
+        if has_floats(contents):
+            return super().encode_batch(contents)
+        dumps: Callable[..., bytes] = self.dumps
+        option: int = self.option
+        try:
+            return [double_indent(dumps(content, option=option)) for content in contents]
+        except TypeError:
+            return super().encode_batch(contents)
+
+
+def has_floats(content: Any) -> bool:
+    """Returns whether content has a float anywhere in it."""
+    stack: list = [content]
+    while stack:
+        value = stack.pop()
+        value_type: type = type(value)
+        if value_type is float:
+            return True
+        if value_type is dict:
+            stack.extend(value.values())
+        elif value_type is list or value_type is tuple:
+            stack.extend(value)
+    return False
+
+
+def double_indent(data: bytes) -> bytes:
+    """
+    Returns JSON indented by 2 spaces per level indented by 4 instead. A string never has a raw newline in it, so
+    every newline is followed by indentation only. Adds 2 spaces to every line indented by at least 1 level, then
+    to every line indented by at least 2, and so on - a line at level n has 4n - 2 spaces when it's its turn,
+    while lines at the levels above it already have their final 4(n - 1) spaces.
+    """
+    level: int = 1
+    while True:
+        indentation: bytes = b"\n" + b" " * (4 * level - 2)
+        if indentation not in data:
+            return data
+        data = data.replace(indentation, indentation + b"  ")
+        level += 1
+
+
+# Key = Name of an encoder, for set_json_encoder(). Value = Its class.
+JSON_ENCODERS: dict[str, type[JsonEncoder]] = {
+    JsonEncoder.name: JsonEncoder,
+    OrjsonEncoder.name: OrjsonEncoder,
+}
+
+_encoder: JsonEncoder | None = None
+
+
+def get_json_encoder() -> JsonEncoder:
+    """
+    Returns the encoder the .json files are encoded with: orjson if installed, else the json module.
+    Only looked up when the first file is encoded, since commands that don't create files don't need orjson.
+    """
+    global _encoder
+    if _encoder is None:  # Two threads may both create one, which is harmless
+        try:
+            _encoder = OrjsonEncoder()
+        except ImportError:
+            _encoder = JsonEncoder()
+    return _encoder
+
+
+def set_json_encoder(name: str) -> None:
+    """Makes the .json files be encoded with the named encoder. Raises ImportError if it isn't installed."""
+    global _encoder
+    if name not in JSON_ENCODERS:
+        raise ValueError(f"Unknown JSON encoder {name}. Choose from: {', '.join(JSON_ENCODERS)}")
+    _encoder = JSON_ENCODERS[name]()
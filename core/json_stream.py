@@ -0,0 +1,196 @@
+# Incremental reader for the fetcher script's JSON response
+import codecs
+import json
+import re
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+_WHITESPACE: str = " \t\n\r"
+
+# Once this many characters of the buffer have been consumed, they are dropped from it.
+# Keeps the buffer roughly the size of the record currently being decoded.
+_COMPACT_THRESHOLD: int = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+# What changes the nesting while scanning for the end of a value: inside a string only its end and escapes,
+# outside of one brackets, braces and the start of a string
+_STRING_SPECIAL = re.compile(r'["\\]')
+_NESTING_SPECIAL = re.compile(r'[\[\]{}"]')
+
+
+class JsonStreamReader:
+    """
+    Decodes the fetcher script's JSON response from an iterable of byte chunks, without ever holding the full
+    response text in memory.
+
+    The response is one top-level object of groups ("group_scripts", "group_screens", ...), where each group is
+    an object of arrays of records. Those two outer levels are walked here one token at a time, while each single
+    record is decoded by the stdlib json decoder as soon as all of its characters have arrived.
+    """
+    def __init__(self, chunks: Iterable[bytes], encoding: str = "utf-8"):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder(encoding)()
+        self._buffer: str = ""
+        self._pos: int = 0
+        self._exhausted: bool = False
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        """
+        Yields each top-level (key, value) pair of the response, in the order they arrive.
+        Same pairs as json.loads(response).items(), but each group is only assembled once its own records arrive.
+        """
+        self._expect("{")
+        for key in self._keys():
+            yield key, self._read(depth=1)
+
+        if self._peek():
+            self._error("Extra data")
+
+    def _read(self, depth: int) -> Any:
+        """Reads the next value. Groups and their arrays (depth 1-2) are walked, anything deeper is decoded whole."""
+        char: str = self._peek()
+        if depth < 2 and char == "{":
+            self._pos += 1
+            return {key: self._read(depth + 1) for key in self._keys()}
+
+        if depth <= 2 and char == "[":
+            self._pos += 1
+            return list(self._elements())
+
+        return self._decode()
+
+    def _keys(self) -> Iterator[str]:
+        """
+        Yields each key of the object whose "{" was just consumed.
+        The caller must read the key's value before asking for the next key.
+        """
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key: Any = self._decode()
+            if not isinstance(key, str):
+                self._error("Expecting property name enclosed in double quotes")
+
+            self._expect(":")
+            yield key
+
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            self._expect(",")
+
+    def _elements(self) -> Iterator[Any]:
+        """Yields each element of the array whose "[" was just consumed, decoding one element at a time."""
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode()
+
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            self._expect(",")
+
+    def _decode(self) -> Any:
+        """Decodes one complete JSON value at the current position, reading more chunks until it is complete."""
+        self._compact()
+        if self._peek() in ("{", "[", '"'):
+            # A record or string is decoded once all of it has arrived, rather than again from its start on every
+            # chunk it spans
+            if self._scan_to_end():
+                value, self._pos = _decoder.raw_decode(self._buffer, self._pos)
+                return value
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Most likely the value just continues in the next chunk - only a real error once the stream has ended
+                if not self._fill():
+                    raise
+                continue
+
+            # A number at the very end of the buffer might have more digits in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def _scan_to_end(self) -> bool:
+        """
+        Reads chunks until the buffer holds all of the object, array or string at the current position, carrying
+        on from where the previous chunk was scanned to. Returns False if the stream ends first.
+        """
+        scan: int = self._pos
+        depth: int = 0
+        in_string: bool = False
+        while True:
+            match: re.Match | None = (_STRING_SPECIAL if in_string else _NESTING_SPECIAL).search(self._buffer, scan)
+            if match is None or (match.group() == "\\" and match.end() == len(self._buffer)):
+                # Scanned all there is so far - an escape is scanned again along with the character it escapes
+                scan = len(self._buffer) if match is None else match.start()
+                if not self._fill():
+                    return False
+                continue
+
+            char: str = match.group()
+            scan = match.end()
+            if char == "\\":
+                scan += 1
+            elif char == '"':
+                in_string = not in_string
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+
+            if depth == 0 and not in_string:
+                return True
+
+    def _peek(self) -> str:
+        """Skips whitespace and returns the next character without consuming it. Returns "" at end of stream."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            self._error(f"Expecting '{char}' delimiter")
+        self._pos += 1
+
+    def _fill(self) -> bool:
+        """Appends the next non-empty chunk of text to the buffer. Returns False if the stream is exhausted."""
+        if self._exhausted:
+            return False
+
+        for chunk in self._chunks:
+            text: str = self._text_decoder.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+
+        self._text_decoder.decode(b"", final=True)  # Raises if the stream ended mid-character
+        self._exhausted = True
+        return False
+
+    def _compact(self) -> None:
+        """Drops the already consumed part of the buffer."""
+        if self._pos > _COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+
+    def _error(self, message: str) -> None:
+        raise json.JSONDecodeError(message, self._buffer, self._pos)
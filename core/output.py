@@ -0,0 +1,267 @@
+# Where create_folder/create_file/create_json_file in core/utility.py write to
+import io
+import os
+import tarfile
+import threading
+import time
+import warnings
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator
+
+# Key = File name ending. Value = Format of archives with that ending, for ArchiveOutput
+ARCHIVE_FORMATS: dict[str, str] = {".zip": "zip", ".tar.gz": "tar", ".tgz": "tar"}
+
+# zlib level of files compressed into archives. The default of 6 is as small as 9 for text, and much faster.
+ARCHIVE_COMPRESS_LEVEL: int = 6
+
+# Files a ThreadedDirectoryOutput writes at the same time
+WRITER_THREADS: int = 8
+
+# Files a ThreadedDirectoryOutput holds in memory waiting to be written, before write_file() waits for a free slot
+WRITER_QUEUE_SIZE: int = 256
+
+
+class FileWriteError(Exception):
+    """Raised when a file handed to a ThreadedDirectoryOutput could not be written."""
+    def __init__(self, path: str, error: Exception):
+        super().__init__(f"Failed to write file {path}: {str(error)}")
+        self.path: str = path
+
+
+class DirectoryOutput:
+    """Writes folders and files straight to the local file system. Used unless another output is active."""
+
+    def create_folder(self, path: str) -> None:
+        """Creates a single folder. Raises OSError if it already exists."""
+        os.mkdir(path)
+
+    def write_file(self, path: str, data: bytes) -> None:
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+class ThreadedDirectoryOutput(DirectoryOutput):
+    """
+    Writes files to the local file system from a pool of threads, so the latency of each open/write/close
+    (high on network drives, and with antivirus scanning every new file) overlaps with that of other files.
+    Folders are still created right away on the calling thread, so a folder always exists before any of its
+    files are queued. Call flush() to wait for every queued file to be written.
+    Used as a context manager, which waits for queued files and stops the threads on exit.
+    """
+    def __init__(self, threads: int = WRITER_THREADS, queue_size: int = WRITER_QUEUE_SIZE):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="file-writer")
+        self.free_slots = threading.Semaphore(queue_size)
+        self.condition = threading.Condition()
+        self.pending: int = 0  # Files queued or being written
+        self.error: FileWriteError | None = None  # The first file that failed
+
+        # Key = Normalized file path. Value = Its latest write, so writes to the same path happen in order.
+        # Only files queued or being written, see forget_write().
+        self.writes: dict[str, Future] = {}
+
+    def __enter__(self) -> "ThreadedDirectoryOutput":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.wait()
+        self.executor.shutdown()
+
+    def write_file(self, path: str, data: bytes) -> None:
+        """Queues the file to be written, waiting first if the queue is full. Raises the error of a failed file."""
+        self.raise_error()
+
+        # A later file of the same name must still replace the earlier one, like when written one by one
+        key: str = os.path.normcase(os.path.normpath(path))
+        previous_write: Future | None = self.writes.get(key)
+        if previous_write:
+            previous_write.result()
+
+        self.free_slots.acquire()
+        with self.condition:
+            self.pending += 1
+            future: Future = self.executor.submit(self.write_queued_file, path, data)
+            self.writes[key] = future
+        future.add_done_callback(lambda done: self.forget_write(key, done))
+
+    def forget_write(self, key: str, future: Future) -> None:
+        """
+        Drops a written file's Future, unless a later write to the path has replaced it. Kept until flush(), the
+        Futures of a fetch of many files would add up to more memory than any one group of the files.
+        """
+        with self.condition:
+            if self.writes.get(key) is future:
+                del self.writes[key]
+
+    def write_queued_file(self, path: str, data: bytes) -> None:
+        try:
+            super().write_file(path, data)
+        except Exception as e:
+            with self.condition:
+                if self.error is None:
+                    self.error = FileWriteError(path, e)
+        finally:
+            self.free_slots.release()
+            with self.condition:
+                self.pending -= 1
+                self.condition.notify_all()
+
+    def flush(self) -> None:
+        """Waits until every queued file has been written. Raises FileWriteError if any of them failed."""
+        self.wait()
+        self.writes.clear()
+        self.raise_error()
+
+    def wait(self) -> None:
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending == 0)
+
+    def raise_error(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+
+class MemoryOutput:
+    """
+    Collects folders and files in memory instead of writing them.
+    Used to compute the whole target tree of a fetch before touching the disk.
+    """
+    def __init__(self):
+        self.folders: set[str] = set()
+        self.files: dict[str, bytes] = {}  # Key = File path. Value = File contents
+
+    def create_folder(self, path: str) -> None:
+        if path in self.folders:
+            raise FileExistsError(path)
+        self.folders.add(path)
+
+    def write_file(self, path: str, data: bytes) -> None:
+        self.files[path] = data
+
+
+def archive_format(archive_path: str) -> str:
+    """Returns "zip" or "tar" depending on how archive_path ends. Raises ValueError for any other ending."""
+    for ending, archive_format_name in ARCHIVE_FORMATS.items():
+        if archive_path.lower().endswith(ending):
+            return archive_format_name
+    raise ValueError(f"Unsupported archive type: {archive_path}. Use one of {', '.join(ARCHIVE_FORMATS)}")
+
+
+class ArchiveOutput:
+    """
+    Writes folders and files into a single zip or tar.gz archive, in one sequential stream, instead of
+    creating each of them on the local file system. Paths are stored relative to root_directory.
+    The archive is written to a temporary file which replaces archive_path when the output is closed, so an
+    interrupted fetch never leaves a half-written archive behind. Used as a context manager, which closes the
+    output on success and discards it if the with block raised.
+    """
+    def __init__(self, archive_path: str, root_directory: str):
+        self.format: str = archive_format(archive_path)
+        self.archive_path: str = archive_path
+        self.root_directory: str = root_directory
+        self.temporary_path: str = f"{archive_path}.tmp"
+        self.folders: set[str] = set()
+        self.files: set[str] = set()
+        self.mtime: float = time.time()
+
+        self.archive: zipfile.ZipFile | tarfile.TarFile
+        if self.format == "zip":
+            self.archive = zipfile.ZipFile(self.temporary_path, "w", compression=zipfile.ZIP_DEFLATED,
+                                           compresslevel=ARCHIVE_COMPRESS_LEVEL)
+        else:
+            self.archive = tarfile.open(self.temporary_path, "w:gz", compresslevel=ARCHIVE_COMPRESS_LEVEL)
+
+    def __enter__(self) -> "ArchiveOutput":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def create_folder(self, path: str) -> None:
+        """Adds a folder entry. Raises FileExistsError if it has already been added, like DirectoryOutput."""
+        name: str = self.archive_name(path)
+        if name in self.folders:
+            raise FileExistsError(path)
+        self.folders.add(name)
+
+        if self.format == "zip":
+            info = zipfile.ZipInfo(f"{name}/", time.localtime(self.mtime)[:6])
+            info.external_attr = (0o40755 << 16) | 0x10  # Unix directory with rwxr-xr-x, and MS-DOS directory flag
+            self.archive.writestr(info, b"")
+        else:
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            info.mtime = self.mtime
+            self.archive.addfile(info)
+
+    def write_file(self, path: str, data: bytes) -> None:
+        """
+        Adds a file entry. An archive can't be rewritten in place, so a file written twice is added twice -
+        extracting it leaves the last one, like writing it twice to the file system does.
+        """
+        name: str = self.archive_name(path)
+        duplicate: bool = name in self.files
+        self.files.add(name)
+
+        if self.format == "zip":
+            info = zipfile.ZipInfo(name, time.localtime(self.mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o100644 << 16  # Unix file with rw-r--r--
+            if duplicate:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", UserWarning)  # zipfile warns about duplicate names
+                    self.archive.writestr(info, data)
+            else:
+                self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = self.mtime
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def archive_name(self, path: str) -> str:
+        return os.path.relpath(path, self.root_directory).replace(os.sep, "/")
+
+    def close(self) -> None:
+        """Finishes the archive and moves it in place of archive_path."""
+        self.archive.close()
+        os.replace(self.temporary_path, self.archive_path)
+
+    def discard(self) -> None:
+        """Closes and deletes the unfinished archive, leaving any previous one at archive_path untouched."""
+        self.archive.close()
+        try:
+            os.remove(self.temporary_path)
+        except FileNotFoundError:
+            pass
+
+
+Output = DirectoryOutput | ThreadedDirectoryOutput | MemoryOutput | ArchiveOutput
+
+_directory_output = DirectoryOutput()
+
+# Per thread, so tenants fetched concurrently can each write to their own output
+_active = threading.local()
+
+
+def get_output() -> Output:
+    """Returns the output that files/folders are currently written to on this thread."""
+    return getattr(_active, "output", _directory_output)
+
+
+@contextmanager
+def use_output(output: Output) -> Iterator[Output]:
+    """Makes output the one written to on this thread, until the with block exits."""
+    previous: Output = get_output()
+    _active.output = output
+    try:
+        yield output
+    finally:
+        _active.output = previous
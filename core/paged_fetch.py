@@ -0,0 +1,147 @@
+# Paged fetching: downloading the largest lists (script bodies, screens...) in pages of rows, each kept in a spool
+# in the tenant's local directory as soon as it has arrived, so an interrupted fetch resumes where it stopped
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from core.utility import log
+
+# Fetcher script version that first understood the paged, list, after_id and limit parameters
+PAGED_SCRIPT_VERSION: int = 5
+
+# Where the pages downloaded so far are kept, inside the tenant's local directory. Deleted once the fetch succeeds.
+SPOOL_DIRECTORY_NAME: str = ".crmfetch_spool"
+
+# Pages older than this are downloaded again rather than resumed, since they may no longer be up to date
+SPOOL_MAX_AGE_SECONDS: float = 6 * 60 * 60
+
+# Rows asked for in the first page of a fetch. Later pages are sized by next_page_rows().
+INITIAL_PAGE_ROWS: int = 500
+MIN_PAGE_ROWS: int = 50
+MAX_PAGE_ROWS: int = 20_000
+
+# Pages are sized to take about this long to download, so a dropped connection only loses a few seconds of
+# downloading, without a page being requested per handful of rows on fast connections
+TARGET_PAGE_SECONDS: float = 3.0
+
+# Times a page is requested before giving up - each time with half as many rows
+PAGE_ATTEMPTS: int = 3
+
+# Key = Group key of a group with lists sent in pages by fetcher script version 5.
+# Value = Key = Key of a list sent in pages. Value = Fields the full response orders its rows by.
+# Pages are sent ordered by ID, so the rows are sorted back into that order once all of them have arrived.
+PAGED_LISTS: dict[str, dict[str, tuple[str, ...]]] = {
+    "group_scripts": {"scripts": ("hierarchy_id", "id")},
+    "group_triggers": {"triggers": ("id",)},
+    "group_screens": {
+        "screen_definition": ("hierarchy_id", "id"),
+        "screen_definition_action": ("screen_definition", "id"),
+        "screen_definition_element": ("screen_definition", "id"),
+    },
+    "group_screen_choosers": {"screen_choosers": ("id",)},
+}
+
+
+def get_spool_directory(tenant: dict) -> str:
+    return os.path.join(tenant["local_directory"], SPOOL_DIRECTORY_NAME)
+
+
+def clear_spool(tenant: dict) -> None:
+    """Deletes the pages of the tenant's paged fetch, once they've been created."""
+    shutil.rmtree(get_spool_directory(tenant), ignore_errors=True)
+
+
+def next_page_rows(rows_requested: int, rows_received: int, seconds: float) -> int:
+    """
+    Returns the rows to ask for in the next page, from how fast the previous one downloaded: enough for about
+    TARGET_PAGE_SECONDS, but at most twice or half as many as before, so a single slow or fast page doesn't throw
+    the size off.
+    """
+    rate: float = rows_received / max(seconds, 0.001)
+    target: float = rate * TARGET_PAGE_SECONDS
+    target = min(max(target, rows_requested / 2), rows_requested * 2)
+    return int(min(max(target, MIN_PAGE_ROWS), MAX_PAGE_ROWS))
+
+
+class PageSpool:
+    """
+    The response of one paged fetch downloaded so far: its head (everything but the paged lists), and the pages of
+    each paged list. Kept in the spool directory, with a manifest saved after every page.
+    Starts over if the spool is from a different request (e.g. the fetch options have changed) or too old.
+    """
+    def __init__(self, tenant: dict, request_url: str):
+        self.directory: str = get_spool_directory(tenant)
+        # Hashed, since the URL includes the script key
+        self.fingerprint: str = hashlib.sha256(request_url.encode("utf-8")).hexdigest()
+        self.manifest: dict = self.load_manifest()
+
+    def load_manifest(self) -> dict:
+        try:
+            manifest: dict = self.read_json("manifest.json")
+            if (manifest["fingerprint"] == self.fingerprint
+                    and time.time() - manifest["created"] < SPOOL_MAX_AGE_SECONDS):
+                log(f"Resuming paged fetch from {self.directory}")
+                return manifest
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            log(f"Ignoring unreadable spool, starting over: {str(e)}")
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+        return {"fingerprint": self.fingerprint, "created": time.time(), "head": False, "lists": {},
+                "page_rows": INITIAL_PAGE_ROWS}
+
+    def read_json(self, file_name: str):
+        with open(os.path.join(self.directory, file_name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def write_json(self, file_name: str, content) -> None:
+        """Writes a file of the spool, replacing the previous one only once fully written."""
+        path: str = os.path.join(self.directory, file_name)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(content, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    @property
+    def page_rows(self) -> int:
+        return self.manifest["page_rows"]
+
+    def head(self) -> dict | None:
+        return self.read_json("head.json") if self.manifest["head"] else None
+
+    def save_head(self, head: dict) -> None:
+        self.write_json("head.json", head)
+        self.manifest["head"] = True
+        self.write_json("manifest.json", self.manifest)
+
+    def list_state(self, list_key: str) -> dict:
+        """Returns the pages of list_key saved so far, the ID its next page starts after, and whether it's done."""
+        return self.manifest["lists"].get(list_key, {"pages": 0, "after_id": 0, "done": False})
+
+    def save_page(self, list_key: str, rows: list[dict], done: bool, page_rows: int) -> None:
+        """Saves a page of list_key's rows, ordered by ID. page_rows is the size to ask for from the next page on."""
+        state: dict = dict(self.list_state(list_key))
+        self.write_json(f"{list_key}.{state['pages']}.json", rows)
+        state["pages"] += 1
+        state["after_id"] = rows[-1]["id"] if rows else state["after_id"]
+        state["done"] = done
+        self.manifest["lists"][list_key] = state
+        self.manifest["page_rows"] = page_rows
+        self.write_json("manifest.json", self.manifest)
+
+    def data(self) -> dict:
+        """Returns the response the fetcher script would have sent without paging, once every page has arrived."""
+        data: dict = self.head()
+        for group_key, lists in PAGED_LISTS.items():
+            if not isinstance(data.get(group_key), dict):
+                continue
+            for list_key, order_fields in lists.items():
+                rows: list[dict] = []
+                for page in range(self.list_state(list_key)["pages"]):
+                    rows.extend(self.read_json(f"{list_key}.{page}.json"))
+                rows.sort(key=lambda row: tuple(row.get(field) for field in order_fields))
+                data[group_key][list_key] = rows
+        return data
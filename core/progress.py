@@ -0,0 +1,132 @@
+# Reports how far a fetch has come while it runs, and lets it be cancelled - for the GUI's progress bar
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+from typing import Iterator
+
+# Shortest time between two on_update calls for amounts, so writing thousands of files doesn't flood the GUI.
+# Phase changes are always reported straight away.
+MIN_UPDATE_INTERVAL: float = 0.1
+
+
+class FetchCancelled(Exception):
+    """Raised inside a fetch once its FetchProgress has been cancelled."""
+
+
+class FetchProgress:
+    """
+    The progress of one fetch: its phase, the group being created, and how many bytes have been downloaded,
+    groups created and files written so far. on_update is called with a copy of these values as they change,
+    from whichever thread changed them.
+    cancel() makes the fetch raise FetchCancelled at its next check, unless it has already started replacing the
+    local directory's folders - see commit().
+    """
+    def __init__(self, on_update: Callable[[dict], None] | None = None):
+        self.on_update: Callable[[dict], None] | None = on_update
+        self.lock = threading.Lock()
+        self.cancel_requested = threading.Event()
+        self.committed: bool = False
+        self.last_update: float = 0.0
+        self.values: dict = {
+            "phase": "starting",
+            "group": "",
+            "groups_done": 0,
+            "groups_total": 0,
+            "bytes_downloaded": 0,
+            "files_written": 0,
+        }
+
+    def cancel(self) -> bool:
+        """Asks the fetch to stop. Returns False if it's too late, since the folders are already being replaced."""
+        with self.lock:
+            self.cancel_requested.set()
+            return not self.committed
+
+    def check(self) -> None:
+        if self.cancel_requested.is_set() and not self.committed:
+            raise FetchCancelled("Fetch cancelled")
+
+    def commit(self, phase: str) -> None:
+        """Raises FetchCancelled if cancelled, and otherwise makes the fetch uncancellable from here on."""
+        with self.lock:
+            self.check()
+            self.committed = True
+        self.set(phase=phase)
+
+    def set(self, **values) -> None:
+        with self.lock:
+            self.values.update(values)
+        self.notify(force=True)
+
+    def add(self, **amounts: int) -> None:
+        self.check()
+        with self.lock:
+            for key, amount in amounts.items():
+                self.values[key] += amount
+        self.notify()
+
+    def notify(self, force: bool = False) -> None:
+        if self.on_update is None:
+            return
+        with self.lock:
+            now: float = time.monotonic()
+            if not force and now - self.last_update < MIN_UPDATE_INTERVAL:
+                return
+            self.last_update = now
+            values: dict = dict(self.values)
+        self.on_update(values)
+
+
+# Per thread, like the active tracer in core/tracing.py
+_active = threading.local()
+
+
+def get_progress() -> FetchProgress | None:
+    return getattr(_active, "progress", None)
+
+
+@contextmanager
+def use_progress(progress: FetchProgress | None) -> Iterator[FetchProgress | None]:
+    """Makes progress receive the updates of fetches on this thread, until the with block exits."""
+    previous: FetchProgress | None = get_progress()
+    _active.progress = progress
+    try:
+        yield progress
+    finally:
+        _active.progress = previous
+
+
+def report(**values) -> None:
+    """Sets values (e.g. phase="parsing") on the active progress, if any. Raises FetchCancelled if cancelled."""
+    progress: FetchProgress | None = get_progress()
+    if progress is not None:
+        progress.check()
+        progress.set(**values)
+
+
+def advance(**amounts: int) -> None:
+    """Adds amounts (e.g. files_written=1) to the active progress, if any. Raises FetchCancelled if cancelled."""
+    progress: FetchProgress | None = get_progress()
+    if progress is not None:
+        progress.add(**amounts)
+
+
+def commit(phase: str) -> None:
+    """
+    Called right before a fetch starts changing the local directory. Raises FetchCancelled if cancelled,
+    and otherwise makes the fetch run to completion from here on, so it's never left half-way.
+    """
+    progress: FetchProgress | None = get_progress()
+    if progress is not None:
+        progress.commit(phase)
+
+
+def bind_progress(function: Callable) -> Callable:
+    """Returns function wrapped to run with this thread's progress active, like bind_tracer()."""
+    progress: FetchProgress | None = get_progress()
+
+    def progress_function(*args, **kwargs):
+        with use_progress(progress):
+            return function(*args, **kwargs)
+    return progress_function
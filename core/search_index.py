@@ -0,0 +1,294 @@
+# Full-text index over the CRMScript bodies of fetched tenants, to search all of them without reading any files
+import hashlib
+import re
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+from core.utility import log
+
+# Key = Field of a screen_definition holding a script. Value = Name of the script, like its .crmscript file
+SCREEN_SCRIPTS: dict[str, str] = {
+    "creation_script": "Creation script",
+    "load_script_body": "Loading script (before setFromCgi)",
+    "load_post_cgi_script_body": "Loading script (after setFromCgi)",
+    "load_final_script_body": "Load script (run after everything else)",
+}
+
+# Kinds of documents in the index, which searches can be limited to
+SEARCH_KINDS: list[str] = ["script", "trigger", "screen", "screen_button", "screen_chooser"]
+
+# FTS5's trigram tokenizer indexes every 3 characters, so any substring of at least 3 characters can be looked up
+# in the index - not only whole words. Shorter patterns and regular expressions are matched against every body.
+MIN_INDEXED_PATTERN_LENGTH: int = 3
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    tenant_id INTEGER NOT NULL,
+    tenant_name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    part TEXT NOT NULL,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    UNIQUE (tenant_id, kind, object_id, part)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS bodies USING fts5(body, tokenize = 'trigram');
+"""
+
+
+def search_documents(group_key: str, group: dict) -> Iterator[dict]:
+    """
+    Yields a document for each non-empty CRMScript body in a group from the fetcher script's JSON.
+    Each has kind, object_id, part (which of an object's scripts it is, if it has several), name and body.
+    Must be called before the group's files are created, since that removes the bodies from the records.
+    """
+    if group_key == "group_scripts":
+        for script in group["scripts"]:
+            yield _document("script", script["id"], script.get("description"), script.get("body"))
+    elif group_key == "group_triggers":
+        for trigger in group["triggers"]:
+            yield _document("trigger", trigger["id"], trigger.get("description"), trigger.get("body"))
+    elif group_key == "group_screen_choosers":
+        for screen_chooser in group["screen_choosers"]:
+            yield _document("screen_chooser", screen_chooser["id"], screen_chooser.get("description"),
+                            screen_chooser.get("body"))
+    elif group_key == "group_screens":
+        screen_names: dict[int, str] = {}
+        for screen in group["screen_definition"]:
+            screen_names[screen["id"]] = screen.get("name")
+            for field, script_name in SCREEN_SCRIPTS.items():
+                yield _document("screen", screen["id"], f"{screen.get('name')} - {script_name}", screen.get(field),
+                                part=field)
+        for button in group["screen_definition_action"]:
+            yield _document("screen_button", button["id"],
+                            f"{screen_names.get(button.get('screen_definition'))} - {button.get('button')}",
+                            button.get("ejscript_body"))
+
+
+def _document(kind: str, object_id: int, name: str | None, body: str | None, part: str = "") -> dict:
+    return {"kind": kind, "object_id": object_id, "part": part, "name": name or f"Unnamed {kind} (ID {object_id})",
+            "body": body or ""}
+
+
+class SearchIndex:
+    """
+    An SQLite database at path, holding the CRMScript bodies of every tenant fetched with it in an FTS5 trigram
+    index, keyed by tenant and object ID. Shared by every tenant, so one search covers all of them.
+    A connection is opened per call, so it can be used from several threads (e.g. crmfetch fetch --all).
+    """
+    def __init__(self, path: Path):
+        self.path: Path = path
+
+    def connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)  # Waits for other tenants' updates to finish
+        connection.executescript(SCHEMA)
+        return connection
+
+    def update(self, tenant: dict, documents: Iterable[dict]) -> dict[str, int]:
+        """
+        Makes the tenant's documents in the index the given ones, only re-indexing bodies that changed.
+        Returns counts of documents added, changed, removed and unchanged.
+        """
+        with closing(self.connect()) as connection, connection:
+            return self.apply(connection, tenant, documents)
+
+    def begin_update(self, tenant: dict) -> "IndexUpdate":
+        """Returns an IndexUpdate, to update the tenant's documents like update() does while they are created."""
+        return IndexUpdate(self, tenant)
+
+    def apply(self, connection: sqlite3.Connection, tenant: dict, documents: Iterable[dict]) -> dict[str, int]:
+        """Does update() on connection, in the transaction the caller commits."""
+        changes: dict[str, int] = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        tenant_name: str = tenant.get("tenant_name", "")
+
+        # Key = (kind, object_id, part). Value = (Row ID, digest of its body, tenant name, document name)
+        existing: dict[tuple[str, int, str], tuple[int, str, str, str]] = {
+            (kind, object_id, part): (row_id, digest, previous_tenant_name, name)
+            for row_id, kind, object_id, part, digest, previous_tenant_name, name in connection.execute(
+                "SELECT id, kind, object_id, part, digest, tenant_name, name FROM documents WHERE tenant_id = ?",
+                (tenant["id"],))
+        }
+
+        indexed: set[tuple[str, int, str]] = set()
+        for document in documents:
+            key: tuple[str, int, str] = (document["kind"], document["object_id"], document["part"])
+            if not document["body"] or key in indexed:
+                continue
+            indexed.add(key)
+
+            digest: str = hashlib.sha256(document["body"].encode("utf-8")).hexdigest()
+            previous: tuple[int, str, str, str] | None = existing.pop(key, None)
+            if previous and previous[1] == digest:
+                changes["unchanged"] += 1
+                if previous[2:] != (tenant_name, document["name"]):  # Renamed, but the body is the same
+                    connection.execute("UPDATE documents SET tenant_name = ?, name = ? WHERE id = ?",
+                                       (tenant_name, document["name"], previous[0]))
+                continue
+
+            if previous:
+                changes["changed"] += 1
+                self.delete_document(connection, previous[0])
+            else:
+                changes["added"] += 1
+            row_id: int = connection.execute(
+                "INSERT INTO documents (tenant_id, tenant_name, kind, object_id, part, name, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (tenant["id"], tenant_name, *key, document["name"], digest)).lastrowid
+            connection.execute("INSERT INTO bodies (rowid, body) VALUES (?, ?)", (row_id, document["body"]))
+
+        # Left over are the ones deleted in SuperOffice, or not fetched anymore
+        for row_id, *_ in existing.values():
+            changes["removed"] += 1
+            self.delete_document(connection, row_id)
+
+        log(f"Search index: {changes['added']} added, {changes['changed']} changed, {changes['removed']} removed")
+        return changes
+
+    def tenants(self) -> list[dict]:
+        """Returns the indexed tenants, each with its tenant_id, tenant_name and number of documents."""
+        with closing(self.connect()) as connection:
+            return [{"tenant_id": tenant_id, "tenant_name": tenant_name, "documents": documents}
+                    for tenant_id, tenant_name, documents in connection.execute(
+                        "SELECT tenant_id, MAX(tenant_name), COUNT(*) FROM documents GROUP BY tenant_id "
+                        "ORDER BY tenant_id")]
+
+    def grep(self, pattern: str, tenant_ids: list[int] | None = None, kinds: list[str] | None = None,
+             ignore_case: bool = False, regex: bool = False) -> list[dict]:
+        """
+        Returns every line of an indexed body that contains pattern, or matches it as a regular expression.
+        Each match has the document's tenant_id, tenant_name, kind, object_id and name, plus line_number and line.
+        Raises re.error for an invalid regular expression.
+        """
+        if regex:
+            expression: re.Pattern = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        else:
+            expression = re.compile(re.escape(pattern), re.IGNORECASE if ignore_case else 0)
+
+        matches: list[dict] = []
+        for document, body in self.candidates(pattern if not regex else "", tenant_ids, kinds):
+            for line_number, line in enumerate(body.splitlines(), 1):
+                if expression.search(line):
+                    matches.append(dict(document, line_number=line_number, line=line))
+        return matches
+
+    def find(self, name: str, tenant_ids: list[int] | None = None, kinds: list[str] | None = None) -> list[dict]:
+        """Returns the documents whose name contains name, case-insensitive, without their bodies."""
+        where, parameters = self.filters(tenant_ids, kinds)
+        where.append("documents.name LIKE ? ESCAPE '\\'")
+        parameters.append("%" + re.sub(r"([%_\\])", r"\\\1", name) + "%")
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT tenant_id, tenant_name, kind, object_id, name FROM documents "
+                f"WHERE {' AND '.join(where)} ORDER BY tenant_id, kind, name", parameters)
+            return [self.document_from_row(row) for row in rows]
+
+    def candidates(self, substring: str, tenant_ids: list[int] | None,
+                   kinds: list[str] | None) -> Iterator[tuple[dict, str]]:
+        """
+        Yields (document, body) for each body that may contain substring, in the order they were indexed.
+        Uses the trigram index when substring is long enough. Otherwise, every body is yielded.
+        """
+        where, parameters = self.filters(tenant_ids, kinds)
+        if len(substring) >= MIN_INDEXED_PATTERN_LENGTH:
+            where.append("bodies MATCH ?")
+            parameters.append('"' + substring.replace('"', '""') + '"')  # A quoted string matches as a substring
+
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT documents.tenant_id, documents.tenant_name, documents.kind, documents.object_id, "
+                "documents.name, bodies.body FROM bodies JOIN documents ON documents.id = bodies.rowid "
+                f"WHERE {' AND '.join(where)} ORDER BY documents.tenant_id, documents.kind, documents.name", parameters)
+            for row in rows:
+                yield self.document_from_row(row[:5]), row[5]
+
+    @staticmethod
+    def filters(tenant_ids: list[int] | None, kinds: list[str] | None) -> tuple[list[str], list[Any]]:
+        """Returns the WHERE conditions and their parameters limiting a query to tenant_ids and kinds, if given."""
+        where: list[str] = ["1 = 1"]
+        parameters: list[Any] = []
+        if tenant_ids:
+            where.append(f"documents.tenant_id IN ({', '.join('?' * len(tenant_ids))})")
+            parameters.extend(tenant_ids)
+        if kinds:
+            where.append(f"documents.kind IN ({', '.join('?' * len(kinds))})")
+            parameters.extend(kinds)
+        return where, parameters
+
+    @staticmethod
+    def document_from_row(row: tuple) -> dict:
+        tenant_id, tenant_name, kind, object_id, name = row
+        return {"tenant_id": tenant_id, "tenant_name": tenant_name, "kind": kind, "object_id": object_id,
+                "name": name}
+
+    @staticmethod
+    def delete_document(connection: sqlite3.Connection, row_id: int) -> None:
+        connection.execute("DELETE FROM bodies WHERE rowid = ?", (row_id,))
+        connection.execute("DELETE FROM documents WHERE id = ?", (row_id,))
+
+
+class IndexUpdate:
+    """
+    A tenant's documents being indexed while its files are created, one group at a time. Each document is staged in
+    a temporary table on disk as it is added, so no body is held in memory until the fetch is done. The index itself
+    is only changed by finish(), in a single transaction like update() - never by a fetch that fails half-way, and
+    without locking the index for other tenants while the files are created.
+    An error is only raised by finish(), since the fetch itself succeeds without the index.
+    """
+    def __init__(self, index: SearchIndex, tenant: dict):
+        self.index: SearchIndex = index
+        self.tenant: dict = tenant
+        self.connection: sqlite3.Connection | None = None
+        self.error: Exception | None = None
+        try:
+            self.connection = index.connect()
+            self.connection.execute("PRAGMA temp_store = FILE")
+            self.connection.execute("CREATE TEMP TABLE staged (kind TEXT, object_id INTEGER, part TEXT, name TEXT, "
+                                    "body TEXT)")
+        except (OSError, sqlite3.Error) as e:
+            self.fail(e)
+
+    def add(self, documents: Iterable[dict]) -> None:
+        """Stages documents, e.g. those of search_documents() for a group, one at a time."""
+        if self.connection is None:
+            return
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO staged (kind, object_id, part, name, body) VALUES (?, ?, ?, ?, ?)",
+                    ((document["kind"], document["object_id"], document["part"], document["name"], document["body"])
+                     for document in documents if document["body"]))
+        except sqlite3.Error as e:
+            self.fail(e)
+
+    def finish(self) -> dict[str, int]:
+        """
+        Makes the tenant's documents in the index the staged ones, like update(). Returns its counts.
+        Raises OSError or sqlite3.Error if the index couldn't be updated.
+        """
+        if self.error is not None:
+            raise self.error
+        try:
+            with self.connection:
+                staged: Iterator[dict] = (
+                    {"kind": kind, "object_id": object_id, "part": part, "name": name, "body": body}
+                    for kind, object_id, part, name, body in self.connection.execute(
+                        "SELECT kind, object_id, part, name, body FROM staged ORDER BY rowid"))
+                return self.index.apply(self.connection, self.tenant, staged)
+        finally:
+            self.close()
+
+    def fail(self, error: Exception) -> None:
+        self.error = error
+        self.close()
+
+    def close(self) -> None:
+        """Drops what has been staged. Called by finish(), or instead of it when the fetch fails."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
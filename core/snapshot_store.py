@@ -0,0 +1,176 @@
+# Keeps a history of fetched trees, storing each distinct file body only once
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import Callable
+
+from core.output import MemoryOutput
+from core.tree_sync import sync_tree
+from core.utility import log
+
+
+class SnapshotStore:
+    """
+    Stores snapshots of the folders a fetch created, in root.
+    Each file body is stored once, compressed, under objects/ by its SHA-256 hash - so files that didn't change
+    between fetches, or that are identical across tenants sharing the store, take no extra space.
+    Each snapshot is a manifest under manifests/<tenant id>/ listing its folders and the hash of each file.
+    """
+    def __init__(self, root: Path):
+        self.root: Path = root
+        self.objects_directory: Path = root / "objects"
+        self.manifests_directory: Path = root / "manifests"
+
+    def take(self, tenant: dict, folder_names: list[str]) -> str:
+        """Stores the current contents of folder_names in the tenant's local directory. Returns the snapshot ID."""
+        folders, files = self.scan(tenant["local_directory"], folder_names, self.store_object)
+        created: datetime = datetime.now(timezone.utc)
+        manifest: dict = {
+            "id": self.new_snapshot_id(tenant["id"], created),
+            "created": created.isoformat(timespec="seconds"),
+            "tenant_id": tenant["id"],
+            "tenant_name": tenant.get("tenant_name", ""),
+            "folder_names": folder_names,
+            "folders": folders,
+            "files": files,
+        }
+
+        path: Path = self.manifest_path(tenant["id"], manifest["id"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.write_atomically(path, json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        log(f"Saved snapshot {manifest['id']} of {len(files)} files")
+        return manifest["id"]
+
+    def list_snapshots(self, tenant_id: int) -> list[dict]:
+        """Returns the manifests of a tenant's snapshots, oldest first."""
+        directory: Path = self.manifests_directory / str(tenant_id)
+        if not directory.is_dir():
+            return []
+        manifests: list[dict] = [self.read_manifest(path) for path in directory.glob("*.json")]
+        return sorted(manifests, key=lambda manifest: self.snapshot_sort_key(manifest["id"]))
+
+    def get_manifest(self, tenant_id: int, snapshot_id: str) -> dict:
+        """Returns a snapshot's manifest. snapshot_id may be "latest". Raises ValueError if there is no such snapshot."""
+        if snapshot_id == "latest":
+            snapshots: list[dict] = self.list_snapshots(tenant_id)
+            if not snapshots:
+                raise ValueError(f"No snapshots found for tenant ID {tenant_id}.")
+            return snapshots[-1]
+
+        path: Path = self.manifest_path(tenant_id, snapshot_id)
+        if not path.is_file():
+            raise ValueError(f"No snapshot {snapshot_id} found for tenant ID {tenant_id}.")
+        return self.read_manifest(path)
+
+    def read_object(self, digest: str) -> bytes:
+        with open(self.object_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def restore(self, manifest: dict, directory: str) -> dict[str, int]:
+        """
+        Makes the snapshot's folders in directory identical to the snapshot, only writing files that differ.
+        Returns counts of files added, changed, removed and unchanged.
+        """
+        target = MemoryOutput()
+        target.folders = {os.path.join(directory, folder) for folder in manifest["folders"]}
+        target.files = {os.path.join(directory, path): self.read_object(digest)
+                        for path, digest in manifest["files"].items()}
+        return sync_tree(target, [os.path.join(directory, folder_name) for folder_name in manifest["folder_names"]])
+
+    def diff(self, old: dict, new: dict) -> dict[str, list[str]]:
+        """Returns the paths of files added, removed and changed from manifest old to manifest new."""
+        old_files: dict[str, str] = old["files"]
+        new_files: dict[str, str] = new["files"]
+        return {
+            "added": sorted(path for path in new_files if path not in old_files),
+            "removed": sorted(path for path in old_files if path not in new_files),
+            "changed": sorted(path for path in new_files if path in old_files and new_files[path] != old_files[path]),
+        }
+
+    def current_manifest(self, tenant: dict, folder_names: list[str]) -> dict:
+        """Returns a manifest of what is in the tenant's local directory now, without storing anything."""
+        folders, files = self.scan(tenant["local_directory"], folder_names,
+                                   lambda data: hashlib.sha256(data).hexdigest())
+        return {"id": "local", "folder_names": folder_names, "folders": folders, "files": files}
+
+    def scan(self, local_directory: str, folder_names: list[str],
+             hash_file: Callable[[bytes], str]) -> tuple[list[str], dict[str, str]]:
+        """
+        Returns (folders, files) found in folder_names of local_directory, with paths relative to it using "/".
+        Key of files = Path. Value = hash_file() of its contents.
+        """
+        folders: list[str] = []
+        files: dict[str, str] = {}
+        for folder_name in folder_names:
+            for directory, _, file_names in os.walk(os.path.join(local_directory, folder_name)):
+                folders.append(self.relative_path(directory, local_directory))
+                for file_name in file_names:
+                    path: str = os.path.join(directory, file_name)
+                    with open(path, "rb") as f:
+                        files[self.relative_path(path, local_directory)] = hash_file(f.read())
+        return sorted(folders), dict(sorted(files.items()))
+
+    def store_object(self, data: bytes) -> str:
+        """Stores data unless it is already stored. Returns its hash."""
+        digest: str = hashlib.sha256(data).hexdigest()
+        path: Path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                self.write_atomically(path, zlib.compress(data))
+            except OSError:
+                # Tenants fetched at the same time often share files, so another thread may have just stored it -
+                # e.g. Windows refuses to replace a file another thread is replacing too
+                if not path.exists():
+                    raise
+        return digest
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_directory / digest[:2] / digest[2:]
+
+    def manifest_path(self, tenant_id: int, snapshot_id: str) -> Path:
+        return self.manifests_directory / str(tenant_id) / f"{snapshot_id}.json"
+
+    def new_snapshot_id(self, tenant_id: int, created: datetime) -> str:
+        """Returns an ID that sorts by time, e.g. 20241031-120000, with a suffix if taken within the same second."""
+        snapshot_id: str = created.strftime("%Y%m%d-%H%M%S")
+        suffix: int = 2
+        while self.manifest_path(tenant_id, snapshot_id).exists():
+            snapshot_id = f"{created.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+            suffix += 1
+        return snapshot_id
+
+    @staticmethod
+    def snapshot_sort_key(snapshot_id: str) -> tuple[str, int]:
+        """Sorts 20241031-120000 before 20241031-120000-2, which plain string sorting doesn't."""
+        suffix: str = snapshot_id[16:]
+        return snapshot_id[:15], int(suffix) if suffix else 1
+
+    @staticmethod
+    def read_manifest(path: Path) -> dict:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def relative_path(path: str, local_directory: str) -> str:
+        return Path(os.path.relpath(path, local_directory)).as_posix()
+
+    @staticmethod
+    def write_atomically(path: Path, data: bytes) -> None:
+        """
+        Writes to a temporary file first, so an interrupted write never leaves a half-written file behind.
+        Each write gets a temporary file of its own, so threads writing the same path don't write into each other's.
+        """
+        descriptor, temporary_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(data)
+            os.replace(temporary_path, path)
+        except BaseException:
+            Path(temporary_path).unlink(missing_ok=True)
+            raise
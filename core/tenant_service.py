@@ -1,12 +1,46 @@
+import copy
 import json
+import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
 from core.utility import get_app_directory
 
 
+@contextmanager
+def lock_file(path: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock on path (created if missing) until the with block exits, waiting for other processes
+    holding it first. Used to keep the GUI and CLI from writing tenant_settings.json at the same time.
+    """
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # Retries for 10 seconds before raising OSError
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
 class TenantService:
     """
     Used for reading and saving the tenant_settings.json file.
+    The parsed file is cached, and only read again once its modification time or size changes - e.g. when
+    the GUI and CLI share it. Methods return copies, so changing a returned tenant doesn't change the cache.
+    Writes hold a lock shared with other processes, re-read the file within it, and replace the file by renaming
+    a fully written temporary file - so concurrent writers can't lose each other's changes or corrupt it.
     """
     def __init__(self, settings_path: Path | None = None):
         """
@@ -17,26 +51,70 @@ class TenantService:
         """
         self.tenant_settings_filename = settings_path or get_app_directory() / "tenant_settings.json"
 
+        self._lock = threading.RLock()  # Writes are done while reading, so it is reentrant
+        self._tenants: list[dict] = []
+        self._tenant_indexes: dict[int, int] = {}  # Key = Tenant ID. Value = Its index in _tenants
+        # (st_ino, st_mtime_ns, st_size) of the file _tenants was read from. Every write replaces the file, giving
+        # it a new inode, which catches writes too close together for the modification time to change.
+        self._file_state: tuple[int, int, int] | None = None
+
+    def _read(self, reload: bool = False) -> list[dict]:
+        """Returns the cached tenants, reading the file first if it has changed since, or reload is set. Not a copy."""
+        stat: os.stat_result = os.stat(self.tenant_settings_filename)
+        with self._lock:
+            if reload or (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._file_state:
+                with open(self.tenant_settings_filename) as f:
+                    self._cache(json.load(f), stat)
+            return self._tenants
+
+    def _cache(self, all_tenants: list[dict], stat: os.stat_result) -> None:
+        self._tenants = all_tenants
+        self._tenant_indexes = {}
+        for i, tenant in enumerate(all_tenants):
+            self._tenant_indexes.setdefault(tenant.get("id"), i)  # The first one, like get_tenant_index()
+        self._file_state = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """
+        Held while reading, changing and writing tenants, by this and every other process.
+        The file is always read again once it is held, so a change the cache could have missed is never overwritten.
+        """
+        with self._lock, lock_file(f"{self.tenant_settings_filename}.lock"):
+            self._read(reload=True)
+            yield
+
+    def _write(self, all_tenants: list[dict]) -> None:
+        """Replaces the file with all_tenants, unless they are what it already holds. Call with _write_lock held."""
+        if all_tenants == self._read():
+            return
+
+        temporary_path: str = f"{self.tenant_settings_filename}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(json.dumps(all_tenants, indent=4))
+        os.replace(temporary_path, self.tenant_settings_filename)
+        self._cache(copy.deepcopy(all_tenants), os.stat(self.tenant_settings_filename))
+
     def get_all_tenants(self, initial_load: bool = False) -> list[dict]:
         """"
         Loads and returns the tenant settings file from file.
         Set initial_load to True when you load tenants the firs time at launch,
         this ensures data integrity of the JSON.
         """
-        all_tenants: list[dict] = []
-
-        with open(self.tenant_settings_filename) as f:
-            all_tenants = json.load(f)
-
         if initial_load:
-            self.add_missing_fetch_options(all_tenants)
+            with self._write_lock():
+                all_tenants: list[dict] = self.add_missing_fetch_options(copy.deepcopy(self._read()))
+                self._write(all_tenants)
+                return all_tenants
 
-        return all_tenants
+        return copy.deepcopy(self._read())
 
     def get_tenant_by_id(self, tenant_id):
-        all_tenants: list[dict] = self.get_all_tenants(False)
-        tenant_index: int = self.get_tenant_index(all_tenants, tenant_id)
-        return all_tenants[tenant_index]
+        with self._lock:
+            all_tenants: list[dict] = self._read()
+            if tenant_id not in self._tenant_indexes:
+                raise ValueError("Tenant ID not found in tenant list")
+            return copy.deepcopy(all_tenants[self._tenant_indexes[tenant_id]])
 
     def search_tenants(self, query: str) -> list[dict]:
         """
@@ -44,13 +122,13 @@ class TenantService:
         Mirrors the Vue GUI's client-side filteredTenants logic exactly
         (gui/vue/src/App.vue) - an empty query returns every tenant unfiltered.
         """
-        all_tenants: list[dict] = self.get_all_tenants()
+        all_tenants: list[dict] = self._read()
         if not query:
-            return all_tenants
+            return copy.deepcopy(all_tenants)
 
         lowered_query: str = query.lower()
         return [
-            tenant for tenant in all_tenants
+            copy.deepcopy(tenant) for tenant in all_tenants
             if lowered_query in tenant["tenant_name"].lower() or lowered_query in tenant["url"].lower()
         ]
 
@@ -58,6 +136,7 @@ class TenantService:
         """
         Checks if there are any tenants without "fetch options", and if so adds a default dictionary to each.
         Is done because earlier CRMScript Fetcher version did not contain this object in JSON.
+        Only changes all_tenants - the caller saves them, which is skipped if no tenant was missing any.
         """
         fetch_options = {
             "fetch_scripts": True,
@@ -69,15 +148,14 @@ class TenantService:
         }
 
         for tenant in [t for t in all_tenants if t.get("fetch_options") is None]:
-            tenant["fetch_options"] = fetch_options
+            tenant["fetch_options"] = dict(fetch_options)
 
-        self.save(all_tenants)
         return all_tenants
 
     def save(self, all_tenants: list[dict]):
-        """Saves entire JSON file. Must include all tenants!"""
-        with open(self.tenant_settings_filename, "w") as f:
-            f.write(json.dumps(all_tenants, indent=4))
+        """Saves entire JSON file. Must include all tenants! Skipped if nothing changed."""
+        with self._write_lock():
+            self._write(all_tenants)
 
     @staticmethod
     def get_next_id(all_tenants: list[dict]) -> int:
@@ -87,6 +165,7 @@ class TenantService:
     def add_tenant(self, new_tenant: dict) -> dict:
         """
         Adds a new tenant to json file and saves file.
+        A tenant without fetch options gets the default ones, all enabled.
         Returns the tenant with new ID
         """
         # To make sure frontend isn't sending empty objects
@@ -96,15 +175,14 @@ class TenantService:
         if not new_tenant.get("url"):
             raise Exception("URL is missing")
 
-        with open(self.tenant_settings_filename, 'r+') as f:
-            tenants: list[dict] = json.load(f)
+        with self._write_lock():
+            tenants: list[dict] = copy.deepcopy(self._read())
 
             # Set the new tenant's ID before adding to list
             new_tenant["id"] = self.get_next_id(tenants)
-            tenants.append(new_tenant)
-
-            f.seek(0)
-            json.dump(tenants, f, indent=4)
+            self.add_missing_fetch_options([new_tenant])
+            tenants.append(copy.deepcopy(new_tenant))
+            self._write(tenants)
 
         return new_tenant
 
@@ -129,16 +207,14 @@ class TenantService:
         if not tenant.get("tenant_name"):
             raise ValueError("Tenant must have a name")
 
-        # Find the index of the given tenant in the JSON array so we can replace it.
-        all_tenants: list[dict] = self.get_all_tenants()
-        tenant_index: int = self.get_tenant_index(all_tenants, tenant["id"])
-
-        if all_tenants[tenant_index] == tenant:
-            return # No changes, no need to save
+        with self._write_lock():
+            # Find the index of the given tenant in the JSON array so we can replace it.
+            all_tenants: list[dict] = copy.deepcopy(self._read())
+            tenant_index: int = self.get_tenant_index(all_tenants, tenant["id"])
 
-        # Replace tenant object and save file
-        all_tenants[tenant_index] = tenant
-        self.save(all_tenants)
+            # Replace tenant object and save file. Skipped if there are no changes.
+            all_tenants[tenant_index] = copy.deepcopy(tenant)
+            self._write(all_tenants)
 
     def delete_tenant(self, tenant_id: int) -> None:
         """
@@ -147,8 +223,9 @@ class TenantService:
         if not tenant_id:
             raise ValueError("Tenant ID missing")
 
-        # Find the index of the given tenant in the JSON array so we can delete it.
-        all_tenants: list[dict] = self.get_all_tenants()
-        tenant_index: int = self.get_tenant_index(all_tenants, tenant_id)
-        all_tenants.pop(tenant_index)
-        self.save(all_tenants)
+        with self._write_lock():
+            # Find the index of the given tenant in the JSON array so we can delete it.
+            all_tenants: list[dict] = copy.deepcopy(self._read())
+            tenant_index: int = self.get_tenant_index(all_tenants, tenant_id)
+            all_tenants.pop(tenant_index)
+            self._write(all_tenants)
@@ -0,0 +1,168 @@
+# Records how long each phase of a fetch takes, as spans that can be summed up or saved as a Chrome trace
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextlib import nullcontext
+from typing import Any
+from typing import Callable
+from typing import Iterator
+
+
+class Span:
+    """A timed phase. amounts holds counts added while it was open, e.g. files and bytes written."""
+    def __init__(self, name: str, depth: int, thread_id: int, attributes: dict):
+        self.name: str = name
+        self.depth: int = depth  # Number of spans it is nested in on its thread
+        self.thread_id: int = thread_id
+        self.attributes: dict = attributes
+        self.amounts: dict[str, int] = {}
+        self.start: float = time.perf_counter()
+        self.end: float | None = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+class _UnrecordedSpan:
+    """Stands in for a Span when no tracer is active, so callers can call set() either way."""
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_unrecorded_span = _UnrecordedSpan()
+
+
+class Tracer:
+    """Collects the spans opened while it is active, from any thread it has been made active on."""
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.start: float = time.perf_counter()
+        self.lock = threading.Lock()
+        self.thread_ids: dict[int, int] = {}  # Key = threading.get_ident(). Value = Short ID shown in traces
+
+    def open_span(self, name: str, depth: int, attributes: dict) -> Span:
+        with self.lock:
+            thread_id: int = self.thread_ids.setdefault(threading.get_ident(), len(self.thread_ids) + 1)
+            span = Span(name, depth, thread_id, attributes)
+            self.spans.append(span)
+        return span
+
+    def summary(self) -> list[dict]:
+        """
+        Returns the spans summed up by name, in the order each name was first seen.
+        Each entry has name, depth, calls, seconds and the summed amounts.
+        """
+        totals: dict[str, dict] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            total: dict = totals.setdefault(span.name, {"name": span.name, "depth": span.depth, "calls": 0,
+                                                        "seconds": 0.0, "amounts": {}})
+            total["depth"] = min(total["depth"], span.depth)
+            total["calls"] += 1
+            total["seconds"] += span.seconds
+            for key, amount in span.amounts.items():
+                total["amounts"][key] = total["amounts"].get(key, 0) + amount
+        return list(totals.values())
+
+    def chrome_trace(self) -> dict:
+        """Returns the spans in Chrome's trace event format, which chrome://tracing, Perfetto and speedscope load."""
+        events: list[dict] = [{
+            "name": span.name,
+            "ph": "X",  # Complete event, with a duration
+            "ts": (span.start - self.start) * 1_000_000,
+            "dur": span.seconds * 1_000_000,
+            "pid": 1,
+            "tid": span.thread_id,
+            "args": dict(span.attributes, **span.amounts),
+        } for span in self.spans]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# Per thread, like the active output in core/output.py
+_active = threading.local()
+
+
+def get_tracer() -> Tracer | None:
+    return getattr(_active, "tracer", None)
+
+
+def _open_spans() -> list[Span]:
+    if not hasattr(_active, "spans"):
+        _active.spans = []
+    return _active.spans
+
+
+@contextmanager
+def use_tracer(tracer: Tracer | None) -> Iterator[Tracer | None]:
+    """Makes tracer collect the spans opened on this thread, until the with block exits."""
+    previous: Tracer | None = get_tracer()
+    _active.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _active.tracer = previous
+
+
+def span(name: str, **attributes: Any):
+    """
+    Context manager timing the with block as a span, if a tracer is active on this thread. Does nothing otherwise.
+    Yields the span, to set attributes on once they are known.
+    """
+    tracer: Tracer | None = get_tracer()
+    if tracer is None:
+        return nullcontext(_unrecorded_span)
+    return _span(tracer, name, attributes)
+
+
+@contextmanager
+def _span(tracer: Tracer, name: str, attributes: dict) -> Iterator[Span]:
+    open_spans: list[Span] = _open_spans()
+    current = tracer.open_span(name, len(open_spans), attributes)
+    open_spans.append(current)
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        open_spans.pop()
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator timing each call of the function as a span named name."""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def traced_function(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return traced_function
+    return decorator
+
+
+def count(**amounts: int) -> None:
+    """Adds amounts (e.g. files=1, bytes=123) to every span open on this thread."""
+    if get_tracer() is None:
+        return
+    for open_span in _open_spans():
+        for key, amount in amounts.items():
+            open_span.amounts[key] = open_span.amounts.get(key, 0) + amount
+
+
+def bind_tracer(function: Callable) -> Callable:
+    """
+    Returns function wrapped to run with this thread's tracer active, for handing work to other threads
+    (e.g. a ThreadPoolExecutor) without losing its spans.
+    """
+    tracer: Tracer | None = get_tracer()
+
+    def traced_function(*args, **kwargs):
+        with use_tracer(tracer):
+            return function(*args, **kwargs)
+    return traced_function
@@ -0,0 +1,80 @@
+# Brings folders on disk in line with a target tree computed in memory, touching only what differs
+import hashlib
+import os
+import shutil
+
+from core.output import MemoryOutput
+from core.utility import log
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return file_digest(f.read())
+
+
+def sync_tree(target: MemoryOutput, roots: list[str]) -> dict[str, int]:
+    """
+    Makes each root folder on disk identical to what target holds for it.
+    Files are only written if missing or different (compared by size, then hash), and files/folders not in
+    target are deleted, so unchanged files keep their modification time.
+    A root missing from target.folders is deleted entirely.
+    Returns counts of files added, changed, removed and unchanged.
+    """
+    changes: dict[str, int] = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+    # Paths are compared normalized, since the creators build them with "/" and os.walk joins with os.sep
+    target_files: dict[str, bytes] = {os.path.normpath(path): data for path, data in target.files.items()}
+    target_folders: set[str] = {os.path.normpath(path) for path in target.folders}
+
+    for root in roots:
+        root = os.path.normpath(root)
+        disk_files: dict[str, int] = {}  # Key = File path. Value = File size
+        disk_folders: set[str] = set()
+
+        for directory, folder_names, file_names in os.walk(root):
+            disk_folders.add(directory)
+            for file_name in file_names:
+                path: str = os.path.join(directory, file_name)
+                disk_files[path] = os.path.getsize(path)
+
+        # Delete first, so a file/folder whose name only changed case is recreated with the new case
+        # on case-insensitive file systems
+        for path in [p for p in disk_files if p not in target_files]:
+            log(f"Deleting file: {path}")
+            os.remove(path)
+            changes["removed"] += 1
+
+        for directory in sorted([d for d in disk_folders if d not in target_folders], reverse=True):
+            log(f"Deleting folder: {directory}")
+            shutil.rmtree(directory)
+
+        for directory in sorted([d for d in target_folders if is_within(d, root) and d not in disk_folders]):
+            log(f"Creating folder: {directory}")
+            os.mkdir(directory)
+
+        for path, data in target_files.items():
+            if not is_within(path, root):
+                continue
+
+            if path not in disk_files:
+                changes["added"] += 1
+            elif disk_files[path] == len(data) and read_file_digest(path) == file_digest(data):
+                changes["unchanged"] += 1
+                continue
+            else:
+                changes["changed"] += 1
+
+            log(f"Writing file: {path}")
+            with open(path, "wb") as f:
+                f.write(data)
+
+    return changes
+
+
+def is_within(path: str, root: str) -> bool:
+    """Returns True if path is root itself or anything inside it."""
+    return path == root or path.startswith(root + os.sep)
@@ -1,18 +1,23 @@
 # Functions for handling local files and folders
+# tkinter, toml, subprocess and tenacity are imported where they are used, since every crmfetch command imports
+# this module and most of them need none of those - importing Tk alone would add noticeably to each one's startup.
 import os
 import sys
-import toml
-import json
-import tkinter
 import shutil
 import platform
-import subprocess
+import functools
+import threading
 from typing import Any
+from typing import Callable
+from typing import TYPE_CHECKING
 from pathlib import Path
-from tkinter import filedialog
-from tenacity import retry
-from tenacity import wait_fixed
-from tenacity import stop_after_attempt
+from core.json_encoding import get_json_encoder
+from core.output import get_output
+from core.progress import advance
+from core.tracing import count
+
+if TYPE_CHECKING:
+    from tenacity import RetryCallState
 
 
 def get_app_directory() -> Path:
@@ -36,6 +41,8 @@ def ask_directory_path_macos() -> str:
     the picker to misbehave (jump around, fail to close, refuse to reopen)
     when a fresh Tk root is created and destroyed on every call.
     """
+    import subprocess
+
     script = 'POSIX path of (choose folder with prompt "Select a folder")'
     try:
         result = subprocess.run(
@@ -54,6 +61,9 @@ def ask_directory_path_tk() -> str:
     """
     Used for Windows and Linux.
     """
+    import tkinter
+    from tkinter import filedialog
+
     root = tkinter.Tk()
     root.withdraw()                   # Hide the root window
     root.attributes('-topmost', True) # Appear on top of browser window
@@ -83,6 +93,8 @@ def get_fetcher_script() -> str:
 
 def open_directory(directory_path: str):
     """Opens the folder in user's OS. Handles both Windows and Linux."""
+    import subprocess
+
     path = Path(directory_path).resolve()
     system: str = platform.system()
 
@@ -93,23 +105,49 @@ def open_directory(directory_path: str):
     elif system == "Darwin":  # macOS
         subprocess.Popen(["open", str(path)])
 
-def safe_name(text: str) -> str:
-    """Replace characters that are not allowed in Windows folders/files"""
-    replace_chars: list[tuple[str, str]] = [
-        ("/", "."),
-        ('"', "'"),
-        ("\\", ".."),
-        (":", " - "),
-        ("*", "X"),
-        ("<", " Lt "),
-        (">", " Gt "),
-        ("|", "I"),
-        ("?", "")
-    ]
-    for chars in replace_chars:
-        text = text.replace(chars[0], chars[1])
-
-    return text
+# Characters that are not allowed in Windows folders/files, and what they are replaced with. One str.translate() pass
+# gives the same result as replacing them one after the other, since no replacement has any of them in it.
+SAFE_NAME_TABLE: dict[int, str] = str.maketrans({
+    "/": ".",
+    '"': "'",
+    "\\": "..",
+    ":": " - ",
+    "*": "X",
+    "<": " Lt ",
+    ">": " Gt ",
+    "|": "I",
+    "?": "",
+})
+_UNSAFE_CHARS: frozenset[str] = frozenset(chr(char) for char in SAFE_NAME_TABLE)
+
+# Names Windows reserves for devices, also when followed by an extension, e.g. "NUL.crmscript"
+RESERVED_NAMES: frozenset[str] = frozenset(
+    ["CON", "PRN", "AUX", "NUL"] + [f"COM{i}" for i in range(1, 10)] + [f"LPT{i}" for i in range(1, 10)])
+_RESERVED_PREFIXES: frozenset[str] = frozenset(name[:3] for name in RESERVED_NAMES)
+
+
+# Cached, since the same folder names and button captions ("OK", "Cancel") come up on screen after screen, and
+# every name comes up again on the next fetch in the GUI or crmfetch watch. See benchmarks/bench_safe_name.py.
+@functools.lru_cache(maxsize=16384)
+def safe_name(text: str, folder: bool = False) -> str:
+    """
+    Replace characters that are not allowed in Windows folders/files, and adds "_" to names Windows reserves, like
+    "CON" or "LPT1". A folder name also loses its trailing dots/spaces, which Windows drops from the end of a path -
+    not a file name, as its extension comes after them.
+    """
+    # Most names have none of the characters, and finding that out is cheaper than translating
+    name: str = text if _UNSAFE_CHARS.isdisjoint(text) else text.translate(SAFE_NAME_TABLE)
+
+    if folder and (not name or name.endswith((".", " "))):
+        name = name.rstrip(". ")
+        if not name:
+            return "_" if text else ""  # Only dots/spaces or "?"
+
+    if name[:3].upper() in _RESERVED_PREFIXES:
+        stem, dot, rest = name.partition(".")
+        if stem.rstrip(" ").upper() in RESERVED_NAMES:
+            name = f"{stem}_{dot}{rest}"
+    return name
 
 
 # Off by default - a fetch creates/deletes hundreds of files, and printing
@@ -132,29 +170,88 @@ def log(message: str) -> None:
 
 def create_folder(path: str) -> None:
     try:
-        os.mkdir(path)
+        get_output().create_folder(path)
     except OSError:
         log(f"Creation of the directory failed. Folder might already exist: {path}")
     else:
         log(f"Successfully created directory: {path}")
+        count(folders=1)
+
+
+# Counts of retried file operations and seconds spent waiting between them, per thread.
+# Reset by reset_retry_stats() at the start of a fetch.
+_retry_stats = threading.local()
+
+
+def reset_retry_stats() -> None:
+    _retry_stats.retries = 0
+    _retry_stats.seconds = 0.0
+
+
+def get_retry_stats() -> dict:
+    """Returns how many file operations were retried on this thread, and the seconds spent waiting on them."""
+    return {"retries": getattr(_retry_stats, "retries", 0), "seconds": getattr(_retry_stats, "seconds", 0.0)}
+
+
+def _is_retryable(error: BaseException) -> bool:
+    return isinstance(error, OSError) and not isinstance(error, FileNotFoundError)
+
+
+def _record_retry(retry_state: "RetryCallState") -> None:
+    """Called by tenacity before waiting to retry a file operation."""
+    wait: float = retry_state.next_action.sleep
+    _retry_stats.retries = getattr(_retry_stats, "retries", 0) + 1
+    _retry_stats.seconds = getattr(_retry_stats, "seconds", 0.0) + wait
+    log(f"{retry_state.fn.__name__} failed with {retry_state.outcome.exception()!r}, "
+        f"retrying in {wait * 1000:.0f} ms")
 
 
-# Sometimes throws PermissionError if os module has recently accessed the folder.
-# Usually works after retrying a number of times.
-@retry(wait=wait_fixed(1), stop=stop_after_attempt(10))
-def move_folder(src: str, dst: str) -> None:
+def retry_file_operation(function: Callable) -> Callable:
+    """
+    Renaming/deleting a folder often throws PermissionError on Windows for a short while after the os module,
+    an antivirus scanner or an indexer has accessed it. It usually works after retrying a few times, so retry
+    with a short exponential backoff (5 ms, 10 ms, 20 ms ... capped at 500 ms), for at most 10 seconds in total.
+    The tenacity wrapper is built on the first call, so tenacity (and the asyncio it imports) is only loaded
+    by commands that actually touch folders.
+    """
+    retrying_function: Callable | None = None
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        nonlocal retrying_function
+        if retrying_function is None:
+            from tenacity import retry
+            from tenacity import retry_if_exception
+            from tenacity import stop_after_delay
+            from tenacity import wait_exponential
+
+            retrying_function = retry(
+                retry=retry_if_exception(_is_retryable),
+                wait=wait_exponential(multiplier=0.005, max=0.5),
+                stop=stop_after_delay(10),
+                before_sleep=_record_retry,
+                reraise=True,
+            )(function)
+        return retrying_function(*args, **kwargs)
+    return wrapper
+
+
+@retry_file_operation
+def rename_folder(src: str, dst: str) -> bool:
+    """
+    Renames (moves) folder src to dst, which must not exist. This is atomic as long as both are on the same drive.
+    Returns False if src does not exist.
+    """
     try:
-        shutil.move(src, dst)
+        os.rename(src, dst)
     except FileNotFoundError:
-        return
-    except shutil.Error:
-        shutil.rmtree(dst)
-        move_folder(src, dst)
+        return False
 
+    log(f"Renamed folder: {src} -> {dst}")
+    return True
 
-# shutil.rmtree() often throws PermissionError since os module has just accessed the folder.
-# Usually works after retrying a number of times.
-@retry(wait=wait_fixed(1), stop=stop_after_attempt(10))
+
+@retry_file_operation
 def delete_folder(directory: str) -> None:
     if not os.path.isdir(directory):
         return
@@ -163,25 +260,56 @@ def delete_folder(directory: str) -> None:
     shutil.rmtree(directory)
 
 
+def encode_text(text: str) -> bytes:
+    """
+    Encodes text the way a file opened with open(path, "w", encoding="utf-8") would write it,
+    i.e. including the OS' own newline translation.
+    """
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
+
+
 def create_file(directory: str, file_name: str, body: str) -> None:
     """Creates a file in the given directory. file_name must include file extension."""
     log(f"Creating file: {file_name}")
     full_path: str = f"{directory}/{file_name}"
-
-    with open(full_path, "w", encoding="utf-8") as f:
-        f.write(body)
+    data: bytes = encode_text(body)
+    get_output().write_file(full_path, data)
+    count(files=1, bytes=len(data))
+    advance(files_written=1)
 
 
 def create_json_file(directory: str, file_name: str, content: Any) -> None:
     """Creates a JSON file in the given directory. file_name must include file extension."""
+    write_json_file(directory, file_name, get_json_encoder().encode(content))
+
+
+def create_json_files(directory: str, files: list[tuple[str, Any]]) -> None:
+    """
+    Creates several JSON files in the given directory, as create_json_file() would.
+    files holds the (file name, content) of each. Their contents are encoded together, which is faster with orjson.
+    """
+    encoded: list[bytes] = get_json_encoder().encode_batch([content for _, content in files])
+    for (file_name, _), data in zip(files, encoded):
+        write_json_file(directory, file_name, data)
+
+
+def write_json_file(directory: str, file_name: str, data: bytes) -> None:
+    """Writes a JSON file encoded by core/json_encoding.py, with the OS' own newlines like encode_text()."""
     log(f"Creating file: {file_name}")
     full_path: str = f"{directory}/{file_name}"
-    with open(full_path, "w", encoding="utf8") as f:
-        json.dump(content, f, indent=4, ensure_ascii=False)
+    if os.linesep != "\n":
+        data = data.replace(b"\n", os.linesep.encode("ascii"))
+    get_output().write_file(full_path, data)
+    count(files=1, bytes=len(data))
+    advance(files_written=1)
 
 
 def get_current_version() -> str:
     """Returns the version of CRMScript Fetcher from pyproject.toml file."""
+    import toml
+
     pyproject_path: Path = get_app_directory() / "pyproject.toml"
     pyproject: dict = toml.load(pyproject_path)
     return pyproject["project"]["version"]
@@ -0,0 +1,199 @@
+# Fetches tenants again and again on their own intervals from one long-running process, for crmfetch watch
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable
+
+from core.utility import log
+
+# Minutes between fetches of a tenant without its own watch_interval
+DEFAULT_INTERVAL_MINUTES: float = 15
+
+# Each interval is randomly up to this much shorter or longer, so tenants added at the same time spread out
+# instead of all hitting the network (and SuperOffice) at once every time
+DEFAULT_JITTER: float = 0.1
+
+# Longest time run() sleeps between checks, so tenants added to or removed from the settings are picked up
+MAX_SLEEP_SECONDS: float = 30
+
+
+class WatchedTenant:
+    """A tenant's schedule, and the outcome of its fetches so far."""
+    def __init__(self, tenant: dict, interval: float, next_run: float):
+        self.tenant: dict = tenant
+        self.interval: float = interval  # Seconds
+        self.next_run: float = next_run  # In the scheduler's clock
+        self.running: bool = False
+        self.runs: int = 0
+        self.failures: int = 0
+        self.skipped: int = 0  # Times it was due while its previous fetch was still running
+        self.last_started: str | None = None
+        self.last_seconds: float | None = None
+        self.last_success: bool | None = None
+        self.last_error: str = ""
+
+
+class FetchScheduler:
+    """
+    Calls fetch(tenant) for each tenant get_tenants() returns, every interval_minutes - or the tenant's own
+    watch_interval - with jitter, at most jobs at a time. A tenant still being fetched when it is due again is
+    skipped until the next time, as is one sharing its local directory with a tenant being fetched.
+    get_tenants() is called on every check, so changes to the tenant settings are picked up while running.
+    on_result is called with (tenant, result, seconds) after each fetch, from the thread that ran it, and
+    on_error with the exception when run() could not check the tenants, e.g. as the settings file is corrupt.
+    """
+    def __init__(self, fetch: Callable[[dict], dict], get_tenants: Callable[[], list[dict]],
+                 interval_minutes: float = DEFAULT_INTERVAL_MINUTES, jitter: float = DEFAULT_JITTER, jobs: int = 4,
+                 on_result: Callable[[dict, dict, float], None] | None = None,
+                 on_error: Callable[[Exception], None] | None = None,
+                 clock: Callable[[], float] = time.monotonic, rng: random.Random | None = None):
+        self.fetch: Callable[[dict], dict] = fetch
+        self.get_tenants: Callable[[], list[dict]] = get_tenants
+        self.interval_minutes: float = interval_minutes
+        self.jitter: float = jitter
+        self.on_result: Callable[[dict, dict, float], None] | None = on_result
+        self.on_error: Callable[[Exception], None] | None = on_error
+        self.clock: Callable[[], float] = clock
+        self.rng: random.Random = rng or random.Random()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="watch")
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # Fetches finishing at the same time would otherwise share the .tmp file
+
+        # Key = Tenant ID
+        self.watched: dict[int, WatchedTenant] = {}
+
+    def __enter__(self) -> "FetchScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Waits for the fetches already running to finish."""
+        self.executor.shutdown(wait=True)
+
+    def interval_of(self, tenant: dict) -> float:
+        """Returns the seconds between fetches of tenant."""
+        return float(tenant.get("watch_interval") or self.interval_minutes) * 60
+
+    def next_run(self, now: float, interval: float) -> float:
+        return now + interval * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    def run_pending(self) -> list[dict]:
+        """Starts fetching every tenant that is due. Returns the tenants started."""
+        now: float = self.clock()
+        started: list[dict] = []
+
+        with self.lock:
+            self.update_tenants(now)
+            busy_directories: set[str] = {watched.tenant.get("local_directory")
+                                          for watched in self.watched.values() if watched.running}
+
+            for watched in sorted(self.watched.values(), key=lambda w: w.next_run):
+                if watched.next_run > now:
+                    continue
+
+                watched.next_run = self.next_run(now, watched.interval)
+                if watched.running or watched.tenant.get("local_directory") in busy_directories:
+                    watched.skipped += 1
+                    log(f"Skipping {watched.tenant.get('tenant_name')}, its previous fetch is still running")
+                    continue
+
+                watched.running = True
+                watched.last_started = datetime.now().isoformat(timespec="seconds")
+                busy_directories.add(watched.tenant.get("local_directory"))
+                started.append(watched.tenant)
+                self.executor.submit(self.run_fetch, watched)
+
+        return started
+
+    def update_tenants(self, now: float) -> None:
+        """Starts watching new tenants, stops watching removed ones and applies changed settings."""
+        tenants: list[dict] = self.get_tenants()
+        for tenant in tenants:
+            interval: float = self.interval_of(tenant)
+            watched: WatchedTenant | None = self.watched.get(tenant["id"])
+            if watched is None:
+                # The first fetches are spread over the first part of the interval rather than all started at once
+                self.watched[tenant["id"]] = WatchedTenant(tenant, interval,
+                                                           now + self.rng.uniform(0, interval * self.jitter))
+                continue
+
+            watched.tenant = tenant  # Used from the next fetch on
+            if interval != watched.interval:
+                watched.next_run = min(watched.next_run, self.next_run(now, interval))
+                watched.interval = interval
+
+        tenant_ids: set[int] = {tenant["id"] for tenant in tenants}
+        for tenant_id in [tenant_id for tenant_id, watched in self.watched.items()
+                          if tenant_id not in tenant_ids and not watched.running]:
+            del self.watched[tenant_id]
+
+    def run_fetch(self, watched: WatchedTenant) -> None:
+        start: float = self.clock()
+        try:
+            result: dict = self.fetch(watched.tenant)
+        except Exception as e:  # fetch() returns its own errors - this is only a safety net to keep watching
+            result = {"success": False, "validation_error": False, "error": f"Unexpected error: {str(e)}",
+                      "info": ""}
+        seconds: float = self.clock() - start
+
+        with self.lock:
+            watched.running = False
+            watched.runs += 1
+            watched.last_seconds = seconds
+            watched.last_success = result["success"]
+            watched.last_error = result["error"]
+            if not result["success"]:
+                watched.failures += 1
+
+        if self.on_result:
+            self.on_result(watched.tenant, result, seconds)
+
+    def seconds_until_next(self) -> float:
+        with self.lock:
+            if not self.watched:
+                return MAX_SLEEP_SECONDS
+            return max(0.0, min(watched.next_run for watched in self.watched.values()) - self.clock())
+
+    def run(self, stop: threading.Event) -> None:
+        """Keeps starting the fetches that are due until stop is set."""
+        while not stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:  # Tried again on the next check, like a failed fetch, rather than stop watching
+                log(f"Could not check the tenants to fetch: {str(e)}")
+                if self.on_error:
+                    self.on_error(e)
+            stop.wait(min(self.seconds_until_next(), MAX_SLEEP_SECONDS))
+
+    def status(self) -> list[dict]:
+        """Returns the schedule and the outcome of the latest fetch of each watched tenant."""
+        now: float = self.clock()
+        with self.lock:
+            return [{
+                "tenant_id": watched.tenant["id"],
+                "tenant_name": watched.tenant.get("tenant_name", ""),
+                "interval_minutes": watched.interval / 60,
+                "running": watched.running,
+                "next_run_in_seconds": max(0.0, watched.next_run - now),
+                "runs": watched.runs,
+                "failures": watched.failures,
+                "skipped": watched.skipped,
+                "last_started": watched.last_started,
+                "last_seconds": watched.last_seconds,
+                "last_success": watched.last_success,
+                "last_error": watched.last_error,
+            } for watched in sorted(self.watched.values(), key=lambda w: w.tenant["id"])]
+
+    def save_status(self, path: str) -> None:
+        """Saves status() as JSON, replacing the previous file only once fully written."""
+        with self.save_lock:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"updated": datetime.now().isoformat(timespec="seconds"), "tenants": self.status()}, f,
+                          indent=4, ensure_ascii=False)
+            os.replace(f"{path}.tmp", path)
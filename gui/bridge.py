@@ -2,7 +2,13 @@
 # An Api instance is passed to webview.create_window(..., js_api=...) in gui/main.py;
 # pywebview reflects over its public methods, so each one below becomes callable
 # from Vue as window.pywebview.api.<method_name>(...).
+import json
+import threading
+import uuid
+
 from core.fetch_service import FetchService
+from core.progress import FetchProgress
+from core.progress import use_progress
 from core.tenant_service import TenantService
 from core.utility import ask_directory_path, get_current_version, get_fetcher_script, open_directory
 
@@ -21,6 +27,17 @@ class Api:
         self._tenant_service = TenantService()
         self._fetch_service = FetchService()
 
+        # The pywebview window to send fetch events to, see set_window()
+        self._window = None
+
+        # Progress of the fetches still running. Key = Job ID returned by start_fetch().
+        self._fetch_jobs: dict[str, FetchProgress] = {}
+        self._fetch_jobs_lock = threading.Lock()
+
+    def set_window(self, window) -> None:
+        """Sets the pywebview window to send fetch events to - see start_fetch(). Called by gui/main.py."""
+        self._window = window
+
     def get_all_tenants(self, initial_load: bool = False) -> list[dict]:
         """Returns all tenants from tenant_settings.json."""
         return self._tenant_service.get_all_tenants(initial_load)
@@ -37,9 +54,48 @@ class Api:
         """Deletes a tenant by id."""
         self._tenant_service.delete_tenant(tenant_id)
 
-    def fetch(self, tenant: dict) -> dict:
-        """Fetches CRMScripts and other data from SuperOffice for the given tenant."""
-        return self._fetch_service.fetch(tenant)
+    def start_fetch(self, tenant: dict) -> str:
+        """
+        Starts fetching CRMScripts and other data from SuperOffice for the given tenant in the background,
+        and returns its job ID straight away. Sends a crmfetch:fetch-progress event to the window as it runs,
+        and a crmfetch:fetch-done event with its FetchResult once done - see _send_event().
+        """
+        job_id: str = uuid.uuid4().hex
+        progress = FetchProgress(on_update=lambda values: self._send_event("fetch-progress", job_id, values))
+        with self._fetch_jobs_lock:
+            self._fetch_jobs[job_id] = progress
+
+        threading.Thread(target=self._run_fetch, args=(job_id, tenant, progress), name=f"fetch-{job_id}",
+                         daemon=True).start()
+        return job_id
+
+    def cancel_fetch(self, job_id: str) -> bool:
+        """
+        Stops a fetch started with start_fetch(), leaving the local directory as it was before the fetch.
+        Returns False if the fetch has already finished or started replacing the folders, which it then completes.
+        """
+        with self._fetch_jobs_lock:
+            progress: FetchProgress | None = self._fetch_jobs.get(job_id)
+        return progress is not None and progress.cancel()
+
+    def _run_fetch(self, job_id: str, tenant: dict, progress: FetchProgress) -> None:
+        # Sent if fetch() raises rather than returning a result, so the window isn't left waiting for one
+        result: dict = {"success": False, "validation_error": False, "error": "The fetch stopped unexpectedly.",
+                        "info": ""}
+        try:
+            with use_progress(progress):
+                result = self._fetch_service.fetch(tenant)
+        finally:
+            with self._fetch_jobs_lock:
+                del self._fetch_jobs[job_id]
+            self._send_event("fetch-done", job_id, result)
+
+    def _send_event(self, name: str, job_id: str, detail: dict) -> None:
+        """Dispatches a crmfetch:<name> CustomEvent on the window, with {job_id, ...detail} as its detail."""
+        if self._window is None:
+            return
+        payload: str = json.dumps(dict(detail, job_id=job_id))
+        self._window.evaluate_js(f"window.dispatchEvent(new CustomEvent('crmfetch:{name}', {{detail: {payload}}}))")
 
     def get_fetcher_script(self) -> str:
         """Returns the contents of the CRMScript fetcher script."""
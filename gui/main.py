@@ -37,11 +37,13 @@ def run_gui() -> None:
     single_instance: socket.socket = enforce_single_instance(lock_port)
 
     print("Initializing pywebview")
-    webview.create_window(
+    api = Api()
+    # Fetches run in the background and report back through the window - see Api.start_fetch()
+    api.set_window(webview.create_window(
         "CRMScript Fetcher",
         url=str(vue_index_path),
-        js_api=Api(),
+        js_api=api,
         width=size[0],
         height=size[1],
-    )
+    ))
     webview.start()
@@ -1,3 +1,4 @@
+import type { FetchProgress } from "@/types/FetchProgress"
 import type { FetchResult } from "@/types/FetchResult"
 import type { TenantSettings } from "@/types/TenantSettings"
 
@@ -13,8 +14,9 @@ export interface PywebviewApi {
   add_tenant(tenant: TenantSettings): Promise<TenantSettings>
   delete_tenant(tenant_id: number): Promise<void>
 
-  // Fetch methods
-  fetch(tenant: TenantSettings): Promise<FetchResult>
+  // Fetch methods. Fetches run in the background - see onFetchEvents below for their progress and result.
+  start_fetch(tenant: TenantSettings): Promise<string>
+  cancel_fetch(job_id: string): Promise<boolean>
 
   // Other utility methods
   get_fetcher_script(): Promise<string>
@@ -45,10 +47,31 @@ export function usePywebview() {
     updateTenant: (tenant: TenantSettings) => api.update_tenant(tenant),
     addTenant: (tenant: TenantSettings) => api.add_tenant(tenant),
     deleteTenant: (tenant_id: number) => api.delete_tenant(tenant_id),
-    fetch: (tenant: TenantSettings) => api.fetch(tenant),
+    startFetch: (tenant: TenantSettings) => api.start_fetch(tenant),
+    cancelFetch: (job_id: string) => api.cancel_fetch(job_id),
     getFetcherScript: () => api.get_fetcher_script(),
     askDirectoryPath: () => api.ask_directory_path(),
     openDirectory: (directory_path: string) => api.open_directory(directory_path),
     getCurrentVersion: () => api.get_current_version(),
   }
 }
+
+/**
+ * Listens for the events Python sends about background fetches (see Api.start_fetch in gui/bridge.py)
+ * until the returned function is called.
+ */
+export function onFetchEvents(
+  onProgress: (progress: FetchProgress) => void,
+  onDone: (result: FetchResult & { job_id: string }) => void,
+): () => void {
+  const progressListener = (event: Event) => onProgress((event as CustomEvent<FetchProgress>).detail)
+  const doneListener = (event: Event) =>
+    onDone((event as CustomEvent<FetchResult & { job_id: string }>).detail)
+
+  window.addEventListener("crmfetch:fetch-progress", progressListener)
+  window.addEventListener("crmfetch:fetch-done", doneListener)
+  return () => {
+    window.removeEventListener("crmfetch:fetch-progress", progressListener)
+    window.removeEventListener("crmfetch:fetch-done", doneListener)
+  }
+}
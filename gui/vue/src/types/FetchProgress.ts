@@ -0,0 +1,14 @@
+/**
+ * How far a fetch started with start_fetch has come, sent as a crmfetch:fetch-progress event.
+ */
+export interface FetchProgress {
+  job_id: string
+  // starting, downloading, parsing, creating, publishing or writing
+  phase: string
+  // Folder of the group being created, e.g. Scripts
+  group: string
+  groups_done: number
+  groups_total: number
+  bytes_downloaded: number
+  files_written: number
+}
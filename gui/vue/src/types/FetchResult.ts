@@ -6,4 +6,45 @@ export interface FetchResult {
   validation_error: boolean
   error: string
   info: string
+  // Only present when the fetch was cancelled - the local directory is left as it was
+  cancelled?: boolean
+  // Only present when fetched in sync mode
+  changes?: {
+    added: number
+    changed: number
+    removed: number
+    unchanged: number
+  }
+  // Only present if renaming/deleting folders had to be retried
+  retries?: {
+    retries: number
+    seconds: number
+  }
+  // Only present when fetched in delta mode
+  delta?: {
+    full: boolean
+    since: string
+    changed_rows: number
+  }
+  // Bytes received from SuperOffice, and what they decompressed to
+  transfer?: {
+    wire_bytes: number
+    decoded_bytes: number
+  }
+  // ID of the snapshot taken after the fetch, if one was requested
+  snapshot?: string
+  // Only present when the search index was updated
+  index?: {
+    added: number
+    changed: number
+    removed: number
+    unchanged: number
+  }
+  // Only present when objects with the same name had their ID added to their file or folder name
+  collisions?: {
+    directory: string
+    name: string
+    id: number
+    renamed: string
+  }[]
 }
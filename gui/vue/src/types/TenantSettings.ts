@@ -5,6 +5,12 @@ export interface TenantSettings {
   local_directory: string
   tenant_name: string
   url: string
+  // When set, fetches write a .zip/.tar.gz archive here instead of files in local_directory
+  archive_path?: string
+  // Minutes between fetches with crmfetch watch, instead of its --interval
+  watch_interval?: number
+  // "index" creates a single _index.json per folder instead of a .json file next to each .crmscript file
+  metadata_layout?: "sidecar" | "index"
   fetch_options: {
     fetch_scripts: boolean
     fetch_triggers: boolean
@@ -14,6 +14,7 @@ test_cli_settings.py for tests that exercise that resolution (the
 no-pointer-configured error path, and the real pointer -> real file path).
 """
 import json
+from pathlib import Path
 from unittest.mock import Mock
 
 import pytest
@@ -22,7 +23,13 @@ import cli
 import cli.app
 import cli.tenant_commands
 from core import utility
+from core.fetch_service import FetchService
+from core.search_index import SearchIndex
+from core.snapshot_store import SnapshotStore
 from core.tenant_service import TenantService
+from core.tracing import count
+from core.tracing import span
+from core.watch import FetchScheduler
 
 
 @pytest.fixture(autouse=True)
@@ -35,8 +42,8 @@ def tenant_service(monkeypatch: pytest.MonkeyPatch) -> Mock:
 
 @pytest.fixture(autouse=True)
 def fetch_service(monkeypatch: pytest.MonkeyPatch) -> Mock:
-    """Replaces cli.tenant_commands' FetchService singleton's fetch() with a Mock."""
-    service = Mock(spec=cli.tenant_commands.fetch_service)
+    """Replaces cli.tenant_commands' FetchService singleton with a spec'd Mock."""
+    service = Mock(spec=FetchService)
     monkeypatch.setattr(cli.tenant_commands, "fetch_service", service)
     return service
 
@@ -130,6 +137,291 @@ def test_fetch_calls_get_tenant_by_id_then_fetches_that_tenant(
     fetch_service.fetch.assert_called_once_with(tenant)
 
 
+def test_fetch_stream_flag_passes_stream_to_fetch(tenant_service: Mock, fetch_service: Mock) -> None:
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {"success": True, "validation_error": False, "error": "", "info": ""}
+
+    exit_code: int = run(["fetch", "5", "--stream"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, stream=True)
+
+
+def test_fetch_sync_flag_passes_sync_and_prints_change_counts(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture
+) -> None:
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {
+        "success": True,
+        "validation_error": False,
+        "error": "",
+        "info": "",
+        "changes": {"added": 1, "changed": 2, "removed": 3, "unchanged": 4},
+    }
+
+    exit_code: int = run(["fetch", "5", "--sync"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, sync=True)
+    assert "1 files added, 2 changed, 3 removed, 4 unchanged." in capsys.readouterr().out
+
+
+def test_fetch_delta_flag_passes_delta_and_prints_changed_rows(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture
+) -> None:
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {
+        "success": True,
+        "validation_error": False,
+        "error": "",
+        "info": "",
+        "delta": {"full": False, "since": "2024-01-01 10:00:00", "changed_rows": 3},
+    }
+
+    exit_code: int = run(["fetch", "5", "--delta"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, delta=True)
+    assert "Downloaded 3 scripts/triggers/screen choosers changed since 2024-01-01 10:00:00." in capsys.readouterr().out
+
+
+def test_fetch_parallel_flag_passes_parallel_to_fetch(tenant_service: Mock, fetch_service: Mock) -> None:
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {"success": True, "validation_error": False, "error": "", "info": ""}
+
+    exit_code: int = run(["fetch", "5", "--parallel"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, parallel=True)
+
+
+def test_fetch_stream_and_parallel_is_a_usage_error(tenant_service: Mock, fetch_service: Mock) -> None:
+    exit_code: int = run(["fetch", "5", "--stream", "--parallel"])
+
+    assert exit_code == 2
+    fetch_service.fetch.assert_not_called()
+
+
+def test_fetch_paged_flag_passes_paged_to_fetch(tenant_service: Mock, fetch_service: Mock) -> None:
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {"success": True, "validation_error": False, "error": "", "info": ""}
+
+    exit_code: int = run(["fetch", "5", "--paged"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, paged=True)
+
+
+def test_fetch_paged_and_stream_is_a_usage_error(tenant_service: Mock, fetch_service: Mock) -> None:
+    exit_code: int = run(["fetch", "5", "--paged", "--stream"])
+
+    assert exit_code == 2
+    fetch_service.fetch.assert_not_called()
+
+
+def test_fetch_timings_prints_phase_table_and_saves_trace(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture, tmp_path: Path
+) -> None:
+    tenant_service.get_tenant_by_id.return_value = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+
+    def fetch(tenant: dict) -> dict:
+        with span("fetch"), span("download"):
+            count(files=3, bytes=2048)
+        return {"success": True, "validation_error": False, "error": "", "info": ""}
+
+    fetch_service.fetch.side_effect = fetch
+    trace_file: Path = tmp_path / "trace.json"
+
+    exit_code: int = run(["fetch", "5", "--timings", "--trace-file", str(trace_file)])
+
+    assert exit_code == 0
+    out: str = capsys.readouterr().out
+    assert "Timings" in out
+    assert "download" in out and "2.0 KB" in out
+    assert [event["name"] for event in json.loads(trace_file.read_text())["traceEvents"]] == ["fetch", "download"]
+
+
+def test_fetch_snapshot_flag_passes_snapshot_store_and_prints_its_id(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture, monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path
+) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    monkeypatch.setattr(cli.tenant_commands, "snapshot_store", store)
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {
+        "success": True,
+        "validation_error": False,
+        "error": "",
+        "info": "",
+        "snapshot": "20240101-100000",
+    }
+
+    exit_code: int = run(["fetch", "5", "--snapshot"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, snapshot_store=store)
+    assert "Saved snapshot 20240101-100000." in capsys.readouterr().out
+
+
+@pytest.fixture
+def snapshot_tenant(tenant_service: Mock, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> dict:
+    """A tenant with one snapshot of a single script, in a SnapshotStore under tmp_path."""
+    store = SnapshotStore(tmp_path / "store")
+    monkeypatch.setattr(cli.tenant_commands, "snapshot_store", store)
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "local_directory": str(tmp_path / "tenant")}
+    tenant_service.get_tenant_by_id.return_value = tenant
+
+    script: Path = tmp_path / "tenant" / "Scripts" / "a.crmscript"
+    script.parent.mkdir(parents=True)
+    script.write_text("print('old');\n")
+    tenant["snapshot_id"] = store.take(tenant, ["Scripts"])
+    script.write_text("print('new');\n")
+    return tenant
+
+
+def test_snapshots_list_prints_each_snapshot(snapshot_tenant: dict, capsys: pytest.CaptureFixture) -> None:
+    exit_code: int = run(["snapshots", "list", "5"])
+
+    assert exit_code == 0
+    out: str = capsys.readouterr().out
+    assert snapshot_tenant["snapshot_id"] in out and "1 files" in out
+
+
+def test_snapshots_diff_against_local_prints_changed_files_and_patch(
+    snapshot_tenant: dict, capsys: pytest.CaptureFixture
+) -> None:
+    exit_code: int = run(["snapshots", "diff", "5", "latest", "--patch"])
+
+    assert exit_code == 0
+    out: str = capsys.readouterr().out
+    assert "M Scripts/a.crmscript" in out
+    assert "-print('old');" in out and "+print('new');" in out
+
+
+def test_snapshots_restore_writes_snapshot_back(
+    snapshot_tenant: dict, capsys: pytest.CaptureFixture, tmp_path: Path
+) -> None:
+    exit_code: int = run(["snapshots", "restore", "5", snapshot_tenant["snapshot_id"]])
+
+    assert exit_code == 0
+    assert (tmp_path / "tenant" / "Scripts" / "a.crmscript").read_text() == "print('old');\n"
+    assert "1 changed" in capsys.readouterr().out
+
+
+def test_snapshots_restore_unknown_snapshot_exits_one(snapshot_tenant: dict, capsys: pytest.CaptureFixture) -> None:
+    exit_code: int = run(["snapshots", "restore", "5", "19990101-000000"])
+
+    assert exit_code == 1
+    assert "No snapshot 19990101-000000" in capsys.readouterr().err
+
+
+def test_fetch_archive_flag_passes_archive_to_fetch(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture
+) -> None:
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {"success": True, "validation_error": False, "error": "", "info": ""}
+
+    exit_code: int = run(["fetch", "5", "--archive", "out.zip"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, archive="out.zip")
+    assert "Fetched Acme successfully into out.zip." in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("flag", ["--sync", "--snapshot"])
+def test_fetch_archive_with_sync_or_snapshot_is_a_usage_error(
+    tenant_service: Mock, fetch_service: Mock, flag: str
+) -> None:
+    exit_code: int = run(["fetch", "5", "--archive", "out.zip", flag])
+
+    assert exit_code == 2
+    fetch_service.fetch.assert_not_called()
+
+
+def test_fetch_index_flag_passes_search_index_and_prints_counts(
+    tenant_service: Mock, fetch_service: Mock, search_index: SearchIndex, capsys: pytest.CaptureFixture
+) -> None:
+    tenant: dict = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    tenant_service.get_tenant_by_id.return_value = tenant
+    fetch_service.fetch.return_value = {
+        "success": True,
+        "validation_error": False,
+        "error": "",
+        "info": "",
+        "index": {"added": 1, "changed": 2, "removed": 3, "unchanged": 4},
+    }
+
+    exit_code: int = run(["fetch", "5", "--index"])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(tenant, search_index=search_index)
+    assert "Search index: 1 scripts added, 2 changed, 3 removed." in capsys.readouterr().out
+
+
+@pytest.fixture
+def search_index(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> SearchIndex:
+    """An empty SearchIndex under tmp_path, in place of the one in the user data folder."""
+    index = SearchIndex(tmp_path / "search_index.sqlite")
+    monkeypatch.setattr(cli.tenant_commands, "search_index", index)
+    return index
+
+
+def test_grep_prints_matching_lines(search_index: SearchIndex, capsys: pytest.CaptureFixture) -> None:
+    search_index.update({"id": 5, "tenant_name": "Acme"}, [
+        {"kind": "trigger", "object_id": 2, "part": "", "name": "On save", "body": "x = 1;\nparseJSON(y);"}])
+
+    exit_code: int = run(["grep", "parseJSON"])
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == "Acme/trigger/On save (ID 2):2: parseJSON(y);\n"
+
+
+def test_find_prints_matching_names(search_index: SearchIndex, capsys: pytest.CaptureFixture) -> None:
+    search_index.update({"id": 5, "tenant_name": "Acme"}, [
+        {"kind": "script", "object_id": 3, "part": "", "name": "Send invoice", "body": "x"}])
+
+    exit_code: int = run(["find", "invoice"])
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == "Acme/script/Send invoice (ID 3)\n"
+
+
+def test_grep_before_anything_is_indexed_exits_one(search_index: SearchIndex, capsys: pytest.CaptureFixture) -> None:
+    exit_code: int = run(["grep", "parseJSON"])
+
+    assert exit_code == 1
+    assert "crmfetch fetch --index" in capsys.readouterr().err
+
+
+def test_grep_unknown_kind_is_a_usage_error(search_index: SearchIndex) -> None:
+    assert run(["grep", "parseJSON", "--kind", "table"]) == 2
+
+
+def test_fetch_prints_transferred_bytes(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture
+) -> None:
+    tenant_service.get_tenant_by_id.return_value = {"id": 5, "tenant_name": "Acme", "url": "https://acme.example"}
+    fetch_service.fetch.return_value = {
+        "success": True,
+        "validation_error": False,
+        "error": "",
+        "info": "",
+        "transfer": {"wire_bytes": 1536, "decoded_bytes": 5 * 1024 * 1024},
+    }
+
+    exit_code: int = run(["fetch", "5"])
+
+    assert exit_code == 0
+    assert "Received 1.5 KB (5.0 MB decompressed)." in capsys.readouterr().out
+
+
 def test_fetch_prints_error_and_exits_one_on_fetch_failure(
     tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture
 ) -> None:
@@ -166,13 +458,103 @@ def test_fetch_without_id_is_a_usage_error(tenant_service: Mock, fetch_service:
     fetch_service.fetch.assert_not_called()
 
 
-def test_fetch_all_flag_is_a_usage_error_not_fetch_everything(
+def test_fetch_with_id_and_all_is_a_usage_error(tenant_service: Mock, fetch_service: Mock) -> None:
+    exit_code: int = run(["fetch", "5", "--all"])
+
+    assert exit_code == 2
+    fetch_service.fetch.assert_not_called()
+    fetch_service.fetch_many.assert_not_called()
+
+
+def ok_result() -> dict:
+    return {"success": True, "validation_error": False, "error": "", "info": ""}
+
+
+def test_fetch_all_fetches_every_tenant_concurrently_and_prints_summary(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture
+) -> None:
+    tenants: list[dict] = [
+        {"id": 1, "tenant_name": "Acme", "url": "https://acme.example"},
+        {"id": 2, "tenant_name": "Beta", "url": "https://beta.example"},
+    ]
+    tenant_service.get_all_tenants.return_value = tenants
+    fetch_service.fetch_many.return_value = [(tenants[0], ok_result(), 1.5), (tenants[1], ok_result(), 2.0)]
+
+    exit_code: int = run(["fetch", "--all", "--jobs", "8"])
+
+    assert exit_code == 0
+    fetch_service.fetch_many.assert_called_once()
+    assert fetch_service.fetch_many.call_args.args == (tenants, 8)
+    out: str = capsys.readouterr().out
+    assert "Acme" in out and "Beta" in out
+    assert "1.5 s" in out and "2.0 s" in out
+
+
+def test_fetch_ids_fetches_listed_tenants_and_exits_one_if_any_failed(
+    tenant_service: Mock, fetch_service: Mock, capsys: pytest.CaptureFixture
+) -> None:
+    acme: dict = {"id": 1, "tenant_name": "Acme", "url": "https://acme.example"}
+    gamma: dict = {"id": 7, "tenant_name": "Gamma", "url": "https://gamma.example"}
+    tenant_service.get_tenant_by_id.side_effect = lambda tenant_id: {1: acme, 7: gamma}[tenant_id]
+    failed: dict = dict(ok_result(), success=False, error="Failed to connect to SuperOffice")
+    fetch_service.fetch_many.return_value = [(acme, ok_result(), 1.0), (gamma, failed, 0.1)]
+
+    exit_code: int = run(["fetch", "--ids", "1,7"])
+
+    assert exit_code == 1
+    assert fetch_service.fetch_many.call_args.args[0] == [acme, gamma]
+    captured = capsys.readouterr()
+    assert "Failed to connect to SuperOffice" in captured.out
+    assert "1 of 2 tenants failed" in captured.err
+
+
+def test_fetch_ids_must_be_numbers(tenant_service: Mock, fetch_service: Mock) -> None:
+    exit_code: int = run(["fetch", "--ids", "1,x"])
+
+    assert exit_code == 2
+    fetch_service.fetch_many.assert_not_called()
+
+
+def test_fetch_match_uses_search_tenants_and_passes_fetch_options(
     tenant_service: Mock, fetch_service: Mock
 ) -> None:
-    exit_code: int = run(["fetch", "--all"])
+    tenants: list[dict] = [{"id": 1, "tenant_name": "Acme", "url": "https://acme.example"}]
+    tenant_service.search_tenants.return_value = tenants
+    fetch_service.fetch_many.return_value = [(tenants[0], ok_result(), 1.0)]
+
+    exit_code: int = run(["fetch", "--match", "acme", "--sync"])
+
+    assert exit_code == 0
+    tenant_service.search_tenants.assert_called_once_with("acme")
+    assert fetch_service.fetch_many.call_args.kwargs["sync"] is True
+
+
+def test_watch_fetches_the_selected_tenants_and_saves_their_status(
+    tenant_service: Mock, fetch_service: Mock, monkeypatch: pytest.MonkeyPatch, tmp_path: Path,
+    capsys: pytest.CaptureFixture
+) -> None:
+    acme: dict = {"id": 1, "tenant_name": "Acme", "url": "https://acme.example", "local_directory": "a"}
+    beta: dict = {"id": 2, "tenant_name": "Beta", "url": "https://beta.example", "local_directory": "b"}
+    tenant_service.get_tenant_by_id.return_value = acme
+    tenant_service.get_all_tenants.return_value = [acme, beta]
+    fetch_service.fetch.return_value = ok_result()
+    # A single round instead of running until Ctrl+C
+    monkeypatch.setattr(FetchScheduler, "run", lambda scheduler, stop: scheduler.run_pending())
+    status_file: Path = tmp_path / "status.json"
+
+    exit_code: int = run(["watch", "--ids", "1", "--jitter", "0", "--sync", "--status-file", str(status_file)])
+
+    assert exit_code == 0
+    fetch_service.fetch.assert_called_once_with(acme, sync=True)
+    assert "Acme: fetched in" in capsys.readouterr().out
+    status: list[dict] = json.loads(status_file.read_text())["tenants"]
+    assert [(s["tenant_id"], s["runs"], s["last_success"]) for s in status] == [(1, 1, True)]
+
+
+def test_watch_with_ids_and_match_is_a_usage_error(tenant_service: Mock, fetch_service: Mock) -> None:
+    exit_code: int = run(["watch", "--ids", "1", "--match", "acme"])
 
     assert exit_code == 2
-    tenant_service.get_tenant_by_id.assert_not_called()
     fetch_service.fetch.assert_not_called()
 
 
@@ -199,12 +581,12 @@ def test_add_calls_add_tenant_with_only_the_five_core_fields(tenant_service: Moc
     })
 
 
-def test_add_backfills_default_fetch_options_via_core_helper(tenant_service: Mock) -> None:
-    tenant_service.add_tenant.return_value = {"id": 1, "tenant_name": "Acme"}
-    all_tenants: list[dict] = [{"id": 1, "tenant_name": "Acme"}]
-    tenant_service.get_all_tenants.return_value = all_tenants
+def test_add_saves_the_tenant_with_default_fetch_options(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    settings_file: Path = tmp_path / "tenant_settings.json"
+    settings_file.write_text("[]")
+    monkeypatch.setattr(cli.tenant_commands, "tenant_service", TenantService(settings_file))
 
-    run([
+    exit_code: int = run([
         "add",
         "--name", "Acme",
         "--url", "https://acme.example",
@@ -213,7 +595,16 @@ def test_add_backfills_default_fetch_options_via_core_helper(tenant_service: Moc
         "--local-dir", "/tmp/acme",
     ])
 
-    tenant_service.add_missing_fetch_options.assert_called_once_with(all_tenants)
+    assert exit_code == 0
+    saved: list[dict] = json.loads(settings_file.read_text())
+    assert saved[0]["fetch_options"] == {
+        "fetch_scripts": True,
+        "fetch_triggers": True,
+        "fetch_screens": True,
+        "fetch_screen_choosers": True,
+        "fetch_scheduled_tasks": True,
+        "fetch_extra_tables": True,
+    }
 
 
 def test_add_missing_required_flag_is_a_usage_error(tenant_service: Mock) -> None:
@@ -263,6 +654,27 @@ def test_edit_with_no_flags_leaves_all_fields_unchanged(tenant_service: Mock) ->
     tenant_service.update_tenant.assert_called_once_with(tenant)
 
 
+def test_edit_metadata_layout(tenant_service: Mock) -> None:
+    tenant_service.get_tenant_by_id.return_value = {"id": 5, "tenant_name": "Acme"}
+
+    assert run(["edit", "5", "--metadata-layout", "nested"]) == 2
+    tenant_service.update_tenant.assert_not_called()
+
+    assert run(["edit", "5", "--metadata-layout", "index"]) == 0
+    tenant_service.update_tenant.assert_called_once_with({"id": 5, "tenant_name": "Acme", "metadata_layout": "index"})
+
+
+def test_meta_prints_metadata_of_either_layout(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    (tmp_path / "Sidecar.json").write_text(json.dumps({"id": 1}))
+    (tmp_path / "_index.json").write_text(json.dumps({"Indexed.crmscript": {"id": 2}}))
+
+    assert run(["meta", str(tmp_path / "Sidecar.crmscript")]) == 0
+    assert json.loads(capsys.readouterr().out) == {"id": 1}
+    assert run(["meta", str(tmp_path / "Indexed.crmscript")]) == 0
+    assert json.loads(capsys.readouterr().out) == {"id": 2}
+    assert run(["meta", str(tmp_path / "Missing.crmscript")]) == 1
+
+
 def test_edit_unknown_id_exits_one_without_calling_update(tenant_service: Mock) -> None:
     tenant_service.get_tenant_by_id.side_effect = ValueError("Tenant ID not found in tenant list")
 
@@ -371,9 +783,9 @@ def test_main_remaps_bare_apps_usage_error_exit_code_to_two(tenant_service: Mock
     # in this library version). cli.main - the actual console script entry
     # point - is what remaps that to exit code 2 for the CLI's contract.
     with pytest.raises(SystemExit) as bare_app_exit_info:
-        cli.app.app(["fetch"])
+        cli.app.app(["show"])
     assert bare_app_exit_info.value.code == 1
 
-    exit_code: int = run(["fetch"])
+    exit_code: int = run(["show"])
 
     assert exit_code == 2
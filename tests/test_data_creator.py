@@ -0,0 +1,472 @@
+"""
+Unit tests for data_creator.DataCreator and the core/data_creation creators it drives.
+
+Runs the real creators against a tmp_path local_directory, with a small
+hand-written script version 2 payload covering every group.
+"""
+import json
+import os
+import random
+import tracemalloc
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Iterator
+
+import pytest
+
+from benchmarks import synthetic_tenant
+from benchmarks.synthetic_tenant import TenantSize
+from core.data_creation.group_index import GroupIndex
+from core.data_creation.metadata import INDEX_FILE_NAME
+from core.data_creation.metadata import read_metadata
+from core.data_creation.name_registry import NameRegistry
+from core.data_creator import DataCreator
+from core.output import DirectoryOutput
+from core.output import FileWriteError
+from core.search_index import IndexUpdate
+from core.search_index import SearchIndex
+from core.utility import rename_folder
+
+
+def make_payload() -> dict:
+    """Returns a small script version 2 response containing every group."""
+    return {
+        "script_version": 2,
+        "group_scripts": {
+            "script_folders": [
+                {"id": 1, "name": "Parent", "parent_id": -1},
+                {"id": 2, "name": "Child", "parent_id": 1},
+            ],
+            "scripts": [
+                {"id": 10, "hierarchy_id": -1, "description": "Root script", "body": "root();"},
+                {"id": 11, "hierarchy_id": 2, "description": "Nested script?", "body": "nested();"},
+            ],
+        },
+        "group_triggers": {
+            "triggers": [{"id": 20, "description": "", "body": "trigger();"}],
+        },
+        "group_screens": {
+            "screen_folders": [{"id": 3, "name": "Screen folder", "parent_id": -1}],
+            "screen_definition": [{
+                "id": 30, "name": "My screen", "hierarchy_id": 3, "load_script_body": "load();",
+                "load_post_cgi_script_body": "", "load_final_script_body": "", "creation_script": "",
+            }],
+            "screen_definition_action": [{"id": 31, "screen_definition": 30, "button": "OK", "ejscript_body": "ok();"}],
+            "screen_definition_element": [{"id": 32, "screen_definition": 30, "name": "element"}],
+            "item_config": [
+                {"id": 33, "item_id": 32, "item_name": "a"},
+                {"id": 34, "item_id": 99, "item_name": "other element"},
+            ],
+            "screen_definition_hidden": [{"id": 35, "screen_definition": 30, "variable": "hidden"}],
+            "screen_definition_language": [],
+        },
+        "group_screen_choosers": {
+            "screen_choosers": [{"id": 40, "description": "Chooser", "body": "choose();"}],
+        },
+        "group_scheduled_tasks": {
+            "scheduled_task": [{"id": 50, "schedule_id": 51, "description": "Task"}],
+            "schedule": [{
+                "id": 51, "name": "Nightly", "asap": False, "next_execution": "", "last_execution": "",
+                "execution_time": 0, "lock_expire": "", "lock_pid": 0, "lock_ttl": 0, "error_message": "",
+                "last_error": "", "retries": 0, "retry_interval": 0,
+            }],
+        },
+        "group_extra_tables": {
+            "extra_table_folders": [{"id": 4, "name": "Tables folder", "parent_id": -1}],
+            "extra_tables": [{"id": 60, "name": "y_table", "hierarchy_id": 4}],
+            "extra_fields": [
+                {"id": 61, "extra_table": 60, "domain": 0},
+                {"id": 62, "extra_table": 0, "domain": 1},
+            ],
+        },
+    }
+
+
+@pytest.fixture
+def tenant(tmp_path: Path) -> dict:
+    """Returns a tenant with every fetch option enabled, fetching into tmp_path."""
+    return {
+        "local_directory": str(tmp_path),
+        "fetch_options": {
+            "fetch_scripts": True,
+            "fetch_triggers": True,
+            "fetch_screens": True,
+            "fetch_screen_choosers": True,
+            "fetch_scheduled_tasks": True,
+            "fetch_extra_tables": True,
+        },
+    }
+
+
+def read_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_create_builds_every_group(tenant: dict, tmp_path: Path) -> None:
+    assert DataCreator(make_payload(), 2, tenant).create() is True
+
+    assert (tmp_path / "Scripts" / "Root script.crmscript").read_text() == "root();"
+    assert (tmp_path / "Scripts" / "Parent" / "Child" / "Nested script.crmscript").read_text() == "nested();"
+    assert "body" not in read_json(tmp_path / "Scripts" / "Parent" / "Child" / "Nested script.json")
+    assert (tmp_path / "Triggers" / "Unnamed trigger (ID 20).crmscript").read_text() == "trigger();"
+    assert (tmp_path / "ScreenChoosers" / "Chooser.crmscript").read_text() == "choose();"
+
+    screen_path: Path = tmp_path / "Screens" / "Screen folder" / "(Screen) My screen"
+    assert (screen_path / "Loading script (before setFromCgi).crmscript").read_text() == "load();"
+    assert (screen_path / "Buttons" / "OK.crmscript").read_text() == "ok();"
+    elements: list[dict] = read_json(screen_path / "screen_definition_element.json")
+    assert [ic["id"] for ic in elements[0]["item_config"]] == [33]
+    assert read_json(screen_path / "screen_definition_hidden.json") == [
+        {"id": 35, "screen_definition": 30, "variable": "hidden"}
+    ]
+
+    task: dict = read_json(tmp_path / "Scheduled tasks" / "Nightly.json")
+    assert task["schedule"] == {"id": 51, "name": "Nightly"}
+
+    table: dict = read_json(tmp_path / "Tables" / "Tables folder" / "y_table.json")
+    assert [f["id"] for f in table["extra_fields"]] == [61]
+    assert [f["id"] for f in read_json(tmp_path / "Tables" / "Contact.json")["extra_fields"]] == [62]
+
+
+def test_create_replaces_previous_files_and_removes_temp(tenant: dict, tmp_path: Path) -> None:
+    stale_file: Path = tmp_path / "Scripts" / "Deleted in SuperOffice.crmscript"
+    stale_file.parent.mkdir()
+    stale_file.write_text("old")
+
+    DataCreator(make_payload(), 2, tenant).create()
+
+    assert not stale_file.exists()
+    assert not (tmp_path / "temp").exists()
+
+
+def test_create_failure_leaves_existing_folders_untouched(tenant: dict, tmp_path: Path) -> None:
+    existing_file: Path = tmp_path / "Scripts" / "Existing.crmscript"
+    existing_file.parent.mkdir()
+    existing_file.write_text("existing")
+    payload: dict = make_payload()
+    del payload["group_screens"]["item_config"]
+
+    with pytest.raises(KeyError):
+        DataCreator(payload, 2, tenant).create()
+
+    assert existing_file.read_text() == "existing"
+    assert not (tmp_path / "staging").exists()
+
+
+def test_create_reports_the_file_that_failed_to_write(
+    tenant: dict, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    write_file = DirectoryOutput.write_file
+
+    def write_failing_on_chooser(self, path: str, data: bytes) -> None:
+        if path.endswith("Chooser.crmscript"):
+            raise PermissionError("denied")
+        write_file(self, path, data)
+
+    monkeypatch.setattr(DirectoryOutput, "write_file", write_failing_on_chooser)
+
+    with pytest.raises(FileWriteError, match="Chooser.crmscript"):
+        DataCreator(make_payload(), 2, tenant).create()
+
+    assert not (tmp_path / "staging").exists()
+    assert not (tmp_path / "Scripts").exists()
+
+
+def test_create_restores_previous_folders_if_replacing_them_fails(
+    tenant: dict, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    existing_file: Path = tmp_path / "Triggers" / "Existing.crmscript"
+    existing_file.parent.mkdir()
+    existing_file.write_text("existing")
+    (tmp_path / "Scripts").mkdir()
+
+    def rename_failing_on_triggers(src: str, dst: str) -> bool:
+        if src.endswith("staging/Triggers"):
+            raise PermissionError("locked")
+        return rename_folder(src, dst)
+
+    monkeypatch.setattr("core.data_creator.rename_folder", rename_failing_on_triggers)
+
+    with pytest.raises(PermissionError):
+        DataCreator(make_payload(), 2, tenant).create()
+
+    assert existing_file.read_text() == "existing"
+    assert list((tmp_path / "Scripts").iterdir()) == []  # The new Scripts folder was rolled back too
+    assert not (tmp_path / "temp" / "Triggers").exists()
+
+
+def test_create_restores_folders_left_in_temp_by_an_interrupted_fetch(tenant: dict, tmp_path: Path) -> None:
+    left_in_temp: Path = tmp_path / "temp" / "Triggers" / "Existing.crmscript"
+    left_in_temp.parent.mkdir(parents=True)
+    left_in_temp.write_text("existing")
+    payload: dict = make_payload()
+    del payload["group_screens"]["item_config"]
+
+    with pytest.raises(KeyError):
+        DataCreator(payload, 2, tenant).create()
+
+    assert (tmp_path / "Triggers" / "Existing.crmscript").read_text() == "existing"
+    assert not (tmp_path / "temp").exists()
+
+
+def test_create_skips_groups_whose_fetch_option_is_disabled(tenant: dict, tmp_path: Path) -> None:
+    tenant["fetch_options"]["fetch_triggers"] = False
+
+    DataCreator(make_payload(), 2, tenant).create()
+
+    assert not (tmp_path / "Triggers").exists()
+    assert (tmp_path / "Scripts").is_dir()
+
+
+def test_create_accepts_a_stream_of_groups(tenant: dict, tmp_path: Path) -> None:
+    groups = iter(make_payload().items())
+
+    DataCreator(groups, 2, tenant).create()
+
+    assert (tmp_path / "Scripts" / "Root script.crmscript").read_text() == "root();"
+
+
+def test_sync_writes_same_tree_as_full_create(tenant: dict, tmp_path: Path) -> None:
+    full_tenant: dict = dict(tenant, local_directory=str(tmp_path / "full"))
+    sync_tenant: dict = dict(tenant, local_directory=str(tmp_path / "sync"))
+    (tmp_path / "full").mkdir()
+    (tmp_path / "sync").mkdir()
+    DataCreator(make_payload(), 2, full_tenant).create()
+
+    creator = DataCreator(make_payload(), 2, sync_tenant, sync=True)
+    creator.create()
+
+    def tree(root: Path) -> dict[str, bytes]:
+        return {str(p.relative_to(root)): p.read_bytes() if p.is_file() else b"" for p in root.rglob("*")}
+
+    assert tree(tmp_path / "sync") == tree(tmp_path / "full")
+    assert creator.changes == {"added": len([p for p in (tmp_path / "full").rglob("*") if p.is_file()]),
+                               "changed": 0, "removed": 0, "unchanged": 0}
+
+
+def test_sync_only_touches_files_that_differ(tenant: dict, tmp_path: Path) -> None:
+    DataCreator(make_payload(), 2, tenant, sync=True).create()
+    unchanged_file: Path = tmp_path / "Scripts" / "Root script.crmscript"
+    os.utime(unchanged_file, (0, 0))
+    stale_folder: Path = tmp_path / "Scripts" / "Deleted folder"
+    stale_folder.mkdir()
+    (stale_folder / "Deleted.crmscript").write_text("old")
+
+    payload: dict = make_payload()
+    payload["group_scripts"]["scripts"][1]["body"] = "changed();"
+    creator = DataCreator(payload, 2, tenant, sync=True)
+    creator.create()
+
+    assert creator.changes["changed"] == 1
+    assert creator.changes["removed"] == 1
+    assert creator.changes["added"] == 0
+    assert (tmp_path / "Scripts" / "Parent" / "Child" / "Nested script.crmscript").read_text() == "changed();"
+    assert unchanged_file.stat().st_mtime == 0
+    assert not stale_folder.exists()
+    assert not (tmp_path / "temp").exists()
+
+
+def test_sync_deletes_folders_of_disabled_groups(tenant: dict, tmp_path: Path) -> None:
+    DataCreator(make_payload(), 2, tenant, sync=True).create()
+    tenant["fetch_options"]["fetch_triggers"] = False
+
+    DataCreator(make_payload(), 2, tenant, sync=True).create()
+
+    assert not (tmp_path / "Triggers").exists()
+
+
+def test_index_layout_creates_one_metadata_file_per_folder(tenant: dict, tmp_path: Path) -> None:
+    sidecar_tenant: dict = dict(tenant, local_directory=str(tmp_path / "sidecar"))
+    index_tenant: dict = dict(tenant, local_directory=str(tmp_path / "index"), metadata_layout="index")
+    (tmp_path / "sidecar").mkdir()
+    (tmp_path / "index").mkdir()
+    DataCreator(make_payload(), 2, sidecar_tenant).create()
+    DataCreator(make_payload(), 2, index_tenant).create()
+
+    scripts: Path = tmp_path / "index" / "Scripts"
+    assert sorted(p.name for p in scripts.iterdir()) == ["Parent", "Root script.crmscript", INDEX_FILE_NAME]
+    assert read_json(scripts / INDEX_FILE_NAME) == {
+        "Root script.crmscript": {"id": 10, "hierarchy_id": -1, "description": "Root script"}
+    }
+    assert not (scripts / "Parent" / INDEX_FILE_NAME).exists()  # No scripts in it
+    assert (tmp_path / "index" / "Triggers" / INDEX_FILE_NAME).exists()
+    assert (tmp_path / "index" / "ScreenChoosers" / INDEX_FILE_NAME).exists()
+
+    # Both layouts read back the same metadata
+    for script_path in ["Scripts/Root script.crmscript", "Scripts/Parent/Child/Nested script.crmscript",
+                        "Triggers/Unnamed trigger (ID 20).crmscript", "ScreenChoosers/Chooser.crmscript"]:
+        metadata: dict | None = read_metadata(str(tmp_path / "index" / script_path))
+        assert metadata is not None and "body" not in metadata
+        assert metadata == read_metadata(str(tmp_path / "sidecar" / script_path))
+    assert read_metadata(str(tmp_path / "index" / "Scripts" / "Missing.crmscript")) is None
+
+
+@pytest.mark.parametrize("mode", [{}, {"sync": True}])
+def test_colliding_names_get_their_id(tenant: dict, tmp_path: Path, mode: dict) -> None:
+    payload: dict = make_payload()
+    payload["group_scripts"]["scripts"] += [
+        {"id": 12, "hierarchy_id": -1, "description": "Foo/Bar", "body": "first();"},
+        {"id": 13, "hierarchy_id": -1, "description": "Foo.Bar", "body": "second();"},
+        {"id": 14, "hierarchy_id": -1, "description": "foo.bar", "body": "third();"},
+    ]
+    payload["group_triggers"]["triggers"] += [{"id": 21, "description": "Unnamed trigger (ID 20)", "body": "t();"}]
+
+    creator = DataCreator(payload, 2, tenant, **mode)
+    creator.create()
+
+    scripts: Path = tmp_path / "Scripts"
+    assert (scripts / "Foo.Bar.crmscript").read_text() == "first();"
+    assert (scripts / "Foo.Bar (ID 13).crmscript").read_text() == "second();"
+    assert (scripts / "foo.bar (ID 14).crmscript").read_text() == "third();"
+    assert read_json(scripts / "foo.bar (ID 14).json")["id"] == 14
+    assert (tmp_path / "Triggers" / "Unnamed trigger (ID 20) (ID 21).crmscript").read_text() == "t();"
+    assert creator.collisions == [
+        {"directory": "Scripts", "name": "Foo.Bar", "id": 13, "renamed": "Foo.Bar (ID 13)"},
+        {"directory": "Scripts", "name": "foo.bar", "id": 14, "renamed": "foo.bar (ID 14)"},
+        {"directory": "Triggers", "name": "Unnamed trigger (ID 20)", "id": 21,
+         "renamed": "Unnamed trigger (ID 20) (ID 21)"},
+    ]
+
+
+def test_colliding_folder_names_get_their_id(tenant: dict, tmp_path: Path) -> None:
+    payload: dict = make_payload()
+    payload["group_scripts"]["script_folders"] += [{"id": 4, "name": "A/B", "parent_id": -1},
+                                                   {"id": 5, "name": "a.b", "parent_id": -1}]
+    payload["group_scripts"]["scripts"] += [
+        {"id": 12, "hierarchy_id": 4, "description": "First", "body": "first();"},
+        {"id": 13, "hierarchy_id": 5, "description": "Second", "body": "second();"},
+        {"id": 14, "hierarchy_id": -1, "description": "A.B", "body": "file();"},
+    ]
+
+    creator = DataCreator(payload, 2, tenant)
+    creator.create()
+
+    scripts: Path = tmp_path / "Scripts"
+    assert (scripts / "A.B" / "First.crmscript").read_text() == "first();"
+    assert (scripts / "a.b (ID 5)" / "Second.crmscript").read_text() == "second();"
+    assert (scripts / "A.B.crmscript").read_text() == "file();"  # A file, so not named like the folder
+    assert creator.collisions == [{"directory": "Scripts", "name": "a.b", "id": 5, "renamed": "a.b (ID 5)"}]
+
+
+def test_trailing_dots_are_kept_in_file_names_but_not_folder_names(tenant: dict, tmp_path: Path) -> None:
+    payload: dict = make_payload()
+    payload["group_scripts"]["script_folders"] += [{"id": 4, "name": "v1.", "parent_id": -1},
+                                                   {"id": 5, "name": "v1", "parent_id": -1}]
+    payload["group_scripts"]["scripts"] += [
+        {"id": 12, "hierarchy_id": -1, "description": "Foo.", "body": "dot();"},
+        {"id": 13, "hierarchy_id": -1, "description": "Foo", "body": "plain();"},
+        {"id": 14, "hierarchy_id": 4, "description": "In v1.", "body": "first();"},
+    ]
+
+    creator = DataCreator(payload, 2, tenant)
+    creator.create()
+
+    scripts: Path = tmp_path / "Scripts"
+    assert (scripts / "Foo..crmscript").read_text() == "dot();"
+    assert (scripts / "Foo.crmscript").read_text() == "plain();"
+    assert (scripts / "v1" / "In v1..crmscript").read_text() == "first();"
+    assert (scripts / "v1 (ID 5)").is_dir()
+    assert creator.collisions == [{"directory": "Scripts", "name": "v1", "id": 5, "renamed": "v1 (ID 5)"}]
+
+
+def test_buttons_without_a_caption_are_named_none(tenant: dict, tmp_path: Path) -> None:
+    payload: dict = make_payload()
+    payload["group_screens"]["screen_definition_action"] += [
+        {"id": 33, "screen_definition": 30, "button": None, "ejscript_body": "first();"},
+        {"id": 34, "screen_definition": 30, "button": None, "ejscript_body": "second();"}]
+
+    DataCreator(payload, 2, tenant).create()
+
+    buttons: Path = tmp_path / "Screens" / "Screen folder" / "(Screen) My screen" / "Buttons"
+    assert sorted(path.name for path in buttons.iterdir()) == ["None (ID 34).crmscript", "None.crmscript",
+                                                                "OK.crmscript"]
+    assert (buttons / "None.crmscript").read_text() == "first();"
+
+
+def test_name_registry_is_per_folder_and_never_reuses_a_name() -> None:
+    registry = NameRegistry()
+
+    assert registry.unique_name("a", "Foo (ID 2)", 1) == "Foo (ID 2)"
+    assert registry.unique_name("a", "Foo", 2) == "Foo"
+    assert registry.unique_name("a", "FOO", 2) == "FOO (ID 2, 2)"
+    assert registry.unique_name("b", "Foo", 3) == "Foo"
+    assert len(registry.collisions) == 1
+
+
+def test_create_releases_each_group_once_created(tenant: dict, tmp_path: Path) -> None:
+    payload: dict = make_payload()
+
+    assert DataCreator(payload, 2, tenant).create() is True
+
+    assert payload == {}
+    assert (tmp_path / "Screens" / "Screen folder" / "(Screen) My screen" / "Buttons" / "OK.crmscript").is_file()
+    assert "load_script_body" not in read_json(
+        tmp_path / "Screens" / "Screen folder" / "(Screen) My screen" / "screen_definition.json")
+
+
+def test_create_peak_memory_is_bounded_by_largest_group(tenant: dict, tmp_path: Path) -> None:
+    size = TenantSize(scripts=600, script_body_size=1000, triggers=60, screens=60, extra_tables=40)
+    generators: dict[str, Callable[[TenantSize, random.Random], dict]] = {
+        "group_scripts": synthetic_tenant.generate_group_scripts,
+        "group_triggers": synthetic_tenant.generate_group_triggers,
+        "group_screens": synthetic_tenant.generate_group_screens,
+        "group_screen_choosers": synthetic_tenant.generate_group_screen_choosers,
+        "group_scheduled_tasks": synthetic_tenant.generate_group_scheduled_tasks,
+        "group_extra_tables": synthetic_tenant.generate_group_extra_tables,
+    }
+
+    def group_memory(generate: Callable[[TenantSize, random.Random], dict]) -> int:
+        tracemalloc.start()
+        try:
+            group: dict = generate(size, random.Random(0))  # Kept until measured
+            return tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+    def stream() -> Iterator[tuple[str, Any]]:
+        """Each group as it would be read from a streamed response, one at a time."""
+        rng = random.Random(0)
+        for group_key, generate in generators.items():
+            yield group_key, generate(size, rng)
+
+    largest_group: int = max(group_memory(generate) for generate in generators.values())
+
+    # Imports and caches done on the first fetch are not what is measured
+    index = SearchIndex(tmp_path / "index" / "search_index.sqlite")
+    tenant = dict(tenant, id=1, tenant_name="Acme")
+    DataCreator(make_payload(), 2, tenant, index_update=index.begin_update(tenant)).create()
+
+    index_update: IndexUpdate = index.begin_update(tenant)
+    tracemalloc.start()
+    try:
+        assert DataCreator(stream(), 2, tenant, index_update=index_update).create() is True
+        peak: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # About 1.3 times, against 4.5 times when every group, body and written file's Future was kept to the end
+    assert peak < 2 * largest_group
+    # Scripts, triggers, screens' loading scripts (their other scripts are empty), buttons and ScreenChoosers
+    assert index_update.finish()["added"] == 600 + 60 + 60 + 2 * 60 + 50
+
+
+def test_create_unsupported_version_returns_false(tenant: dict) -> None:
+    assert DataCreator(make_payload(), 999, tenant).create() is False
+
+
+def test_group_index_find_matches_list_scan() -> None:
+    group: dict = make_payload()["group_screens"]
+    index = GroupIndex(group)
+
+    for item_id in [32, 99, 12345]:
+        expected: list[dict] = [ic for ic in group["item_config"] if ic.get("item_id") == item_id]
+        assert index.find("item_config", "item_id", item_id) == expected
+
+
+def test_group_index_find_one_raises_when_missing() -> None:
+    index = GroupIndex(make_payload()["group_scheduled_tasks"])
+
+    assert index.find_one("schedule", "id", 51)["name"] == "Nightly"
+    with pytest.raises(KeyError):
+        index.find_one("schedule", "id", 999)
@@ -0,0 +1,118 @@
+"""
+Unit tests for delta_fetch.DeltaMerger and the delta state file.
+
+The merged data must be exactly what a full fetch would have returned, so the
+tests compare against a hand-written full response.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from core.delta_fetch import DELTA_STATE_FILE_NAME
+from core.delta_fetch import DeltaMerger
+from core.delta_fetch import load_delta_state
+from core.delta_fetch import save_delta_state
+
+
+def script(script_id: int, hierarchy_id: int, updated: str, body: str = "") -> dict:
+    return {"id": script_id, "hierarchy_id": hierarchy_id, "description": f"Script {script_id}",
+            "registered": "2024-01-01 08:00:00", "updated": updated, "body": body or f"s{script_id}();"}
+
+
+def full_response() -> dict:
+    return {
+        "script_version": 4,
+        "delta": False,
+        "group_scripts": {
+            "script_folders": [{"id": 1, "name": "Folder", "parent_id": -1}],
+            "scripts": [script(10, -1, "2024-01-02 10:00:00"), script(11, 1, "2024-01-03 10:00:00"),
+                        script(12, 1, "")],
+        },
+    }
+
+
+@pytest.fixture
+def tenant(tmp_path: Path) -> dict:
+    return {"local_directory": str(tmp_path), "fetch_options": {"fetch_scripts": True, "fetch_triggers": False}}
+
+
+def test_full_response_passes_through_and_sets_high_water_mark(tenant: dict) -> None:
+    merger = DeltaMerger(None)
+
+    merged: dict = merger.merge(full_response())
+
+    assert "delta" not in merged
+    assert merged["group_scripts"] == full_response()["group_scripts"]
+    assert merger.is_delta is False
+    assert merger.new_state(tenant)["since"] == "2024-01-03 10:00:00"
+
+
+def test_delta_response_merges_changes_and_drops_deleted_rows(tenant: dict) -> None:
+    previous = DeltaMerger(None)
+    previous.merge(full_response())
+    state: dict = previous.new_state(tenant)
+
+    delta_response: dict = {
+        "script_version": 4,
+        "delta": True,
+        "group_scripts": {
+            "script_folders": [{"id": 1, "name": "Folder", "parent_id": -1}],
+            "scripts": [script(11, -1, "2024-01-05 09:00:00", "moved();"), script(13, 1, "2024-01-05 10:00:00")],
+            "script_ids": [{"id": 10}, {"id": 11}, {"id": 13}],
+        },
+    }
+    merger = DeltaMerger(state)
+
+    merged: dict = merger.merge(delta_response)
+
+    expected_scripts: list[dict] = [script(10, -1, "2024-01-02 10:00:00"), script(11, -1, "2024-01-05 09:00:00",
+                                    "moved();"), script(13, 1, "2024-01-05 10:00:00")]
+    assert merged["group_scripts"]["scripts"] == expected_scripts
+    assert "script_ids" not in merged["group_scripts"]
+    assert merger.is_delta is True
+    assert merger.changed_rows == 2
+    assert merger.new_state(tenant)["since"] == "2024-01-05 10:00:00"
+
+
+def test_delta_rows_are_kept_before_creators_modify_them(tenant: dict) -> None:
+    merger = DeltaMerger(None)
+    merged: dict = merger.merge(full_response())
+
+    for row in merged["group_scripts"]["scripts"]:
+        row.pop("body")  # As the creators do
+
+    assert all("body" in row for row in merger.new_state(tenant)["rows"]["group_scripts"])
+
+
+def test_stream_stays_a_stream(tenant: dict) -> None:
+    merger = DeltaMerger(None)
+
+    merged = merger.merge(iter(full_response().items()))
+
+    assert not isinstance(merged, dict)
+    assert [key for key, _ in merged] == ["script_version", "group_scripts"]
+
+
+def test_delta_response_with_unknown_live_id_raises(tenant: dict) -> None:
+    delta_response: dict = {"delta": True, "group_scripts": {"scripts": [], "script_ids": [{"id": 99}]}}
+
+    with pytest.raises(ValueError):
+        DeltaMerger({"since": "2024-01-01", "rows": {}}).merge(delta_response)
+
+
+def test_state_round_trips_and_is_discarded_when_fetch_options_change(tenant: dict, tmp_path: Path) -> None:
+    state: dict = {"since": "2024-01-01", "fetch_options": dict(tenant["fetch_options"]), "rows": {}}
+    save_delta_state(tenant, state)
+
+    assert load_delta_state(tenant) == state
+    assert json.loads((tmp_path / DELTA_STATE_FILE_NAME).read_text(encoding="utf-8")) == state
+
+    tenant["fetch_options"]["fetch_triggers"] = True
+    assert load_delta_state(tenant) is None
+
+
+def test_unreadable_state_is_ignored(tenant: dict, tmp_path: Path) -> None:
+    (tmp_path / DELTA_STATE_FILE_NAME).write_text("{not json", encoding="utf-8")
+
+    assert load_delta_state(tenant) is None
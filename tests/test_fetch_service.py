@@ -1,18 +1,32 @@
 """
 Unit tests for fetch_service.FetchService.
 
-The SuperOffice HTTP call (requests.get) is mocked; everything else runs for
+The SuperOffice HTTP call (requests.Session.get) is mocked; everything else runs for
 real against a tmp_path local_directory, matching the existing pattern in
 fetch_service.py itself (plain requests mocking, no framework coupling).
+The tests at the end go through real HTTP instead, against benchmarks/mock_superoffice.py.
 """
+import gzip
 import json
+import socket
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import MagicMock
 from unittest.mock import Mock
 
 import pytest
 import requests
 
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core.fetch_service import CURRENT_CRMSCRIPT_VERSION
 from core.fetch_service import FetchService
+from core.http_session import create_session
+from core.progress import FetchCancelled
 
 
 @pytest.fixture
@@ -39,30 +53,73 @@ def tenant(tmp_path: Path) -> dict:
     }
 
 
-def mock_response(text: str) -> Mock:
-    """Builds a Mock standing in for requests.Response, with a no-op raise_for_status."""
-    response: Mock = Mock()
+def mock_response(text: str, content_encoding: str = "") -> Mock:
+    """
+    Builds a Mock standing in for requests.Response, with a no-op raise_for_status.
+    With content_encoding set to "gzip", the body is sent gzipped.
+    """
+    response: Mock = MagicMock()
     response.raise_for_status = Mock()
-    response.text = text
+    response.encoding = "utf-8"
+    response.headers = {"Content-Encoding": content_encoding} if content_encoding else {}
+
+    data: bytes = text.encode("utf-8")
+    if content_encoding == "gzip":
+        data = gzip.compress(data)
+
+    # Streamed in small chunks, so records are split across chunk boundaries
+    response.raw.stream = lambda chunk_size, decode_content: (data[i:i + 7] for i in range(0, len(data), 7))
     return response
 
 
+def patch_get(monkeypatch: pytest.MonkeyPatch, get) -> None:
+    """Makes every requests.Session.get call get(url, **kwargs) instead."""
+    monkeypatch.setattr(requests.Session, "get", lambda session, url, **kwargs: get(url, **kwargs))
+
+
 def test_fetch_success(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
     payload: dict = {
-        "script_version": 2,
+        "script_version": CURRENT_CRMSCRIPT_VERSION,
         "group_scripts": {"script_folders": [], "scripts": []},
     }
-    monkeypatch.setattr("core.fetch_service.requests.get", lambda url: mock_response(json.dumps(payload)))
+    patch_get(monkeypatch, lambda url, **kwargs: mock_response(json.dumps(payload)))
 
     result: dict = FetchService().fetch(tenant)
 
+    body_size: int = len(json.dumps(payload))
+    assert result.pop("transfer") == {"wire_bytes": body_size, "decoded_bytes": body_size}
     assert result == {"success": True, "validation_error": False, "error": "", "info": ""}
 
 
+@pytest.mark.parametrize("stream", [False, True])
+def test_fetch_decompresses_gzip_and_reports_wire_bytes(
+    monkeypatch: pytest.MonkeyPatch, tenant: dict, stream: bool
+) -> None:
+    payload: dict = {
+        "script_version": CURRENT_CRMSCRIPT_VERSION,
+        "group_scripts": {"script_folders": [], "scripts": [
+            {"id": i, "hierarchy_id": -1, "description": f"Script {i}", "body": "print('a');" * 50} for i in range(20)
+        ]},
+    }
+    text: str = json.dumps(payload)
+    patch_get(monkeypatch, lambda url, **kwargs: mock_response(text, content_encoding="gzip"))
+
+    result: dict = FetchService().fetch(tenant, stream=stream)
+
+    assert result["success"] is True
+    assert result["transfer"] == {"wire_bytes": len(gzip.compress(text.encode())), "decoded_bytes": len(text)}
+    assert result["transfer"]["wire_bytes"] < len(text) / 10
+    assert (Path(tenant["local_directory"]) / "Scripts" / "Script 19.crmscript").read_text() == "print('a');" * 50
+
+
+def test_session_asks_for_compressed_responses() -> None:
+    assert "gzip" in FetchService().session.headers["Accept-Encoding"]
+
+
 def test_fetch_success_flags_outdated_script_version(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
     # No script_version key -> defaults to v1, which is older than CURRENT_CRMSCRIPT_VERSION.
     payload: dict = {"script_folders": [], "scripts": [], "triggers": []}
-    monkeypatch.setattr("core.fetch_service.requests.get", lambda url: mock_response(json.dumps(payload)))
+    patch_get(monkeypatch, lambda url, **kwargs: mock_response(json.dumps(payload)))
 
     result: dict = FetchService().fetch(tenant)
 
@@ -93,10 +150,10 @@ def test_fetch_validation_error_when_no_fetch_option_enabled(tenant: dict) -> No
 
 
 def test_fetch_http_connection_error(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
-    def raise_connection_error(url: str) -> None:
+    def raise_connection_error(url: str, **kwargs) -> None:
         raise requests.ConnectionError("connection refused")
 
-    monkeypatch.setattr("core.fetch_service.requests.get", raise_connection_error)
+    patch_get(monkeypatch, raise_connection_error)
 
     result: dict = FetchService().fetch(tenant)
 
@@ -109,7 +166,7 @@ def test_fetch_http_connection_error(monkeypatch: pytest.MonkeyPatch, tenant: di
 def test_fetch_http_error_status(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
     response: Mock = mock_response("")
     response.raise_for_status.side_effect = requests.HTTPError("500 Server Error")
-    monkeypatch.setattr("core.fetch_service.requests.get", lambda url: response)
+    patch_get(monkeypatch, lambda url, **kwargs: response)
 
     result: dict = FetchService().fetch(tenant)
 
@@ -119,7 +176,7 @@ def test_fetch_http_error_status(monkeypatch: pytest.MonkeyPatch, tenant: dict)
 
 
 def test_fetch_invalid_json_response(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
-    monkeypatch.setattr("core.fetch_service.requests.get", lambda url: mock_response("not valid json"))
+    patch_get(monkeypatch, lambda url, **kwargs: mock_response("not valid json"))
 
     result: dict = FetchService().fetch(tenant)
 
@@ -128,3 +185,342 @@ def test_fetch_invalid_json_response(monkeypatch: pytest.MonkeyPatch, tenant: di
     assert "Invalid JSON response from server" in result["error"]
     assert "<br>" not in result["error"]
     assert "\n" in result["error"]
+
+
+def test_fetch_stream_creates_files(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    payload: dict = {
+        "script_version": CURRENT_CRMSCRIPT_VERSION,
+        "group_scripts": {
+            "script_folders": [{"id": 1, "name": "Folder", "parent_id": -1}],
+            "scripts": [{"id": 10, "hierarchy_id": 1, "description": "My script", "body": "print(\"æøå\");"}],
+        },
+    }
+    requested: dict = {}
+
+    def get(url: str, **kwargs) -> Mock:
+        requested.update(kwargs)
+        return mock_response(json.dumps(payload))
+
+    patch_get(monkeypatch, get)
+
+    result: dict = FetchService().fetch(tenant, stream=True)
+
+    assert result["transfer"]["decoded_bytes"] == len(json.dumps(payload).encode("utf-8"))
+    del result["transfer"]
+    assert result == {"success": True, "validation_error": False, "error": "", "info": ""}
+    assert requested["stream"] is True
+    scripts_directory: Path = Path(tenant["local_directory"]) / "Scripts" / "Folder"
+    assert (scripts_directory / "My script.crmscript").read_text(encoding="utf-8") == 'print("æøå");'
+    assert json.loads((scripts_directory / "My script.json").read_text(encoding="utf-8"))["id"] == 10
+
+
+def test_fetch_stream_reads_version_1_response(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    payload: dict = {"script_folders": [], "scripts": [], "triggers": []}
+    patch_get(monkeypatch, lambda url, **kwargs: mock_response(json.dumps(payload)))
+
+    result: dict = FetchService().fetch(tenant, stream=True)
+
+    assert result["success"] is True
+    assert result["info"] != ""
+
+
+def test_fetch_stream_invalid_json_response(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    patch_get(monkeypatch, lambda url, **kwargs: mock_response("not valid json"))
+
+    result: dict = FetchService().fetch(tenant, stream=True)
+
+    assert result["success"] is False
+    assert "Invalid JSON response from server" in result["error"]
+
+
+def test_fetch_sync_reports_changes(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    payload: dict = {
+        "script_version": 2,
+        "group_scripts": {"script_folders": [], "scripts": [{"id": 1, "hierarchy_id": -1, "description": "A", "body": ""}]},
+    }
+    patch_get(monkeypatch, lambda url, **kwargs: mock_response(json.dumps(payload)))
+
+    first: dict = FetchService().fetch(tenant, sync=True)
+    second: dict = FetchService().fetch(tenant, sync=True)
+
+    assert first["changes"] == {"added": 2, "changed": 0, "removed": 0, "unchanged": 0}
+    assert second["changes"] == {"added": 0, "changed": 0, "removed": 0, "unchanged": 2}
+
+
+def test_fetch_many_runs_tenants_concurrently_and_keeps_order(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    tenants: list[dict] = [{"id": i, "local_directory": str(tmp_path / str(i))} for i in range(3)]
+    barrier = threading.Barrier(3, timeout=5)  # Only passes if all three fetches run at the same time
+
+    def fetch(tenant: dict, **kwargs) -> dict:
+        barrier.wait()
+        return {"success": True, "tenant_id": tenant["id"], "kwargs": kwargs}
+
+    service = FetchService()
+    monkeypatch.setattr(service, "fetch", fetch)
+    finished: list[int] = []
+
+    results: list[tuple] = service.fetch_many(tenants, jobs=3, on_result=lambda t, r, s: finished.append(t["id"]),
+                                              sync=True)
+
+    assert [result["tenant_id"] for _, result, _ in results] == [0, 1, 2]
+    assert [tenant["id"] for tenant, _, _ in results] == [0, 1, 2]
+    assert all(result["kwargs"] == {"sync": True} for _, result, _ in results)
+    assert sorted(finished) == [0, 1, 2]
+
+
+def test_fetch_many_refuses_tenants_sharing_a_local_directory(tmp_path: Path) -> None:
+    tenants: list[dict] = [{"id": 1, "local_directory": str(tmp_path)}, {"id": 2, "local_directory": str(tmp_path)}]
+
+    with pytest.raises(ValueError):
+        FetchService().fetch_many(tenants)
+
+
+def test_requests_reuse_one_session_with_timeouts(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    payload: dict = {"script_version": 2, "group_scripts": {"script_folders": [], "scripts": []}}
+    sessions: list = []
+    timeouts: list = []
+
+    def get(session, url: str, **kwargs) -> Mock:
+        sessions.append(session)
+        timeouts.append(kwargs["timeout"])
+        return mock_response(json.dumps(payload))
+
+    monkeypatch.setattr(requests.Session, "get", get)
+    service = FetchService(timeout=(1, 2))
+
+    service.fetch(tenant)
+    service.fetch(tenant)
+
+    assert sessions == [service.session, service.session]
+    assert timeouts == [(1, 2), (1, 2)]
+
+
+def test_fetch_timeout(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    def raise_timeout(url: str, **kwargs):
+        raise requests.ReadTimeout("read timed out")
+
+    patch_get(monkeypatch, raise_timeout)
+
+    result: dict = FetchService().fetch(tenant)
+
+    assert result["success"] is False
+    assert result["error"].startswith("Request to SuperOffice timed out")
+
+
+def test_create_session_pools_connections_and_retries_gets() -> None:
+    session: requests.Session = create_session(pool_maxsize=8, retries=3)
+    adapter = session.get_adapter("https://acme.superoffice.com")
+
+    assert adapter._pool_maxsize == 8
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.read is False
+    assert adapter.max_retries.allowed_methods == ["GET"]
+
+
+def test_stalled_response_is_not_retried(tenant: dict) -> None:
+    connections: list[socket.socket] = []
+    server: socket.socket = socket.create_server(("127.0.0.1", 0))
+
+    def accept_and_never_respond() -> None:
+        while True:
+            try:
+                connections.append(server.accept()[0])
+            except OSError:  # Closed once the test is done
+                return
+
+    threading.Thread(target=accept_and_never_respond, daemon=True).start()
+    tenant["url"] = f"http://127.0.0.1:{server.getsockname()[1]}"
+    try:
+        result: dict = FetchService(timeout=(5, 0.2)).fetch(tenant)
+    finally:
+        server.close()
+        for connection in connections:
+            connection.close()
+
+    assert result["success"] is False
+    assert result["error"].startswith("Request to SuperOffice timed out")
+    assert len(connections) == 1
+
+
+def test_delta_fetch_sends_since_and_merges_changes(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    def script(script_id: int, updated: str) -> dict:
+        return {"id": script_id, "hierarchy_id": -1, "description": f"Script {script_id}", "registered": "",
+                "updated": updated, "body": f"s{script_id}('{updated}');"}
+
+    responses: list[dict] = [
+        {"script_version": 4, "delta": False, "group_scripts": {
+            "script_folders": [], "scripts": [script(1, "2024-01-01 10:00:00"), script(2, "2024-01-01 11:00:00")]}},
+        {"script_version": 4, "delta": True, "group_scripts": {
+            "script_folders": [], "scripts": [script(2, "2024-02-01 09:00:00")], "script_ids": [{"id": 2}]}},
+    ]
+    urls: list[str] = []
+
+    def get(url: str, **kwargs) -> Mock:
+        urls.append(url)
+        return mock_response(json.dumps(responses[len(urls) - 1]))
+
+    patch_get(monkeypatch, get)
+    service = FetchService()
+
+    first: dict = service.fetch(tenant, delta=True)
+    second: dict = service.fetch(tenant, delta=True, sync=True)
+
+    assert first["delta"] == {"full": True, "since": "", "changed_rows": 2}
+    assert "since=" not in urls[0]
+    assert urls[1].endswith("&since=2024-01-01%2011%3A00%3A00")
+    assert second["delta"] == {"full": False, "since": "2024-01-01 11:00:00", "changed_rows": 1}
+    scripts_directory: Path = Path(tenant["local_directory"]) / "Scripts"
+    assert sorted(p.name for p in scripts_directory.glob("*.crmscript")) == ["Script 2.crmscript"]
+    assert (scripts_directory / "Script 2.crmscript").read_text() == "s2('2024-02-01 09:00:00');"
+
+
+def group_body(url: str) -> str:
+    """Returns the JSON the fetcher script responds with for a URL requesting a single group."""
+    groups: dict = {
+        "fetch_scripts": ("group_scripts", {"script_folders": [], "scripts": [
+            {"id": 1, "hierarchy_id": -1, "description": "My script", "body": "script();"}]}),
+        "fetch_triggers": ("group_triggers", {"triggers": [{"id": 2, "description": "My trigger", "body": "t();"}]}),
+    }
+    key, group = next(groups[option] for option in groups if f"{option}=True" in url)
+    return json.dumps({"script_version": CURRENT_CRMSCRIPT_VERSION, key: group})
+
+
+def test_parallel_fetch_requests_each_group_concurrently(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    tenant["fetch_options"]["fetch_triggers"] = True
+    barrier = threading.Barrier(2, timeout=5)  # Only passes if both group requests are sent at the same time
+    urls: list[str] = []
+
+    def get(url: str, **kwargs) -> Mock:
+        urls.append(url)
+        barrier.wait()
+        return mock_response(group_body(url))
+
+    patch_get(monkeypatch, get)
+
+    result: dict = FetchService().fetch(tenant, parallel=True)
+
+    assert result["success"] is True, result["error"]
+    assert len(urls) == 2
+    assert all(url.count("=True") == 1 for url in urls)
+    local_directory = Path(tenant["local_directory"])
+    assert (local_directory / "Scripts" / "My script.crmscript").read_text() == "script();"
+    assert (local_directory / "Triggers" / "My trigger.crmscript").read_text() == "t();"
+    body_sizes: int = sum(len(group_body(url)) for url in urls)
+    assert result["transfer"] == {"wire_bytes": body_sizes, "decoded_bytes": body_sizes}
+
+
+def test_parallel_fetch_fails_if_any_group_request_fails(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    tenant["fetch_options"]["fetch_triggers"] = True
+    existing_file: Path = Path(tenant["local_directory"]) / "Scripts" / "Existing.crmscript"
+    existing_file.parent.mkdir()
+    existing_file.write_text("existing")
+
+    def get(url: str, **kwargs) -> Mock:
+        if "fetch_triggers=True" in url:
+            raise requests.ConnectionError("connection refused")
+        return mock_response(group_body(url))
+
+    patch_get(monkeypatch, get)
+
+    result: dict = FetchService().fetch(tenant, parallel=True)
+
+    assert result["success"] is False
+    assert "Failed to connect to SuperOffice" in result["error"]
+    assert existing_file.read_text() == "existing"
+
+
+def test_parallel_fetch_shuts_down_group_requests_once_one_raises(monkeypatch: pytest.MonkeyPatch,
+                                                                  tenant: dict) -> None:
+    tenant["fetch_options"]["fetch_triggers"] = True
+    shutdowns: list[bool] = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+            shutdowns.append(cancel_futures)
+            super().shutdown(wait, cancel_futures=cancel_futures)
+
+    def get(url: str, **kwargs) -> Mock:
+        raise FetchCancelled("Fetch cancelled")
+
+    monkeypatch.setattr("core.fetch_service.ThreadPoolExecutor", RecordingExecutor)
+    patch_get(monkeypatch, get)
+
+    result: dict = FetchService().fetch(tenant, parallel=True)
+
+    assert result["cancelled"] is True
+    assert True in shutdowns  # Group requests not sent yet are cancelled rather than sent to the tenant anyway
+
+
+def test_parallel_fetches_send_at_most_a_pool_of_group_requests_at_once(monkeypatch: pytest.MonkeyPatch,
+                                                                       tenant: dict, tmp_path: Path) -> None:
+    monkeypatch.setattr("core.fetch_service.POOL_MAXSIZE", 2)
+    lock = threading.Lock()
+    in_flight: list[int] = [0, 0]  # Now, and at most
+
+    def get(url: str, **kwargs) -> Mock:
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return mock_response(group_body(url))
+
+    patch_get(monkeypatch, get)
+    tenants: list[dict] = []
+    for i in range(3):
+        (tmp_path / str(i)).mkdir()
+        tenants.append(dict(tenant, id=i, local_directory=str(tmp_path / str(i)),
+                            fetch_options=dict(tenant["fetch_options"], fetch_triggers=True)))
+
+    results: list[tuple[dict, dict, float]] = FetchService().fetch_many(tenants, jobs=3, parallel=True)
+
+    assert all(result["success"] for _, result, _ in results), results
+    assert in_flight[1] == 2  # 6 group requests, but never more than the pool at once
+
+
+@pytest.mark.parametrize("mode", [{}, {"stream": True}, {"sync": True}, {"parallel": True}])
+def test_fetch_over_http_from_mock_superoffice(tmp_path: Path, mode: dict) -> None:
+    size = TenantSize(script_folders=3, scripts=20, triggers=5, screen_folders=2, screens=5, screen_choosers=3,
+                      scheduled_tasks=2, extra_table_folders=2, extra_tables=4)
+
+    with MockSuperOffice(generate_tenant(size)) as mock:
+        result: dict = FetchService().fetch(mock.tenant(str(tmp_path)), **mode)
+
+    assert result["success"] is True, result["error"]
+    assert result["transfer"]["wire_bytes"] < result["transfer"]["decoded_bytes"]  # Sent gzipped
+    assert len(list((tmp_path / "Scripts").rglob("*.crmscript"))) == 20
+    assert len(list((tmp_path / "Screens").iterdir())) > 0
+
+
+def test_fetch_into_archive_matches_fetch_into_directory(tmp_path: Path) -> None:
+    size = TenantSize(script_folders=2, scripts=10, triggers=3, screen_folders=1, screens=3, screen_choosers=2,
+                      scheduled_tasks=2, extra_table_folders=1, extra_tables=2)
+    directory: Path = tmp_path / "directory"
+    archived: Path = tmp_path / "archived"
+    archive_path: Path = tmp_path / "tenant.zip"
+    directory.mkdir()
+    archived.mkdir()
+
+    with MockSuperOffice(generate_tenant(size)) as mock:
+        assert FetchService().fetch(mock.tenant(str(directory)))["success"] is True
+        result: dict = FetchService().fetch(mock.tenant(str(archived)), archive=str(archive_path))
+
+    assert result["success"] is True, result["error"]
+    assert list(archived.iterdir()) == []
+    expected: dict[str, bytes] = {path.relative_to(directory).as_posix(): path.read_bytes()
+                                  for path in directory.rglob("*") if path.is_file()}
+    with zipfile.ZipFile(archive_path) as archive:
+        assert {name: archive.read(name) for name in archive.namelist() if not name.endswith("/")} == expected
+
+
+def test_fetch_refuses_unsupported_archive_before_requesting(monkeypatch: pytest.MonkeyPatch, tenant: dict) -> None:
+    get = Mock()
+    patch_get(monkeypatch, get)
+
+    result: dict = FetchService().fetch(dict(tenant, archive_path="tenant.rar"))
+
+    assert result["success"] is False
+    assert result["validation_error"] is True
+    assert "Unsupported archive type" in result["error"]
+    get.assert_not_called()
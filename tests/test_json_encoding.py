@@ -0,0 +1,77 @@
+"""
+Unit tests for the JSON encoders: every encoder must give exactly the bytes json.dumps(indent=4, ensure_ascii=False)
+does, one content at a time and in batches.
+"""
+import json
+
+import pytest
+
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core import json_encoding
+from core.json_encoding import JSON_ENCODERS
+from core.json_encoding import JsonEncoder
+from core.json_encoding import double_indent
+from core.json_encoding import set_json_encoder
+
+CONTENTS: list = [
+    {},
+    [],
+    {"id": 1, "description": "Plain", "enabled": True, "parent": None, "children": [], "config": {}},
+    [{"nested": [[1, 2], {"deeper": [{"deepest": [-1]}]}]}, 3, "text", False],
+    {"escapes": "quote \" backslash \\ tab \t newline \n control \x01 \x1f delete \x7f slash /"},
+    {"unicode": "æøå ÆØÅ € 中文 🎉    ", "æøå": "key"},
+    {"looks like indentation": ",\n    ", "empty": ""},
+    {"floats": [0.1, 100.0, 1e16, 1e-05, -0.0, 1.5e300, float("nan"), float("inf")]},
+    {1: "int key", None: "None key", True: "bool key"},
+    {"big": 2 ** 70, "negative": -2 ** 63},
+    ("tuple", 1),
+    "just a string",
+    12,
+]
+
+
+@pytest.fixture(params=list(JSON_ENCODERS))
+def encoder(request: pytest.FixtureRequest) -> JsonEncoder:
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    return JSON_ENCODERS[request.param]()
+
+
+def expected(content) -> bytes:
+    return json.dumps(content, indent=4, ensure_ascii=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("content", CONTENTS)
+def test_encode_matches_json_dumps(encoder: JsonEncoder, content) -> None:
+    assert encoder.encode(content) == expected(content)
+
+
+def test_encode_batch_matches_json_dumps(encoder: JsonEncoder) -> None:
+    assert encoder.encode_batch(CONTENTS) == [expected(content) for content in CONTENTS]
+    assert encoder.encode_batch([]) == []
+    assert encoder.encode_batch([{"id": 1}]) == [expected({"id": 1})]
+
+
+def test_encode_matches_json_dumps_on_synthetic_tenant(encoder: JsonEncoder) -> None:
+    tenant: dict = generate_tenant(TenantSize(scripts=200, screens=20), seed=1)
+    group_screens: dict = tenant["group_screens"]
+    records: list = tenant["group_scripts"]["scripts"] + group_screens["screen_definition_element"]
+
+    assert encoder.encode_batch(records) == [expected(record) for record in records]
+    assert encoder.encode(group_screens) == expected(group_screens)
+
+
+def test_double_indent() -> None:
+    assert double_indent(b'{\n  "a": [\n    1\n  ]\n}') == b'{\n    "a": [\n        1\n    ]\n}'
+    assert double_indent(b"[]") == b"[]"
+
+
+def test_set_json_encoder(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(json_encoding, "_encoder", None)
+
+    set_json_encoder("json")
+    assert type(json_encoding.get_json_encoder()) is JsonEncoder
+
+    with pytest.raises(ValueError):
+        set_json_encoder("yaml")
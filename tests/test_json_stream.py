@@ -0,0 +1,91 @@
+"""
+Unit tests for json_stream.JsonStreamReader.
+
+Every test feeds the reader the same JSON split into chunks of many different
+sizes, since the interesting cases are all about where a chunk boundary lands:
+mid-record, mid-number, mid-key and mid-way through a multibyte character.
+"""
+import json
+
+import pytest
+
+from core.json_stream import JsonStreamReader
+
+PAYLOAD: dict = {
+    "script_version": 2,
+    "group_scripts": {
+        "script_folders": [{"id": 1, "name": "Folder", "parent_id": -1}],
+        "scripts": [
+            {"id": 10, "hierarchy_id": 1, "description": "Første script", "body": "print(\"æøå \\u00e9\");"},
+            {"id": 11, "hierarchy_id": -1, "description": "Other", "body": "x" * 5000},
+        ],
+    },
+    "group_triggers": {"triggers": []},
+    "group_extra_tables": {"extra_table_folders": [], "extra_tables": [], "extra_fields": [{"id": 123456789}]},
+}
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    """Splits data into chunks of the given size."""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1000, 100_000])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_items_match_json_loads_for_any_chunk_size(chunk_size: int, indent: int | None) -> None:
+    data: bytes = json.dumps(PAYLOAD, indent=indent, ensure_ascii=False).encode("utf-8")
+
+    items: list[tuple] = list(JsonStreamReader(chunked(data, chunk_size)).items())
+
+    assert items == list(PAYLOAD.items())
+
+
+def test_items_are_yielded_before_the_stream_has_been_read_in_full() -> None:
+    data: bytes = json.dumps(PAYLOAD).encode("utf-8")
+    chunks: list[bytes] = chunked(data, 16)
+    read_chunks: list[bytes] = []
+
+    def track_reads():
+        for chunk in chunks:
+            read_chunks.append(chunk)
+            yield chunk
+
+    items = JsonStreamReader(track_reads()).items()
+    assert next(items) == ("script_version", 2)
+
+    assert len(read_chunks) < len(chunks)
+
+
+def test_version_1_top_level_arrays_are_read() -> None:
+    payload: dict = {"script_folders": [], "scripts": [{"id": 1}], "triggers": [{"id": 2}, {"id": 3}]}
+    data: bytes = json.dumps(payload).encode("utf-8")
+
+    assert dict(JsonStreamReader(chunked(data, 5)).items()) == payload
+
+
+def test_empty_object_yields_nothing() -> None:
+    assert list(JsonStreamReader([b"{ }"]).items()) == []
+
+
+@pytest.mark.parametrize("text", [b"not valid json", b'{"a": [1, 2', b'{"a": 1} trailing', b'{"a" 1}', b""])
+def test_invalid_json_raises_decode_error(text: bytes) -> None:
+    with pytest.raises(json.JSONDecodeError):
+        list(JsonStreamReader(chunked(text, 3)).items())
+
+
+def test_record_spanning_many_chunks_is_decoded_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    decoded: list[int] = []
+
+    class CountingDecoder(json.JSONDecoder):
+        def raw_decode(self, s: str, idx: int = 0) -> tuple:
+            decoded.append(idx)
+            return super().raw_decode(s, idx)
+
+    monkeypatch.setattr("core.json_stream._decoder", CountingDecoder())
+    record: dict = {"id": 1, "body": 'print("[{\\"}]");' * 1000}
+    data: bytes = json.dumps({"group_scripts": {"scripts": [record]}}).encode("utf-8")
+
+    items: list[tuple] = list(JsonStreamReader(chunked(data, 7)).items())
+
+    assert items == [("group_scripts", {"scripts": [record]})]
+    assert len(decoded) == 3  # The two keys and the record, despite it spanning thousands of chunks
@@ -0,0 +1,134 @@
+"""
+Unit tests for output.ThreadedDirectoryOutput and output.ArchiveOutput.
+
+Writes go to a tmp_path directory. Slow or failing writes are simulated by
+patching DirectoryOutput.write_file, which the writer threads call.
+"""
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from core.output import ArchiveOutput
+from core.output import DirectoryOutput
+from core.output import FileWriteError
+from core.output import ThreadedDirectoryOutput
+
+
+def test_writes_every_file_before_flush_returns(tmp_path: Path) -> None:
+    with ThreadedDirectoryOutput(threads=4) as output:
+        output.create_folder(str(tmp_path / "folder"))
+        for i in range(200):
+            output.write_file(str(tmp_path / "folder" / f"{i}.txt"), str(i).encode())
+        output.flush()
+
+        assert sorted(int(p.stem) for p in (tmp_path / "folder").iterdir()) == list(range(200))
+
+
+def test_later_write_to_same_path_wins(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    write_file = DirectoryOutput.write_file
+
+    def slow_first_write(self, path: str, data: bytes) -> None:
+        if data == b"first":
+            time.sleep(0.05)
+        write_file(self, path, data)
+
+    monkeypatch.setattr(DirectoryOutput, "write_file", slow_first_write)
+
+    with ThreadedDirectoryOutput(threads=4) as output:
+        output.write_file(str(tmp_path / "same.txt"), b"first")
+        output.write_file(str(tmp_path / "same.txt"), b"second")
+        output.flush()
+
+    assert (tmp_path / "same.txt").read_bytes() == b"second"
+
+
+def test_write_file_blocks_when_queue_is_full(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    release = threading.Event()
+    write_file = DirectoryOutput.write_file
+
+    def blocked_write(self, path: str, data: bytes) -> None:
+        release.wait(5)
+        write_file(self, path, data)
+
+    monkeypatch.setattr(DirectoryOutput, "write_file", blocked_write)
+    queued: list[int] = []
+
+    with ThreadedDirectoryOutput(threads=1, queue_size=2) as output:
+        def queue_files() -> None:
+            for i in range(3):
+                output.write_file(str(tmp_path / f"{i}.txt"), b"")
+                queued.append(i)
+
+        producer = threading.Thread(target=queue_files)
+        producer.start()
+        time.sleep(0.1)
+        assert queued == [0, 1]  # The third file waits for a free slot
+
+        release.set()
+        producer.join(5)
+        output.flush()
+
+    assert queued == [0, 1, 2]
+
+
+def test_failed_write_raises_with_its_path(tmp_path: Path) -> None:
+    missing_folder: Path = tmp_path / "missing"
+
+    with ThreadedDirectoryOutput() as output:
+        output.write_file(str(missing_folder / "file.txt"), b"data")
+
+        with pytest.raises(FileWriteError) as exc_info:
+            output.flush()
+
+    assert exc_info.value.path == str(missing_folder / "file.txt")
+    assert "file.txt" in str(exc_info.value)
+
+
+def read_archive(path: Path) -> dict[str, bytes]:
+    """Returns the files in a zip or tar.gz archive. Key = Name. Value = Contents of its last entry."""
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            return {info.filename: archive.read(info) for info in archive.infolist() if not info.is_dir()}
+    with tarfile.open(path) as archive:
+        return {member.name: archive.extractfile(member).read() for member in archive.getmembers() if member.isfile()}
+
+
+@pytest.mark.parametrize("file_name", ["tenant.zip", "tenant.tar.gz"])
+def test_archive_output_writes_paths_relative_to_root(tmp_path: Path, file_name: str) -> None:
+    root: Path = tmp_path / "tenant"
+    archive_path: Path = tmp_path / file_name
+
+    with ArchiveOutput(str(archive_path), str(root)) as output:
+        output.create_folder(str(root / "Scripts"))
+        with pytest.raises(FileExistsError):
+            output.create_folder(str(root / "Scripts"))
+        output.write_file(str(root / "Scripts" / "a.crmscript"), b"first")
+        output.write_file(str(root / "Scripts" / "a.crmscript"), b"second")
+        output.write_file(str(root / "Scripts" / "b.json"), b"{}")
+
+    assert read_archive(archive_path) == {"Scripts/a.crmscript": b"second", "Scripts/b.json": b"{}"}
+    assert not root.exists()
+    assert not Path(f"{archive_path}.tmp").exists()
+
+
+def test_archive_output_keeps_previous_archive_if_writing_fails(tmp_path: Path) -> None:
+    archive_path: Path = tmp_path / "tenant.zip"
+    with ArchiveOutput(str(archive_path), str(tmp_path)) as output:
+        output.write_file(str(tmp_path / "old.txt"), b"old")
+
+    with pytest.raises(RuntimeError):
+        with ArchiveOutput(str(archive_path), str(tmp_path)) as output:
+            output.write_file(str(tmp_path / "new.txt"), b"new")
+            raise RuntimeError("Fetch failed")
+
+    assert read_archive(archive_path) == {"old.txt": b"old"}
+    assert not Path(f"{archive_path}.tmp").exists()
+
+
+def test_archive_output_refuses_unsupported_types(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        ArchiveOutput(str(tmp_path / "tenant.rar"), str(tmp_path))
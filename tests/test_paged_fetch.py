@@ -0,0 +1,133 @@
+"""
+Unit tests for paged fetching: the pages requested, resuming from the spool after a dropped connection,
+and sizing pages from how fast they download.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core import paged_fetch
+from core.fetch_service import FetchService
+from core.http_session import create_session
+from core.paged_fetch import MAX_PAGE_ROWS
+from core.paged_fetch import MIN_PAGE_ROWS
+from core.paged_fetch import SPOOL_DIRECTORY_NAME
+from core.paged_fetch import next_page_rows
+
+SIZE = TenantSize(script_folders=3, scripts=300, triggers=5, screen_folders=2, screens=5, screen_choosers=3,
+                  scheduled_tasks=2, extra_table_folders=2, extra_tables=4)
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Starts with pages of 100 rows, so the synthetic tenant's scripts take several pages."""
+    monkeypatch.setattr(paged_fetch, "INITIAL_PAGE_ROWS", 100)
+
+
+@pytest.fixture
+def full_tree(tmp_path: Path) -> dict[str, bytes]:
+    """Returns the files a full fetch of the synthetic tenant creates."""
+    directory: Path = tmp_path / "full"
+    directory.mkdir()
+    with MockSuperOffice(generate_tenant(SIZE)) as mock:
+        assert FetchService().fetch(mock.tenant(str(directory)))["success"] is True
+    return read_tree(directory)
+
+
+def read_tree(directory: Path) -> dict[str, bytes]:
+    return {path.relative_to(directory).as_posix(): path.read_bytes()
+            for path in directory.rglob("*") if path.is_file()}
+
+
+def paged_service() -> FetchService:
+    """A FetchService whose session doesn't retry by itself, so dropped pages are only retried by the paged fetch."""
+    return FetchService(session=create_session(retries=0))
+
+
+def test_paged_fetch_matches_full_fetch(tmp_path: Path, full_tree: dict[str, bytes]) -> None:
+    directory: Path = tmp_path / "paged"
+    directory.mkdir()
+
+    with MockSuperOffice(generate_tenant(SIZE)) as mock:
+        result: dict = FetchService().fetch(mock.tenant(str(directory)), paged=True)
+
+    assert result["success"] is True, result["error"]
+    assert read_tree(directory) == full_tree
+    script_pages: list[dict] = [page for page in mock.pages if page["list"] == "scripts"]
+    assert len(script_pages) > 1
+    assert script_pages[0] == {"list": "scripts", "after_id": "0", "limit": "100"}
+    assert not (directory / SPOOL_DIRECTORY_NAME).exists()
+
+
+def test_short_pages_are_not_taken_for_the_last_one(tmp_path: Path, full_tree: dict[str, bytes]) -> None:
+    directory: Path = tmp_path / "paged"
+    directory.mkdir()
+
+    with MockSuperOffice(generate_tenant(SIZE)) as mock:
+        mock.max_page_rows = 30
+        result: dict = FetchService().fetch(mock.tenant(str(directory)), paged=True)
+
+    assert result["success"] is True, result["error"]
+    assert read_tree(directory) == full_tree
+    script_pages: list[dict] = [page for page in mock.pages if page["list"] == "scripts"]
+    assert len(script_pages) == 300 // 30 + 1  # The last one empty
+
+
+def test_dropped_page_is_retried_with_fewer_rows(tmp_path: Path) -> None:
+    with MockSuperOffice(generate_tenant(SIZE)) as mock:
+        mock.drop_pages = {0}
+        result: dict = paged_service().fetch(mock.tenant(str(tmp_path)), paged=True)
+
+    assert result["success"] is True, result["error"]
+    assert mock.pages[:2] == [{"list": "scripts", "after_id": "0", "limit": "100"},
+                              {"list": "scripts", "after_id": "0", "limit": "50"}]
+
+
+def test_interrupted_paged_fetch_resumes_from_spool(tmp_path: Path, full_tree: dict[str, bytes]) -> None:
+    directory: Path = tmp_path / "paged"
+    directory.mkdir()
+
+    with MockSuperOffice(generate_tenant(SIZE)) as mock:
+        mock.drop_pages = set(range(2, 100))  # Two pages make it, then the connection keeps dropping
+        failed: dict = paged_service().fetch(mock.tenant(str(directory)), paged=True)
+
+        assert failed["success"] is False
+        assert "fetching again continues from there" in failed["error"]
+        assert len(mock.pages) == 2 + paged_fetch.PAGE_ATTEMPTS
+        manifest: dict = json.loads((directory / SPOOL_DIRECTORY_NAME / "manifest.json").read_text())
+        assert manifest["lists"]["scripts"]["pages"] == 2
+
+        mock.drop_pages = set()
+        mock.pages = []
+        mock.requests = 0
+        result: dict = paged_service().fetch(mock.tenant(str(directory)), paged=True)
+
+    assert result["success"] is True, result["error"]
+    assert mock.requests == len(mock.pages)  # The first request, for everything but the pages, isn't made again
+    assert mock.pages[0]["after_id"] == str(manifest["lists"]["scripts"]["after_id"])
+    assert read_tree(directory) == full_tree
+
+
+def test_spool_of_other_fetch_options_is_not_resumed(tmp_path: Path) -> None:
+    with MockSuperOffice(generate_tenant(SIZE)) as mock:
+        mock.drop_pages = set(range(1, 100))
+        paged_service().fetch(mock.tenant(str(tmp_path)), paged=True)
+
+        mock.drop_pages = set()
+        mock.pages = []
+        result: dict = paged_service().fetch(mock.tenant(str(tmp_path), fetch_screens=False), paged=True)
+
+    assert result["success"] is True, result["error"]
+    assert mock.pages[0]["after_id"] == "0"
+
+
+def test_next_page_rows_targets_seconds_per_page_within_bounds() -> None:
+    assert next_page_rows(1000, 1000, 3.0) == 1000  # Exactly on target
+    assert next_page_rows(1000, 1000, 0.1) == 2000  # At most twice as many
+    assert next_page_rows(1000, 1000, 60.0) == 500  # At least half as many
+    assert next_page_rows(MAX_PAGE_ROWS, MAX_PAGE_ROWS, 0.1) == MAX_PAGE_ROWS
+    assert next_page_rows(MIN_PAGE_ROWS, MIN_PAGE_ROWS, 60.0) == MIN_PAGE_ROWS
@@ -0,0 +1,132 @@
+"""
+Unit tests for FetchProgress: progress reported during a fetch, cancelling one, and the GUI bridge's background fetches.
+"""
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core.fetch_service import FetchService
+from core.progress import FetchProgress
+from core.progress import use_progress
+from gui.bridge import Api
+
+SIZE = TenantSize(script_folders=2, scripts=20, triggers=3, screen_folders=1, screens=2, screen_choosers=2,
+                  scheduled_tasks=1, extra_table_folders=1, extra_tables=1)
+
+
+def count_files(directory: Path) -> int:
+    return sum(1 for path in directory.rglob("*") if path.is_file())
+
+
+def test_fetch_reports_progress(tmp_path: Path) -> None:
+    updates: list[dict] = []
+    progress = FetchProgress(on_update=updates.append)
+
+    with MockSuperOffice(generate_tenant(SIZE)) as mock, use_progress(progress):
+        result: dict = FetchService().fetch(mock.tenant(str(tmp_path)))
+
+    assert result["success"] is True, result["error"]
+    phases: list[str] = list(dict.fromkeys(update["phase"] for update in updates))
+    assert phases == ["downloading", "parsing", "creating", "publishing"]
+    assert progress.values["groups_done"] == progress.values["groups_total"] == 6
+    assert progress.values["bytes_downloaded"] == result["transfer"]["wire_bytes"]
+    assert progress.values["files_written"] == count_files(tmp_path)
+
+
+@pytest.mark.parametrize("mode", [{}, {"stream": True}, {"sync": True}, {"parallel": True}])
+def test_cancelled_fetch_leaves_previous_folders(tmp_path: Path, mode: dict) -> None:
+    with MockSuperOffice(generate_tenant(SIZE)) as mock:
+        tenant: dict = mock.tenant(str(tmp_path))
+        assert FetchService().fetch(tenant)["success"] is True
+        marker: Path = tmp_path / "Scripts" / "marker.txt"  # Would be gone once Scripts is replaced
+        marker.write_text("previous fetch")
+        before: int = count_files(tmp_path)
+
+        def cancel_once_creating(values: dict) -> None:
+            if values["phase"] == "creating":
+                progress.cancel()
+
+        progress = FetchProgress(on_update=cancel_once_creating)
+        with use_progress(progress):
+            result: dict = FetchService().fetch(tenant, **mode)
+
+    assert result["success"] is False
+    assert result["cancelled"] is True
+    assert result["error"] == "Fetch cancelled"
+    assert marker.exists()
+    assert count_files(tmp_path) == before
+    assert not (tmp_path / "staging").exists() and not (tmp_path / "temp").exists()
+
+
+def test_cancel_is_refused_once_folders_are_being_replaced(tmp_path: Path) -> None:
+    refused: list[bool] = []
+
+    def cancel_once_publishing(values: dict) -> None:
+        if values["phase"] == "publishing":
+            refused.append(not progress.cancel())
+
+    progress = FetchProgress(on_update=cancel_once_publishing)
+    with MockSuperOffice(generate_tenant(SIZE)) as mock, use_progress(progress):
+        result: dict = FetchService().fetch(mock.tenant(str(tmp_path)))
+
+    assert refused == [True]
+    assert result["success"] is True
+
+
+class FakeWindow:
+    """Stands in for a pywebview window, collecting the events Api sends to it."""
+    def __init__(self):
+        self.events: list[tuple[str, dict]] = []
+        self.done = threading.Event()
+
+    def evaluate_js(self, script: str) -> None:
+        name: str = script.split("'crmfetch:")[1].split("'")[0]
+        detail: dict = json.loads(script.split("{detail: ")[1].removesuffix("}))"))
+        self.events.append((name, detail))
+        if name == "fetch-done":
+            self.done.set()
+
+
+def test_bridge_fetches_in_background_and_sends_events(tmp_path: Path) -> None:
+    api = Api()
+    window = FakeWindow()
+    api.set_window(window)
+
+    with MockSuperOffice(generate_tenant(SIZE), latency=0.2) as mock:
+        job_id: str = api.start_fetch(mock.tenant(str(tmp_path)))
+        assert api.cancel_fetch(job_id) is True  # Still waiting for the response
+        assert window.done.wait(10)
+
+    name, result = window.events[-1]
+    assert (name, result["job_id"], result["cancelled"]) == ("fetch-done", job_id, True)
+    assert all(detail["job_id"] == job_id for _, detail in window.events)
+    assert api.cancel_fetch(job_id) is False  # Already finished
+    assert count_files(tmp_path) == 0
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_bridge_sends_a_result_when_fetch_raises(tmp_path: Path) -> None:
+    class RaisingFetchService:
+        def fetch(self, tenant: dict) -> dict:
+            raise RuntimeError("Unexpected")
+
+    api = Api()
+    window = FakeWindow()
+    api.set_window(window)
+    api._fetch_service = RaisingFetchService()
+
+    job_id: str = api.start_fetch({"local_directory": str(tmp_path)})
+    assert window.done.wait(10)
+    # The exception still ends the thread once the result is sent
+    for thread in threading.enumerate():
+        if thread.name == f"fetch-{job_id}":
+            thread.join(10)
+
+    name, result = window.events[-1]
+    assert (name, result["job_id"], result["success"]) == ("fetch-done", job_id, False)
+    assert api.cancel_fetch(job_id) is False
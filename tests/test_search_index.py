@@ -0,0 +1,113 @@
+"""
+Unit tests for SearchIndex: incremental updates, grep and find, and indexing during a fetch.
+"""
+import re
+from pathlib import Path
+
+import pytest
+
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core.fetch_service import FetchService
+from core.search_index import IndexUpdate
+from core.search_index import SearchIndex
+from core.search_index import search_documents
+
+
+def script(object_id: int, body: str, name: str = "") -> dict:
+    return {"kind": "script", "object_id": object_id, "part": "", "name": name or f"Script {object_id}",
+            "body": body}
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> SearchIndex:
+    return SearchIndex(tmp_path / "index" / "search_index.sqlite")
+
+
+def test_update_only_reindexes_changed_bodies(index: SearchIndex) -> None:
+    tenant: dict = {"id": 1, "tenant_name": "Acme"}
+    assert index.update(tenant, [script(1, "a"), script(2, "b"), script(3, "c")]) == {
+        "added": 3, "changed": 0, "removed": 0, "unchanged": 0}
+
+    changes: dict[str, int] = index.update(tenant, [script(1, "a"), script(2, "changed"), script(4, "new")])
+
+    assert changes == {"added": 1, "changed": 1, "removed": 1, "unchanged": 1}
+    assert index.tenants() == [{"tenant_id": 1, "tenant_name": "Acme", "documents": 3}]
+
+
+def test_index_update_only_changes_the_index_once_finished(index: SearchIndex) -> None:
+    tenant: dict = {"id": 1, "tenant_name": "Acme"}
+    index.update(tenant, [script(1, "a")])
+
+    failed: IndexUpdate = index.begin_update(tenant)
+    failed.add(iter([script(2, "b")]))
+    failed.close()  # As a fetch that failed does
+    assert index.tenants() == [{"tenant_id": 1, "tenant_name": "Acme", "documents": 1}]
+
+    update: IndexUpdate = index.begin_update(tenant)
+    update.add(iter([script(1, "a")]))
+    update.add(iter([script(2, "b"), script(3, "")]))
+    assert index.tenants()[0]["documents"] == 1
+
+    assert update.finish() == {"added": 1, "changed": 0, "removed": 0, "unchanged": 1}
+    assert [match["object_id"] for match in index.grep("b")] == [2]
+
+
+def test_grep_finds_substrings_across_tenants(index: SearchIndex) -> None:
+    index.update({"id": 1, "tenant_name": "Acme"}, [script(1, "#setLanguageLevel 3;\nSearchEngine se;\nse.select();")])
+    index.update({"id": 2, "tenant_name": "Globex"}, [script(7, "searchengine lower;"), script(8, "Nothing here")])
+
+    matches: list[dict] = index.grep("SearchEngine")
+    assert [(m["tenant_name"], m["object_id"], m["line_number"]) for m in matches] == [("Acme", 1, 2)]
+
+    assert len(index.grep("searchengine", ignore_case=True)) == 2
+    assert [m["tenant_id"] for m in index.grep("searchengine", tenant_ids=[2], ignore_case=True)] == [2]
+    assert index.grep("se", kinds=["trigger"]) == []  # Shorter than a trigram, and no triggers indexed
+
+
+def test_grep_with_regex(index: SearchIndex) -> None:
+    index.update({"id": 1, "tenant_name": "Acme"}, [script(1, "Integer i = 10;\nString s = \"x\";")])
+
+    assert [m["line"] for m in index.grep(r"^Integer \w+ = \d+", regex=True)] == ["Integer i = 10;"]
+    with pytest.raises(re.error):
+        index.grep("(", regex=True)
+
+
+def test_find_matches_names(index: SearchIndex) -> None:
+    index.update({"id": 1, "tenant_name": "Acme"}, [script(1, "x", "Send invoice"), script(2, "y", "100% done")])
+
+    assert [d["object_id"] for d in index.find("INVOICE")] == [1]
+    assert [d["object_id"] for d in index.find("%")] == [2]  # Not a LIKE wildcard
+
+
+def test_search_documents_covers_screen_scripts_and_buttons() -> None:
+    group: dict = {
+        "screen_definition": [{"id": 3, "name": "Edit", "creation_script": "", "load_script_body": "load();",
+                               "load_post_cgi_script_body": "", "load_final_script_body": ""}],
+        "screen_definition_action": [{"id": 9, "screen_definition": 3, "button": "Save", "ejscript_body": "save();"}],
+    }
+
+    documents: list[dict] = [d for d in search_documents("group_screens", group) if d["body"]]
+
+    assert [(d["kind"], d["object_id"], d["name"]) for d in documents] == [
+        ("screen", 3, "Edit - Loading script (before setFromCgi)"), ("screen_button", 9, "Edit - Save")]
+
+
+def test_fetch_updates_search_index(tmp_path: Path, index: SearchIndex) -> None:
+    size = TenantSize(script_folders=2, scripts=10, triggers=3, screen_folders=1, screens=2, screen_choosers=2,
+                      scheduled_tasks=1, extra_table_folders=1, extra_tables=1)
+    local_directory: Path = tmp_path / "tenant"
+    local_directory.mkdir()
+
+    with MockSuperOffice(generate_tenant(size)) as mock:
+        result: dict = FetchService().fetch(mock.tenant(str(local_directory)), stream=True, search_index=index)
+        again: dict = FetchService().fetch(mock.tenant(str(local_directory)), search_index=index)
+
+    assert result["success"] is True, result["error"]
+    screens_with_load_script: int = 2
+    buttons: int = len(generate_tenant(size)["group_screens"]["screen_definition_action"])
+    assert result["index"]["added"] == 10 + 3 + 2 + screens_with_load_script + buttons
+    assert again["index"]["unchanged"] == result["index"]["added"]
+    assert index.grep("value", kinds=["trigger"])
+    assert (local_directory / "Triggers").is_dir()
@@ -0,0 +1,137 @@
+"""
+Unit tests for SnapshotStore: deduplication, manifests, restore and diff.
+"""
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core.fetch_service import FetchService
+from core.snapshot_store import SnapshotStore
+
+
+def write_tree(local_directory: Path, files: dict[str, str]) -> None:
+    for path, text in files.items():
+        (local_directory / path).parent.mkdir(parents=True, exist_ok=True)
+        (local_directory / path).write_text(text, encoding="utf-8")
+
+
+def make_tenant(tenant_id: int, local_directory: Path) -> dict:
+    return {"id": tenant_id, "tenant_name": f"Tenant {tenant_id}", "local_directory": str(local_directory)}
+
+
+def count_objects(store: SnapshotStore) -> int:
+    return sum(1 for path in store.objects_directory.rglob("*") if path.is_file())
+
+
+def test_identical_files_are_stored_once_across_snapshots_and_tenants(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    first = make_tenant(1, tmp_path / "first")
+    second = make_tenant(2, tmp_path / "second")
+    write_tree(tmp_path / "first", {"Scripts/a.crmscript": "print('a');", "Scripts/b.crmscript": "print('b');"})
+    write_tree(tmp_path / "second", {"Scripts/a.crmscript": "print('a');"})
+
+    store.take(first, ["Scripts"])
+    store.take(first, ["Scripts"])
+    store.take(second, ["Scripts"])
+
+    assert count_objects(store) == 2
+    assert len(store.list_snapshots(1)) == 2
+    assert len(store.list_snapshots(2)) == 1
+
+
+def test_same_object_stored_from_several_threads_at_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    data: bytes = b"print('shared by every tenant');" * 1000
+    written = threading.Barrier(8, timeout=10)
+    replace = os.replace
+
+    def replace_once_all_are_written(source, destination) -> None:
+        written.wait()  # Every thread has found the object missing and written it, as with tenants fetched at once
+        replace(source, destination)
+
+    monkeypatch.setattr(os, "replace", replace_once_all_are_written)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        digests: set[str] = set(executor.map(lambda _: store.store_object(data), range(8)))
+
+    assert len(digests) == 1
+    objects: list[Path] = [path for path in store.objects_directory.rglob("*") if path.is_file()]
+    assert objects == [store.object_path(digests.pop())]
+    assert zlib.decompress(objects[0].read_bytes()) == data
+
+
+def test_snapshots_are_listed_oldest_first(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    tenant = make_tenant(1, tmp_path / "tenant")
+    write_tree(tmp_path / "tenant", {"Scripts/a.crmscript": "1"})
+
+    ids: list[str] = [store.take(tenant, ["Scripts"]) for _ in range(11)]
+
+    assert [manifest["id"] for manifest in store.list_snapshots(1)] == ids
+    assert store.get_manifest(1, "latest")["id"] == ids[-1]
+
+
+def test_get_manifest_raises_value_error_for_unknown_snapshots(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+
+    with pytest.raises(ValueError):
+        store.get_manifest(1, "latest")
+    with pytest.raises(ValueError):
+        store.get_manifest(1, "20240101-000000")
+
+
+def test_restore_brings_back_files_and_removes_later_ones(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    local_directory: Path = tmp_path / "tenant"
+    tenant = make_tenant(1, local_directory)
+    write_tree(local_directory, {"Scripts/a.crmscript": "old", "Scripts/Empty/.keep": "", "Notes.txt": "mine"})
+    snapshot_id: str = store.take(tenant, ["Scripts"])
+
+    write_tree(local_directory, {"Scripts/a.crmscript": "new", "Scripts/b.crmscript": "added later"})
+    counts: dict[str, int] = store.restore(store.get_manifest(1, snapshot_id), str(local_directory))
+
+    assert counts == {"added": 0, "changed": 1, "removed": 1, "unchanged": 1}
+    assert (local_directory / "Scripts/a.crmscript").read_text() == "old"
+    assert not (local_directory / "Scripts/b.crmscript").exists()
+    assert (local_directory / "Notes.txt").read_text() == "mine"  # Outside the snapshot's folders
+
+
+def test_diff_lists_added_removed_and_changed_files(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    local_directory: Path = tmp_path / "tenant"
+    tenant = make_tenant(1, local_directory)
+    write_tree(local_directory, {"Scripts/same": "1", "Scripts/changed": "1", "Scripts/removed": "1"})
+    old: dict = store.get_manifest(1, store.take(tenant, ["Scripts"]))
+
+    (local_directory / "Scripts/removed").unlink()
+    write_tree(local_directory, {"Scripts/changed": "2", "Scripts/added": "1"})
+
+    expected: dict[str, list[str]] = {"added": ["Scripts/added"], "removed": ["Scripts/removed"],
+                                      "changed": ["Scripts/changed"]}
+    assert store.diff(old, store.current_manifest(tenant, ["Scripts"])) == expected
+    assert store.diff(old, store.get_manifest(1, store.take(tenant, ["Scripts"]))) == expected
+
+
+def test_fetch_takes_a_snapshot_of_the_created_folders(tmp_path: Path) -> None:
+    size = TenantSize(script_folders=1, scripts=3, triggers=1, screen_folders=1, screens=1, screen_choosers=1,
+                      scheduled_tasks=1, extra_table_folders=1, extra_tables=1)
+    store = SnapshotStore(tmp_path / "store")
+    local_directory: Path = tmp_path / "tenant"
+    local_directory.mkdir()
+
+    with MockSuperOffice(generate_tenant(size)) as mock:
+        result: dict = FetchService().fetch(mock.tenant(str(local_directory)), snapshot_store=store)
+
+    assert result["success"] is True
+    manifest: dict = store.get_manifest(1, result["snapshot"])
+    written: int = sum(1 for path in local_directory.rglob("*") if path.is_file())
+    assert len(manifest["files"]) == written
+    assert store.diff(manifest, store.current_manifest(mock.tenant(str(local_directory)),
+                                                       manifest["folder_names"])) == {
+        "added": [], "removed": [], "changed": []}
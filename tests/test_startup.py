@@ -0,0 +1,60 @@
+"""
+Startup regression test for the crmfetch CLI.
+
+Runs `crmfetch list --json` in a fresh interpreter with -X importtime, and
+checks that it neither imports the modules only other commands need (Tk,
+requests, rich, toml, tenacity, sqlite3) nor takes longer than a generous cap to
+import - each command is a fresh process, so this is paid on every run.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Only needed by fetch (requests, urllib3, rich), the GUI (tkinter), the
+# splash/--version (toml), folder operations (tenacity) or the search index (sqlite3).
+HEAVY_MODULES: list[str] = ["tkinter", "requests", "urllib3", "rich", "toml", "tenacity", "sqlite3"]
+
+# Importing cli takes about 0.2 s on a developer machine. The cap leaves
+# plenty of room for slow CI machines, while still catching e.g. requests or
+# Tk being imported again.
+MAX_IMPORT_SECONDS: float = 1.5
+
+# Points the CLI at a settings file given as an argument, instead of the
+# pointer in the user's config folder, and runs `crmfetch list --json`.
+LIST_SCRIPT: str = """
+import sys
+from pathlib import Path
+import cli
+import cli.tenant_commands
+from core.tenant_service import TenantService
+cli.tenant_commands.tenant_service = TenantService(Path(sys.argv[1]))
+cli.main(["list", "--json"])
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Returns the cumulative microseconds of each imported module. Key = Module name."""
+    cumulative: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.removeprefix("import time:").split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def test_list_imports_only_what_it_needs(tmp_path: Path) -> None:
+    settings_file: Path = tmp_path / "tenant_settings.json"
+    settings_file.write_text(json.dumps([{"id": 1, "tenant_name": "Acme", "url": "https://acme.example"}]))
+
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", LIST_SCRIPT, str(settings_file)],
+                             capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+
+    assert process.returncode == 0, process.stderr[-2000:]
+    assert json.loads(process.stdout)[0]["tenant_name"] == "Acme"
+
+    imported: dict[str, int] = parse_importtime(process.stderr)
+    heavy: list[str] = [name for name in imported if name.split(".")[0] in HEAVY_MODULES]
+    assert heavy == [], f"crmfetch list imported {heavy}"
+    assert imported["cli"] / 1_000_000 < MAX_IMPORT_SECONDS
@@ -6,6 +6,8 @@ tenant_settings.json file written to a pytest tmp_path, matching how
 TenantService is actually used - a thin wrapper around a JSON file on disk.
 """
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
@@ -49,6 +51,12 @@ def test_add_tenant_persists_to_disk(service: TenantService, settings_file: Path
     assert on_disk[0]["tenant_name"] == "Acme"
 
 
+def test_add_tenant_keeps_fetch_options_it_was_given(service: TenantService, settings_file: Path) -> None:
+    service.add_tenant({"tenant_name": "Acme", "url": "https://acme.example", "fetch_options": {"fetch_scripts": False}})
+
+    assert json.loads(settings_file.read_text())[0]["fetch_options"] == {"fetch_scripts": False}
+
+
 def test_add_tenant_without_name_raises(service: TenantService) -> None:
     with pytest.raises(Exception):
         service.add_tenant({"url": "https://acme.example"})
@@ -229,3 +237,64 @@ def test_no_argument_constructor_still_resolves_via_get_app_directory(
     service = TenantService()
 
     assert service.tenant_settings_filename == tmp_path / "tenant_settings.json"
+
+
+def test_unchanged_file_is_not_read_again(
+    service: TenantService, settings_file: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    service.add_tenant({"tenant_name": "Acme", "url": "https://acme.example"})
+    service.get_all_tenants()
+
+    def fail_if_called(*args, **kwargs):
+        raise AssertionError("tenant_settings.json must not be parsed again while it is unchanged")
+
+    monkeypatch.setattr("core.tenant_service.json.load", fail_if_called)
+
+    assert service.get_tenant_by_id(1)["tenant_name"] == "Acme"
+    assert [t["tenant_name"] for t in service.search_tenants("acme")] == ["Acme"]
+
+
+def test_changes_by_another_writer_are_read(service: TenantService, settings_file: Path) -> None:
+    service.add_tenant({"tenant_name": "Acme", "url": "https://acme.example"})
+
+    other = TenantService(settings_file)
+    other.add_tenant({"tenant_name": "Beta", "url": "https://beta.example"})
+
+    assert [t["tenant_name"] for t in service.get_all_tenants()] == ["Acme", "Beta"]
+
+
+def test_changing_a_returned_tenant_does_not_change_the_cache(service: TenantService, settings_file: Path) -> None:
+    service.add_tenant({"tenant_name": "Acme", "url": "https://acme.example"})
+
+    tenant: dict = service.get_tenant_by_id(1)
+    tenant["tenant_name"] = "Acme Renamed"
+    assert service.get_tenant_by_id(1)["tenant_name"] == "Acme"
+
+    service.update_tenant(tenant)
+    assert json.loads(settings_file.read_text())[0]["tenant_name"] == "Acme Renamed"
+
+
+def test_nothing_is_written_when_nothing_changed(service: TenantService, settings_file: Path) -> None:
+    service.add_tenant({"tenant_name": "Acme", "url": "https://acme.example"})
+    tenant: dict = service.get_all_tenants(initial_load=True)[0]  # Backfills fetch options once
+    written_at: int = settings_file.stat().st_mtime_ns
+    os.utime(settings_file, ns=(written_at - 10**9, written_at - 10**9))
+
+    service.get_all_tenants(initial_load=True)
+    service.update_tenant(tenant)
+
+    assert settings_file.stat().st_mtime_ns == written_at - 10**9
+
+
+def test_concurrent_writers_do_not_lose_tenants(settings_file: Path) -> None:
+    services: list[TenantService] = [TenantService(settings_file), TenantService(settings_file)]
+
+    def add(i: int) -> int:
+        return services[i % 2].add_tenant({"tenant_name": f"Tenant {i}", "url": "https://example.com"})["id"]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids: list[int] = list(executor.map(add, range(40)))
+
+    assert sorted(ids) == list(range(1, 41))
+    assert len(json.loads(settings_file.read_text())) == 40
+    assert not Path(f"{settings_file}.tmp").exists()
@@ -0,0 +1,99 @@
+"""
+Unit tests for tracing: spans, counts and the Chrome trace export.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.mock_superoffice import MockSuperOffice
+from benchmarks.synthetic_tenant import TenantSize
+from benchmarks.synthetic_tenant import generate_tenant
+from core.fetch_service import FetchService
+from core.tracing import Tracer
+from core.tracing import bind_tracer
+from core.tracing import count
+from core.tracing import get_tracer
+from core.tracing import span
+from core.tracing import traced
+from core.tracing import use_tracer
+
+
+def test_spans_are_only_recorded_with_an_active_tracer() -> None:
+    with span("ignored") as ignored:
+        ignored.set(records=1)
+        count(files=1)
+
+    tracer = Tracer()
+    with use_tracer(tracer):
+        with span("outer", tenant="Acme") as outer:
+            with span("inner"):
+                count(files=2, bytes=10)
+            outer.set(records=5)
+
+    assert get_tracer() is None
+    assert [(s.name, s.depth) for s in tracer.spans] == [("outer", 0), ("inner", 1)]
+    assert tracer.spans[0].attributes == {"tenant": "Acme", "records": 5}
+    assert tracer.spans[0].amounts == tracer.spans[1].amounts == {"files": 2, "bytes": 10}
+    assert tracer.spans[0].seconds >= tracer.spans[1].seconds
+
+
+def test_summary_sums_spans_by_name() -> None:
+    @traced("work")
+    def work() -> None:
+        count(files=1)
+
+    tracer = Tracer()
+    with use_tracer(tracer):
+        for _ in range(3):
+            work()
+
+    (summary,) = tracer.summary()
+    assert summary["name"] == "work"
+    assert summary["calls"] == 3
+    assert summary["amounts"] == {"files": 3}
+
+
+def test_bind_tracer_records_spans_from_other_threads() -> None:
+    def work() -> int:
+        with span("work"):
+            return threading.get_ident()
+
+    tracer = Tracer()
+    with use_tracer(tracer), ThreadPoolExecutor(max_workers=1) as executor:
+        worker_thread: int = executor.submit(bind_tracer(work)).result()
+        executor.submit(work).result()  # Not bound, so not recorded
+
+    assert worker_thread != threading.get_ident()
+    assert [s.name for s in tracer.spans] == ["work"]
+
+
+def test_chrome_trace_has_one_complete_event_per_span(tmp_path: Path) -> None:
+    tracer = Tracer()
+    with use_tracer(tracer), span("fetch"):
+        count(files=1)
+
+    trace: dict = tracer.chrome_trace()
+
+    (event,) = trace["traceEvents"]
+    assert event["name"] == "fetch"
+    assert event["ph"] == "X"
+    assert event["dur"] >= 0
+    assert event["args"] == {"files": 1}
+
+
+def test_fetch_records_its_phases(tmp_path: Path) -> None:
+    size = TenantSize(script_folders=2, scripts=10, triggers=2, screen_folders=1, screens=2, screen_choosers=1,
+                      scheduled_tasks=1, extra_table_folders=1, extra_tables=2)
+    tracer = Tracer()
+
+    with MockSuperOffice(generate_tenant(size)) as mock, use_tracer(tracer):
+        result: dict = FetchService().fetch(mock.tenant(str(tmp_path)))
+
+    assert result["success"] is True
+    phases: dict[str, dict] = {phase["name"]: phase for phase in tracer.summary()}
+    for name in ["fetch", "request", "download", "parse", "create", "creator_v2", "group_scripts",
+                 "flush_writes", "publish_folders"]:
+        assert name in phases
+    written: int = sum(1 for p in tmp_path.rglob("*") if p.is_file())
+    assert phases["create"]["amounts"]["files"] == written
+    assert phases["group_scripts"]["amounts"]["files"] == 20  # A .crmscript and a .json per script
@@ -0,0 +1,84 @@
+"""
+Unit tests for the file/folder helpers in core/utility.py.
+"""
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from core import utility
+
+
+def test_rename_folder_retries_permission_errors_with_millisecond_backoff(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    src: Path = tmp_path / "src"
+    src.mkdir()
+    failures: list[int] = [2]
+
+    def flaky_rename(a: str, b: str) -> None:
+        if failures[0]:
+            failures[0] -= 1
+            raise PermissionError("folder is in use")
+        os.replace(a, b)
+
+    monkeypatch.setattr("core.utility.os.rename", flaky_rename)
+    utility.reset_retry_stats()
+
+    start: float = time.perf_counter()
+    assert utility.rename_folder(str(src), str(tmp_path / "dst")) is True
+
+    assert (tmp_path / "dst").is_dir()
+    assert time.perf_counter() - start < 0.5
+    stats: dict = utility.get_retry_stats()
+    assert stats["retries"] == 2
+    assert stats["seconds"] == pytest.approx(0.015)
+
+
+def test_rename_folder_returns_false_without_retrying_when_source_is_missing(tmp_path: Path) -> None:
+    utility.reset_retry_stats()
+
+    assert utility.rename_folder(str(tmp_path / "missing"), str(tmp_path / "dst")) is False
+    assert utility.get_retry_stats()["retries"] == 0
+
+
+def test_create_file_writes_text_with_os_newlines(tmp_path: Path) -> None:
+    utility.create_file(str(tmp_path), "a.crmscript", "line 1\nline 2 æøå")
+
+    assert (tmp_path / "a.crmscript").read_bytes() == f"line 1{os.linesep}line 2 æøå".encode("utf-8")
+
+
+@pytest.mark.parametrize(("text", "expected"), [
+    ("Plain name", "Plain name"),
+    ("Foo/Bar", "Foo.Bar"),
+    ('a"b\\c:d*e<f>g|h?', "a'b..c - dXe Lt f Gt gIh"),
+    ("Ends with dots...", "Ends with dots..."),  # Followed by an extension, which Windows keeps them before
+    ("...", "..."),
+    ("?", ""),
+    ("", ""),
+    ("CON", "CON_"),
+    ("lpt1 ", "lpt1 _"),
+    ("Nul.old", "Nul_.old"),
+    ("COM9 .x", "COM9 _.x"),
+    ("COM10", "COM10"),
+    ("CONSOLE", "CONSOLE"),
+    ("Console.CON", "Console.CON"),
+])
+def test_safe_name(text: str, expected: str) -> None:
+    assert utility.safe_name(text) == expected
+    assert utility.safe_name.__wrapped__(text) == expected
+
+
+@pytest.mark.parametrize(("text", "expected"), [
+    ("Plain name", "Plain name"),
+    ("Ends with dots...", "Ends with dots"),
+    ("Ends with a slash and space/ ", "Ends with a slash and space"),
+    ("v1.", "v1"),
+    ("...", "_"),
+    ("?", "_"),
+    ("", ""),
+    ("lpt1 ", "lpt1_"),
+])
+def test_safe_name_of_folder_drops_trailing_dots_and_spaces(text: str, expected: str) -> None:
+    assert utility.safe_name(text, folder=True) == expected
@@ -0,0 +1,137 @@
+"""
+Unit tests for FetchScheduler: intervals and jitter, skipping tenants still being fetched, and the status it keeps.
+"""
+import json
+import random
+import threading
+from pathlib import Path
+
+import pytest
+
+from core.watch import FetchScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def ok_result() -> dict:
+    return {"success": True, "validation_error": False, "error": "", "info": ""}
+
+
+def tenant(tenant_id: int, **settings) -> dict:
+    return dict({"id": tenant_id, "tenant_name": f"Tenant {tenant_id}", "local_directory": f"dir-{tenant_id}"},
+                **settings)
+
+
+def test_fetches_each_tenant_on_its_own_interval() -> None:
+    clock = FakeClock()
+    fetched: list[int] = []
+    tenants: list[dict] = [tenant(1), tenant(2, watch_interval=5)]
+
+    with FetchScheduler(lambda t: fetched.append(t["id"]) or ok_result(), lambda: tenants, interval_minutes=15,
+                        jitter=0, clock=clock, jobs=1) as scheduler:
+        for minute in range(0, 31):
+            clock.now = minute * 60
+            scheduler.run_pending()
+            scheduler.executor.submit(lambda: None).result()  # Waits for the fetches started, with jobs=1
+
+    assert fetched.count(1) == 3  # Minutes 0, 15 and 30
+    assert fetched.count(2) == 7  # Every 5 minutes from 0 to 30
+
+
+def test_jitter_spreads_runs_within_bounds() -> None:
+    clock = FakeClock()
+    scheduler = FetchScheduler(lambda t: ok_result(), lambda: [tenant(i) for i in range(50)], interval_minutes=10,
+                               jitter=0.2, clock=clock, rng=random.Random(1))
+
+    scheduler.run_pending()
+    next_runs: list[float] = [watched.next_run for watched in scheduler.watched.values()]
+    scheduler.close()
+
+    assert all(0 <= next_run <= 10 * 60 * 0.2 for next_run in next_runs)
+    assert len(set(next_runs)) == 50
+    assert all(8 * 60 <= scheduler.next_run(0, 10 * 60) <= 12 * 60 for _ in range(100))
+
+
+def test_skips_tenant_still_being_fetched() -> None:
+    clock = FakeClock()
+    release = threading.Event()
+    calls: list[int] = []
+
+    def slow_fetch(t: dict) -> dict:
+        calls.append(t["id"])
+        release.wait(5)
+        return ok_result()
+
+    # Tenant 3 shares tenant 1's directory, so can't be fetched at the same time either
+    tenants: list[dict] = [tenant(1), tenant(2), tenant(3, local_directory="dir-1")]
+    with FetchScheduler(slow_fetch, lambda: tenants, interval_minutes=1, jitter=0, clock=clock) as scheduler:
+        assert [t["id"] for t in scheduler.run_pending()] == [1, 2]
+        clock.now = 60
+        assert scheduler.run_pending() == []
+        release.set()
+
+    status: list[dict] = scheduler.status()
+    assert [(s["tenant_id"], s["runs"], s["skipped"]) for s in status] == [(1, 1, 1), (2, 1, 1), (3, 0, 2)]
+    assert calls == [1, 2]
+
+
+def test_records_failures_and_saves_status(tmp_path: Path) -> None:
+    clock = FakeClock()
+    results: list[tuple[int, bool, float]] = []
+
+    def fetch(t: dict) -> dict:
+        clock.now += 2.5
+        if t["id"] == 2:
+            raise ConnectionError("boom")
+        return dict(ok_result(), success=False, error="Failed to connect to SuperOffice")
+
+    with FetchScheduler(fetch, lambda: [tenant(1), tenant(2)], jitter=0, clock=clock, jobs=1,
+                        on_result=lambda t, result, seconds: results.append((t["id"], result["success"], seconds))
+                        ) as scheduler:
+        scheduler.run_pending()
+
+    assert results == [(1, False, 2.5), (2, False, 2.5)]
+    scheduler.save_status(str(tmp_path / "status.json"))
+    status: list[dict] = json.loads((tmp_path / "status.json").read_text())["tenants"]
+    assert [(s["failures"], s["last_seconds"], s["last_error"]) for s in status] == [
+        (1, 2.5, "Failed to connect to SuperOffice"), (1, 2.5, "Unexpected error: boom")]
+
+
+def test_picks_up_added_and_removed_tenants() -> None:
+    clock = FakeClock()
+    tenants: list[dict] = [tenant(1)]
+
+    with FetchScheduler(lambda t: ok_result(), lambda: tenants, jitter=0, clock=clock, jobs=1) as scheduler:
+        scheduler.run_pending()
+        tenants[:] = [tenant(2)]
+        scheduler.executor.submit(lambda: None).result()
+        scheduler.run_pending()
+
+    assert list(scheduler.watched) == [2]
+
+
+def test_keeps_watching_when_the_tenants_cannot_be_read(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("core.watch.MAX_SLEEP_SECONDS", 0)
+    stop = threading.Event()
+    errors: list[Exception] = []
+    calls: list[int] = []
+
+    def get_tenants() -> list[dict]:
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise json.JSONDecodeError("Expecting value", "", 0)  # E.g. the settings file is being written
+        stop.set()
+        return [tenant(1)]
+
+    with FetchScheduler(lambda t: ok_result(), get_tenants, jitter=0, on_error=errors.append) as scheduler:
+        scheduler.run(stop)
+
+    assert len(calls) == 2
+    assert [type(e) for e in errors] == [json.JSONDecodeError]
+    assert scheduler.status()[0]["runs"] == 1